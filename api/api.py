@@ -1,98 +1,137 @@
 import os
-import shutil
-import json
+import asyncio
 import tempfile
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware 
+from fastapi.middleware.cors import CORSMiddleware
 
 from config.config import Config
 from vde.processor import DocumentProcessor
+from vde.http_client import AsyncOCRHttpClient
+from vde.record import ImageRecord
+from vde.metrics import PipelineMetrics
+
+
+class RequestContext:
+    def __init__(self, app_config, filename):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = Path(self._temp_dir.name)
+        self.input_folder = self.base_path / 'input_images_for_api_call'
+        self.input_folder.mkdir(parents=True, exist_ok=True)
+        self.image_name = Path(filename).name
+        self.config = app_config.with_paths(str(self.base_path), input_folder_override=str(self.input_folder))
+        self.config.write_metrics_summary = False
+        self.results = None
+
+    def read_log(self):
+        if not os.path.exists(self.config.log_file):
+            return ""
+        try:
+            with open(self.config.log_file, 'r', encoding='utf-8') as log_f:
+                return log_f.read()
+        except Exception as log_read_e:
+            return f"Could not read log file: {log_read_e}"
+
+    def cleanup(self):
+        self._temp_dir.cleanup()
+
+
+def _load_processor(app):
+    try:
+        processor = DocumentProcessor(app.state.config, metrics=app.state.metrics)
+        processor.warm_up()
+        app.state.processor = processor
+        print("Models loaded and warmed up. API is ready.")
+    except Exception as e:
+        app.state.startup_error = str(e)
+        print(f"ERROR: Failed to load models: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.config = Config()
+    app.state.config.save_visualizations = False
+    app.state.processor = None
+    app.state.startup_error = None
+    app.state.metrics = PipelineMetrics.from_config(app.state.config)
+    app.state.async_client = AsyncOCRHttpClient(app.state.config, metrics=app.state.metrics)
+    threading.Thread(target=_load_processor, args=(app,), daemon=True).start()
+    yield
+    await app.state.async_client.close()
+    if app.state.processor is not None:
+        await asyncio.to_thread(app.state.processor.close)
+
 
 app = FastAPI(
     title="VDE OCR Document Processing API",
     description="API for full document edge detection, perspective correction, text detection, and text recognition.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"], 
+    allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["*"], 
-    allow_headers=["*"], 
+    allow_methods=["*"],
+    allow_headers=["*"],
 )
 
+
 @app.post("/process-document/")
 async def process_document_endpoint(file: UploadFile = File(...)):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Uploaded file must be an image.")
 
-    
-    with tempfile.TemporaryDirectory() as temp_base_path:
-        temp_base_path_obj = Path(temp_base_path)
+    if app.state.processor is None:
+        raise HTTPException(status_code=503, detail="Models are still loading. Try again shortly.")
 
-        
-        temp_input_folder = temp_base_path_obj / 'input_images_for_api_call'
-        temp_input_folder.mkdir(parents=True, exist_ok=True)
-
-        image_path = temp_input_folder / file.filename
+    context = RequestContext(app.state.config, file.filename)
+    try:
         try:
-            with open(image_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            data = await file.read()
+            with app.state.metrics.timer("image_decode"):
+                record = ImageRecord.from_bytes(context.image_name, data)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {e}")
-
-        
-        temp_config = Config(base_path=str(temp_base_path_obj), input_folder_override=str(temp_input_folder))
-
-        
-        weights_source_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weights')
-        weights_dest_path = temp_base_path_obj / 'weights'
-        
-        if os.path.exists(weights_source_path):
-            shutil.copytree(weights_source_path, weights_dest_path, dirs_exist_ok=True)
-        else:
-            
-            print(f"WARNING: Weights not found at {weights_source_path}. Ensure models are available.")
-
-
-        processor = DocumentProcessor(temp_config)
+            raise HTTPException(status_code=500, detail=f"Failed to read uploaded file: {e}")
+        if record is None:
+            raise HTTPException(status_code=400, detail="Uploaded file could not be decoded as an image.")
 
+        processor = app.state.processor.with_config(context.config)
         try:
-            
-            processor.run_full_pipeline()
-
-            
-            final_output_path = temp_config.ngram_results_file 
-            if os.path.exists(final_output_path):
-                with open(final_output_path, 'r', encoding='utf-8') as f:
-                    final_results = json.load(f)
-                
-                return JSONResponse(content=final_results, status_code=200)
-
-            else:
-                raise HTTPException(status_code=500, detail="N-gram enriched results file not found after pipeline execution.") 
-
-
+            with app.state.metrics.timer("api_request", cpu=None):
+                context.results = await processor.run_in_memory_pipeline_async(app.state.async_client, records=[record])
         except Exception as e:
             error_message = f"Document processing failed: {e}"
-            print(f"ERROR: {error_message}") 
-            
-            log_content = ""
-            if os.path.exists(temp_config.log_file):
-                try:
-                    with open(temp_config.log_file, 'r', encoding='utf-8') as log_f:
-                        log_content = log_f.read()
-                except Exception as log_read_e:
-                    log_content = f"Could not read log file: {log_read_e}"
-
+            print(f"ERROR: {error_message}")
             raise HTTPException(
                 status_code=500,
-                detail={"message": error_message, "log_details": log_content}
+                detail={"message": error_message, "log_details": context.read_log()}
             )
 
+        if context.results is None:
+            raise HTTPException(status_code=500, detail="N-gram post-processing produced no results.")
+
+        return JSONResponse(content=context.results, status_code=200)
+    finally:
+        context.cleanup()
+
+@app.get("/ready")
+async def readiness():
+    if app.state.processor is not None:
+        return {"ready": True}
+    content = {"ready": False}
+    if app.state.startup_error:
+        content["error"] = app.state.startup_error
+    return JSONResponse(content=content, status_code=503)
+
+@app.get("/metrics")
+async def metrics():
+    return app.state.metrics.summary()
+
 @app.get("/")
 async def read_root():
-    return {"message": "VDE OCR API is running!"}
\ No newline at end of file
+    return {"message": "VDE OCR API is running!"}
@@ -0,0 +1,192 @@
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+DETECTION_PATH = '/predictions/text_detection'
+RECOGNITION_PATH = '/predictions/text_recognizer'
+
+SAMPLE_TEXTS = ["ঢাকা মেট্রো গ", "ঢাকা মেট্রো ক", "চট্ট মেট্রো হ", "১১-২৩৪৫", "২৭-৮৯০১", "ঢাকা মেট্রো ঘ ১৫-৬৭৮৯"]
+
+
+class MockOCRServer:
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 detection_response=None, recognition_response=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.detection_response = detection_response
+        self.recognition_response = recognition_response
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"detection_requests": 0, "recognition_requests": 0, "errors": 0, "bytes_received": 0}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def detection_url(self):
+        return self.base_url + DETECTION_PATH
+
+    @property
+    def recognition_url(self):
+        return self.base_url + RECOGNITION_PATH
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-ocr-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sample_delay(self):
+        with self.lock:
+            delay_ms = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self.random.random() < self.error_rate
+        return max(0.0, delay_ms) / 1000, failed
+
+    def _image_size(self, payload):
+        data_uri = payload.get("img", "")
+        encoded = data_uri.split(",", 1)[-1]
+        return Image.open(BytesIO(base64.b64decode(encoded))).size
+
+    def _detection_result(self, payload):
+        if self.detection_response is not None:
+            return self.detection_response
+        width, height = self._image_size(payload)
+        boxes = [[int(width * 0.2), int(width * 0.8), int(height * 0.25), int(height * 0.45)],
+                 [int(width * 0.2), int(width * 0.8), int(height * 0.55), int(height * 0.75)]]
+        return [{"horizontal_list": boxes, "free_list": []}]
+
+    def _recognition_result(self, payload):
+        if self.recognition_response is not None:
+            return self.recognition_response
+        results = []
+        for _ in payload.get("bboxes", []):
+            with self.lock:
+                text = self.random.choice(SAMPLE_TEXTS)
+                confidence = round(self.random.uniform(0.6, 0.99), 4)
+            results.append([{"text": text, "confidence": confidence}])
+        return results
+
+    def _handle(self, handler):
+        path = handler.path.split('?', 1)[0]
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        if path not in (DETECTION_PATH, RECOGNITION_PATH):
+            self._send(handler, 404, {"error": f"Unknown endpoint {path}"})
+            return
+
+        delay, failed = self._sample_delay()
+        with self.lock:
+            self.stats["detection_requests" if path == DETECTION_PATH else "recognition_requests"] += 1
+            self.stats["bytes_received"] += len(body)
+            if failed:
+                self.stats["errors"] += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self._send(handler, 500, {"error": "Injected mock server error"})
+            return
+
+        try:
+            payload = json.loads(body or b'{}')
+            if path == DETECTION_PATH:
+                result = self._detection_result(payload)
+            else:
+                result = self._recognition_result(payload)
+        except Exception as e:
+            self._send(handler, 400, {"error": str(e)})
+            return
+        self._send(handler, 200, result)
+
+    def _send(self, handler, status, content):
+        data = json.dumps(content, ensure_ascii=False).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def load_canned_response(path):
+    if path is None:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Mean latency added to every mock response.")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="Uniform +/- jitter around the mean latency.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    parser.add_argument('--detection-response', help="JSON file returned verbatim by the detection endpoint.")
+    parser.add_argument('--recognition-response', help="JSON file returned verbatim by the recognition endpoint.")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def server_from_args(args, host='127.0.0.1', port=0):
+    return MockOCRServer(
+        host=host,
+        port=port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        detection_response=load_canned_response(args.detection_response),
+        recognition_response=load_canned_response(args.recognition_response),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the remote text detection/recognition API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, host=args.host, port=args.port)
+    print(f"Mock OCR server listening on {server.base_url}")
+    print(f"  detection:   {server.detection_url}")
+    print(f"  recognition: {server.recognition_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
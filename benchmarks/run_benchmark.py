@@ -0,0 +1,152 @@
+import os
+import ast
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+import cv2
+from config.config import Config
+from vde.processor import DocumentProcessor
+from benchmarks.mock_ocr_server import add_server_arguments, server_from_args
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+
+def parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs or []:
+        key, _, raw_value = pair.partition('=')
+        try:
+            value = ast.literal_eval(raw_value)
+        except (ValueError, SyntaxError):
+            value = raw_value
+        overrides[key.strip()] = value
+    return overrides
+
+
+def build_corpus(source_folder, corpus_folder, scale):
+    os.makedirs(corpus_folder, exist_ok=True)
+    source_images = sorted(p for p in Path(source_folder).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    count = 0
+    for copy_index in range(scale):
+        for image_path in source_images:
+            target = Path(corpus_folder) / f"{image_path.stem}_x{copy_index}{image_path.suffix}"
+            if copy_index == 0:
+                shutil.copyfile(image_path, target)
+            else:
+                img = cv2.imread(str(image_path))
+                if img is None:
+                    continue
+                factor = 1.0 + 0.02 * (copy_index % 10)
+                img = cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_LINEAR)
+                img = cv2.convertScaleAbs(img, alpha=1.0, beta=copy_index % 7)
+                cv2.imwrite(str(target), img)
+            count += 1
+    return count
+
+
+def make_config(args, base_path, input_folder, server, overrides):
+    config = Config(base_path=base_path, input_folder_override=input_folder)
+    config.update_api_config(detection_url=server.detection_url, recognition_url=server.recognition_url)
+    config.limit = None
+    config.result_cache_enabled = False
+    config.ngram_cache_persist = False
+    # The mock server is local, so the production request throttle is off unless --set turns it back on.
+    config.request_delay_seconds = 0
+    config.api_requests_per_second = None
+    config.streaming_pipeline = args.mode == 'streaming'
+    config.in_memory_pipeline = args.mode == 'in-memory'
+
+    for key, value in overrides.items():
+        if not hasattr(config, key):
+            raise SystemExit(f"Unknown config setting: {key}")
+        setattr(config, key, value)
+    return config
+
+
+def run_benchmark(args):
+    overrides = parse_overrides(args.set)
+    work_dir = tempfile.mkdtemp(prefix="vde_benchmark_")
+    try:
+        corpus_folder = os.path.join(work_dir, 'corpus')
+        image_count = build_corpus(args.images, corpus_folder, args.scale)
+        print(f"Benchmark corpus: {image_count} images ({args.scale}x {args.images})")
+
+        with server_from_args(args) as server:
+            print(f"Mock OCR server: {server.base_url} (latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate:.0%})")
+            config = make_config(args, os.path.join(work_dir, 'output'), corpus_folder, server, overrides)
+            rate = config.effective_api_requests_per_second
+            print(f"API rate limit: {f'{rate:g} requests/sec' if rate else 'unlimited'}, "
+                  f"max in flight: {config.api_max_in_flight}")
+            processor = DocumentProcessor(config)
+            processor.warm_up()
+
+            runs = []
+            for repeat in range(args.repeat):
+                processor.metrics.reset()
+                # Start every run cold; otherwise later repeats skip n-gram matching for texts seen in run 1.
+                processor.ngram_postprocessor.correction_cache.clear()
+                started = time.perf_counter()
+                processor.run_full_pipeline()
+                wall_seconds = time.perf_counter() - started
+                runs.append({
+                    "wall_seconds": round(wall_seconds, 3),
+                    "images_per_second": round(image_count / wall_seconds, 3) if wall_seconds else None,
+                })
+                print(f"Run {repeat + 1}/{args.repeat}: {wall_seconds:.2f}s ({runs[-1]['images_per_second']} images/sec)")
+
+            report = {
+                "mode": args.mode,
+                "images": image_count,
+                "scale": args.scale,
+                "overrides": overrides,
+                "api_requests_per_second": config.effective_api_requests_per_second,
+                "mock_server": {
+                    "latency_ms": args.latency_ms,
+                    "jitter_ms": args.jitter_ms,
+                    "error_rate": args.error_rate,
+                    **server.stats,
+                },
+                "runs": runs,
+                "median_images_per_second": statistics.median(run["images_per_second"] or 0 for run in runs),
+                "stages": processor.metrics.summary()["steps"],
+            }
+            stage_table = processor.metrics.format_summary()
+    finally:
+        if not args.keep_outputs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"Benchmark outputs kept in: {work_dir}")
+
+    print("\nSTAGE LATENCIES (last run):")
+    print(stage_table)
+    print(f"\nMedian throughput: {report['median_images_per_second']} images/sec")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Benchmark report saved to: {args.report}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VDE pipeline against a local mock OCR server.")
+    parser.add_argument('--images', default=str(PROJECT_ROOT / 'test_images'), help="Folder of source images.")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Replicate the source images this many times (resized/brightness-shifted copies).")
+    parser.add_argument('--mode', choices=['file', 'in-memory', 'streaming'], default='file')
+    parser.add_argument('--repeat', type=int, default=1, help="Number of timed runs.")
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE',
+                        help="Override a Config attribute, e.g. --set api_max_in_flight=8 --set run_easy_ocr=False")
+    parser.add_argument('--report', default=str(PROJECT_ROOT / 'benchmarks' / 'results' / 'benchmark_report.json'))
+    parser.add_argument('--keep-outputs', action='store_true', help="Keep the temporary corpus and pipeline outputs.")
+    add_server_arguments(parser)
+    run_benchmark(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
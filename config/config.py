@@ -1,4 +1,5 @@
 import os
+import copy
 
 class Config:
     def __init__(self, base_path="output", input_folder_override=None):
@@ -16,12 +17,57 @@ class Config:
         self.run_edge_detection = True
         self.run_perspective_correction = True
         self.run_text_detection = True
+        self.run_box_refinement = False
         self.run_post_processing = True
         self.run_text_recognition = True
         self.run_easy_ocr = True
         self.run_ngram_post_processing = True 
 
+        self.in_memory_pipeline = False
+        self.save_intermediate_images = True
+        self.results_format = 'json'
+        self.collect_metrics = True
+        self.metrics_reservoir_size = 10000
+        self.write_metrics_summary = True
+
+        self.streaming_pipeline = False
+        self.streaming_queue_size = 16
+        self.streaming_yolo_workers = 1
+        self.streaming_perspective_workers = 2
+        self.perspective_workers = min(8, os.cpu_count() or 1)
+        self.streaming_detection_workers = 4
+        self.streaming_recognition_workers = 4
+        self.streaming_easy_ocr_workers = 1
+        self.save_visualizations = True
+        self.visualization_sample_rate = 1.0
+        self.visualization_background = True
+        self.visualization_queue_size = 64
+        self.tracking_enabled = False
+        self.tracking_iou_threshold = 0.3
+        self.tracking_max_centroid_distance = 0.1
+        self.tracking_max_age = 5
+        self.tracking_best_crops = 1
+        self.video_sample_fps = 5.0
+        self.video_max_frames = None
+        self.video_realtime = False
+        self.video_motion_gating = True
+        self.video_motion_pixel_threshold = 25
+        self.video_motion_min_fraction = 0.005
+        self.video_motion_downscale_width = 160
+        self.video_keyframe_interval_seconds = None
+
         self.request_delay_seconds = 2.0
+        self.api_requests_per_second = None
+        self.api_rate_burst = 1
+        self.api_max_in_flight = 4
+        self.api_timeout_seconds = 60
+        self.payload_jpeg_quality = 75
+        self.payload_max_side = None
+        self.payload_reuse_source_jpeg = True
+        self.ocr_cassette_mode = None
+        self.ocr_cassette_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'ocr_cassette.jsonl')
+
+        self.yolo_batch_size = 8
 
         self.horizontal_padding_ratio = 0.50
         self.vertical_padding_ratio = 0.50
@@ -30,8 +76,30 @@ class Config:
         self.min_vertical_pad = 2
         self.max_vertical_pad = 8
 
+        self.result_cache_enabled = True
+        self.result_cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'results')
+        self.result_cache_max_bytes = 2 * 1024 ** 3
+
+        self.yolo_backend = 'ultralytics'
+        self.yolo_imgsz = 640
+        self.yolo_conf_threshold = 0.25
+        self.yolo_iou_threshold = 0.7
+        self.yolo_max_detections = 300
+        self.yolo_cpu_threads = None
+        self.yolo_quantization = None
+        self.quantization_calibration_images = 100
+        self.easy_ocr_quantize = True
         self.easy_ocr_languages = ['bn']
+        self.easy_ocr_use_detected_boxes = False
+        self.easy_ocr_box_batch_size = 32
+        self.easy_ocr_batch_size = 1
+        self.easy_ocr_workers = 0
+        self.easy_ocr_size_bucket = 32
         self.ngram_replacement_threshold = 0.6
+        self.ngram_cache_size = 100000
+        self.ngram_cache_persist = True
+        self.ngram_cache_save_interval_seconds = 300
+        self.ngram_cache_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'ngram_corrections.json')
 
     @property
     def input_folder(self):
@@ -40,11 +108,27 @@ class Config:
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         return os.path.join(project_root, 'test_images')
 
+    @property
+    def effective_api_requests_per_second(self):
+        if self.api_requests_per_second is not None:
+            return self.api_requests_per_second
+        if self.request_delay_seconds > 0:
+            return 1.0 / self.request_delay_seconds
+        return None
+
     @property
     def yolo_weights_path(self):
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         return os.path.join(project_root, 'weights', 'best.pt')
 
+    @property
+    def yolo_onnx_path(self):
+        return os.path.splitext(self.yolo_weights_path)[0] + '.onnx'
+
+    @property
+    def yolo_quantized_onnx_path(self):
+        return os.path.splitext(self.yolo_weights_path)[0] + f'_int8_{self.yolo_quantization or "static"}.onnx'
+
     @property
     def yolo_cropped_vehicles_folder(self):
         return os.path.join(self.base_path, 'yolo_cropped_vehicles')
@@ -81,21 +165,41 @@ class Config:
     def log_file(self):
         return os.path.join(self.base_path, 'processing_log.txt')
 
+    def _results_file(self, folder, name):
+        extension = 'jsonl' if self.results_format == 'jsonl' else 'json'
+        return os.path.join(folder, f'{name}.{extension}')
+
+    @property
+    def metrics_file(self):
+        return os.path.join(self.base_path, 'metrics_summary.json')
+
+    @property
+    def track_results_file(self):
+        return os.path.join(self.base_path, 'track_results.json')
+
+    @property
+    def manifest_file(self):
+        return os.path.join(self.base_path, 'run_manifest.jsonl')
+
     @property
     def coordinates_file(self):
         return os.path.join(self.base_path, 'coordinates.json')
 
     @property
     def yolo_detection_results_file(self):
-        return os.path.join(self.base_path, 'yolo_detections.json')
+        return self._results_file(self.base_path, 'yolo_detections')
 
     @property
     def detection_results_file(self):
-        return os.path.join(self.base_path, 'detection_results.json')
+        return self._results_file(self.base_path, 'detection_results')
+
+    @property
+    def refined_detection_file(self):
+        return self._results_file(self.base_path, 'refined_detection_results')
 
     @property
     def processed_detection_file(self):
-        return os.path.join(self.base_path, 'processed_detection_results.json')
+        return self._results_file(self.base_path, 'processed_detection_results')
     
     @property
     def api_recognition_results_folder(self):
@@ -103,7 +207,7 @@ class Config:
 
     @property
     def recognition_results_file(self):
-        return os.path.join(self.api_recognition_results_folder, 'recognition_results.json')
+        return self._results_file(self.api_recognition_results_folder, 'recognition_results')
     
     @property
     def easy_ocr_results_folder(self):
@@ -111,7 +215,7 @@ class Config:
     
     @property
     def easy_ocr_results_file(self):
-        return os.path.join(self.easy_ocr_results_folder, 'easy_ocr_results.json')
+        return self._results_file(self.easy_ocr_results_folder, 'easy_ocr_results')
 
     @property
     def easy_ocr_vis_folder(self):
@@ -123,13 +227,24 @@ class Config:
 
     @property
     def ngram_results_file(self):
-        return os.path.join(self.ngram_results_folder, 'ngram_enriched_results.json')
+        return self._results_file(self.ngram_results_folder, 'ngram_enriched_results')
 
     def to_dict(self):
         return {
             'base_path': self.base_path,
             'input_folder': self.input_folder,
             'yolo_weights_path': self.yolo_weights_path,
+            'yolo_onnx_path': self.yolo_onnx_path,
+            'yolo_backend': self.yolo_backend,
+            'yolo_imgsz': self.yolo_imgsz,
+            'yolo_conf_threshold': self.yolo_conf_threshold,
+            'yolo_iou_threshold': self.yolo_iou_threshold,
+            'yolo_max_detections': self.yolo_max_detections,
+            'yolo_cpu_threads': self.yolo_cpu_threads,
+            'yolo_quantization': self.yolo_quantization,
+            'yolo_quantized_onnx_path': self.yolo_quantized_onnx_path,
+            'quantization_calibration_images': self.quantization_calibration_images,
+            'easy_ocr_quantize': self.easy_ocr_quantize,
             'yolo_cropped_vehicles_folder': self.yolo_cropped_vehicles_folder,
             'yolo_detection_vis_folder': self.yolo_detection_vis_folder,
             'edge_output_folder': self.edge_output_folder,
@@ -139,9 +254,11 @@ class Config:
             'corrected_output_folder': self.corrected_output_folder,
             'detection_vis_folder': self.detection_vis_folder,
             'log_file': self.log_file,
+            'manifest_file': self.manifest_file,
             'coordinates_file': self.coordinates_file,
             'yolo_detection_results_file': self.yolo_detection_results_file,
             'detection_results_file': self.detection_results_file,
+            'refined_detection_file': self.refined_detection_file,
             'processed_detection_file': self.processed_detection_file,
             'recognition_results_file': self.recognition_results_file,
             'easy_ocr_results_file': self.easy_ocr_results_file,
@@ -152,21 +269,83 @@ class Config:
             'run_edge_detection': self.run_edge_detection,
             'run_perspective_correction': self.run_perspective_correction,
             'run_text_detection': self.run_text_detection,
+            'run_box_refinement': self.run_box_refinement,
             'run_post_processing': self.run_post_processing,
             'run_text_recognition': self.run_text_recognition,
             'run_easy_ocr': self.run_easy_ocr,
             'run_ngram_post_processing': self.run_ngram_post_processing,
+            'in_memory_pipeline': self.in_memory_pipeline,
+            'save_intermediate_images': self.save_intermediate_images,
+            'results_format': self.results_format,
+            'collect_metrics': self.collect_metrics,
+            'metrics_reservoir_size': self.metrics_reservoir_size,
+            'write_metrics_summary': self.write_metrics_summary,
+            'metrics_file': self.metrics_file,
+            'streaming_pipeline': self.streaming_pipeline,
+            'streaming_queue_size': self.streaming_queue_size,
+            'streaming_yolo_workers': self.streaming_yolo_workers,
+            'streaming_perspective_workers': self.streaming_perspective_workers,
+            'perspective_workers': self.perspective_workers,
+            'streaming_detection_workers': self.streaming_detection_workers,
+            'streaming_recognition_workers': self.streaming_recognition_workers,
+            'save_visualizations': self.save_visualizations,
+            'visualization_sample_rate': self.visualization_sample_rate,
+            'visualization_background': self.visualization_background,
+            'visualization_queue_size': self.visualization_queue_size,
+            'tracking_enabled': self.tracking_enabled,
+            'tracking_iou_threshold': self.tracking_iou_threshold,
+            'tracking_max_centroid_distance': self.tracking_max_centroid_distance,
+            'tracking_max_age': self.tracking_max_age,
+            'tracking_best_crops': self.tracking_best_crops,
+            'track_results_file': self.track_results_file,
+            'video_sample_fps': self.video_sample_fps,
+            'video_max_frames': self.video_max_frames,
+            'video_realtime': self.video_realtime,
+            'video_motion_gating': self.video_motion_gating,
+            'video_motion_pixel_threshold': self.video_motion_pixel_threshold,
+            'video_motion_min_fraction': self.video_motion_min_fraction,
+            'video_motion_downscale_width': self.video_motion_downscale_width,
+            'video_keyframe_interval_seconds': self.video_keyframe_interval_seconds,
+            'streaming_easy_ocr_workers': self.streaming_easy_ocr_workers,
             'request_delay_seconds': self.request_delay_seconds,
+            'api_requests_per_second': self.effective_api_requests_per_second,
+            'api_rate_burst': self.api_rate_burst,
+            'api_max_in_flight': self.api_max_in_flight,
+            'api_timeout_seconds': self.api_timeout_seconds,
+            'payload_jpeg_quality': self.payload_jpeg_quality,
+            'payload_max_side': self.payload_max_side,
+            'payload_reuse_source_jpeg': self.payload_reuse_source_jpeg,
+            'ocr_cassette_mode': self.ocr_cassette_mode,
+            'ocr_cassette_file': self.ocr_cassette_file,
+            'yolo_batch_size': self.yolo_batch_size,
             'horizontal_padding_ratio': self.horizontal_padding_ratio,
             'vertical_padding_ratio': self.vertical_padding_ratio,
             'min_horizontal_pad': self.min_horizontal_pad,
             'max_horizontal_pad': self.max_horizontal_pad,
             'min_vertical_pad': self.min_vertical_pad,
             'max_vertical_pad': self.max_vertical_pad,
+            'result_cache_enabled': self.result_cache_enabled,
+            'result_cache_dir': self.result_cache_dir,
+            'result_cache_max_bytes': self.result_cache_max_bytes,
             'easy_ocr_languages': self.easy_ocr_languages,
+            'easy_ocr_use_detected_boxes': self.easy_ocr_use_detected_boxes,
+            'easy_ocr_box_batch_size': self.easy_ocr_box_batch_size,
+            'easy_ocr_batch_size': self.easy_ocr_batch_size,
+            'easy_ocr_workers': self.easy_ocr_workers,
+            'easy_ocr_size_bucket': self.easy_ocr_size_bucket,
             'ngram_replacement_threshold': self.ngram_replacement_threshold, 
+            'ngram_cache_size': self.ngram_cache_size,
+            'ngram_cache_persist': self.ngram_cache_persist,
+            'ngram_cache_file': self.ngram_cache_file,
+            'ngram_cache_save_interval_seconds': self.ngram_cache_save_interval_seconds,
         }
 
+    def with_paths(self, base_path, input_folder_override=None):
+        config = copy.copy(self)
+        config.base_path = base_path
+        config._input_folder_override = input_folder_override
+        return config
+
     def update_api_config(self, detection_url=None, recognition_url=None, api_key=None):
         if detection_url:
             self.detection_api_url = detection_url
@@ -1,8 +1,16 @@
 import os
+import argparse
 from config.config import Config
 from vde.processor import DocumentProcessor
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the VDE number plate pipeline on a local folder.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from its manifest instead of starting over.")
+    parser.add_argument('--video', metavar='SOURCE',
+                        help="Process frames from a video file, stream URL or camera index instead of the image folder.")
+    args = parser.parse_args()
+
     project_root = os.path.dirname(os.path.abspath(__file__))
     
     base_output_directory = os.path.join(project_root, "output")
@@ -27,7 +35,13 @@ def main():
 
     processor = DocumentProcessor(config)
 
-    processor.run_full_pipeline()
+    try:
+        if args.video:
+            processor.run_video_pipeline(args.video, resume=args.resume)
+        else:
+            processor.run_full_pipeline(resume=args.resume)
+    finally:
+        processor.close()
 
     print("\nProcessing complete! Check the 'output' folder for results.")
 
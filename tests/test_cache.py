@@ -0,0 +1,63 @@
+import os
+import numpy as np
+from vde.cache import ResultCache, hash_image
+
+
+def test_make_key_is_stable_and_part_sensitive():
+    key = ResultCache.make_key("easy_ocr", "abc", ["en"], 640)
+    assert key == ResultCache.make_key("easy_ocr", "abc", ["en"], 640)
+    assert key != ResultCache.make_key("easy_ocr", "abc", ["en"], 320)
+    assert key != ResultCache.make_key("easy_ocr", "abc", ["en"], 640, True)
+    assert key != ResultCache.make_key("easy_ocr_boxes", "abc", ["en"], 640)
+    assert ResultCache.make_key("s", "ab", "c") != ResultCache.make_key("s", "a", "bc")
+    assert ResultCache.make_key("s", {"b": 1, "a": 2}) == ResultCache.make_key("s", {"a": 2, "b": 1})
+
+
+def test_hash_image_covers_shape_and_dtype():
+    image = np.zeros((4, 6), dtype=np.uint8)
+    assert hash_image(image) == hash_image(image.copy())
+    assert hash_image(image) != hash_image(image.reshape(6, 4))
+    assert hash_image(image) != hash_image(image.astype(np.int8))
+
+
+def test_result_cache_round_trip_and_disabled(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    assert cache.get("yolo", "k1") == (False, None)
+    cache.set("yolo", "k1", [[1, 2, 3, 4]])
+    assert cache.get("yolo", "k1") == (True, [[1, 2, 3, 4]])
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    disabled = ResultCache(str(tmp_path), max_bytes=1 << 20, enabled=False)
+    disabled.set("yolo", "k2", 1)
+    assert disabled.get("yolo", "k1") == (False, None)
+    assert cache.get("yolo", "k2") == (False, None)
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10_000)
+    value = "x" * 1000
+    for i in range(5):
+        cache.set("stage", f"key{i}", value)
+        path = cache._path("stage", f"key{i}")
+        os.utime(path, (i, i))
+    os.utime(cache._path("stage", "key0"), (100, 100))
+
+    for i in range(5, 12):
+        cache.set("stage", f"key{i}", value)
+        os.utime(cache._path("stage", f"key{i}"), (100 + i, 100 + i))
+
+    assert cache._scan_size() <= 10_000
+    assert cache.get("stage", "key11")[0]
+    assert not cache.get("stage", "key1")[0]
+
+
+def test_result_cache_tracks_size_across_instances_and_overwrites(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    cache.set("stage", "key0", "x" * 100)
+    cache.set("stage", "key0", "x" * 100)
+    cache.set("stage", "key1", "y" * 50)
+    assert cache.total_bytes == cache._scan_size()
+
+    reopened = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    assert reopened.total_bytes == cache.total_bytes
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
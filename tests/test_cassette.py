@@ -0,0 +1,10 @@
+from config.config import Config
+from vde.cache import ResultCache
+
+
+def test_ocr_api_cache_is_disabled_while_recording(tmp_path):
+    config = Config(base_path=str(tmp_path))
+    shared = ResultCache.from_config(config)
+    assert ResultCache.for_ocr_api(config, shared) is shared
+    config.ocr_cassette_mode = 'record'
+    assert not ResultCache.for_ocr_api(config, shared).enabled
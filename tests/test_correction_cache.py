@@ -0,0 +1,48 @@
+import os
+from vde.correction_cache import CorrectionCache
+
+
+def test_correction_cache_saves_only_when_dirty(tmp_path):
+    cache_file = str(tmp_path / "corrections.json")
+    cache = CorrectionCache(10, cache_file=cache_file)
+    cache.reset("fp1")
+    assert not cache.save()
+    assert not os.path.exists(cache_file)
+
+    cache.set("ঢাকা", {"matched_target": "ঢাকা"})
+    assert cache.save()
+    assert not cache.save()
+    cache.set("সিলেট", {"matched_target": "সিলেট"})
+    assert not cache.save(min_interval=3600)
+    assert cache.save()
+    assert [name for name in os.listdir(tmp_path)] == ["corrections.json"]
+
+    reloaded = CorrectionCache(10, cache_file=cache_file)
+    reloaded.reset("fp1")
+    assert reloaded.get("ঢাকা") == (True, {"matched_target": "ঢাকা"})
+    assert not reloaded.dirty
+
+    other_fingerprint = CorrectionCache(10, cache_file=cache_file)
+    other_fingerprint.reset("fp2")
+    assert other_fingerprint.get("ঢাকা") == (False, None)
+
+
+def test_correction_cache_evicts_oldest_entry():
+    cache = CorrectionCache(2)
+    cache.reset("fp")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1) and cache.get("c") == (True, 3)
+
+
+def test_correction_cache_clear_drops_entries_and_counters():
+    cache = CorrectionCache(10)
+    cache.set("ঢাকা", {"matched_target": "ঢাকা"})
+    cache.get("ঢাকা")
+    cache.get("সিলেট")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
+    assert cache.get("ঢাকা") == (False, None)
@@ -0,0 +1,54 @@
+import numpy as np
+from vde.detector_backends import letterbox, non_max_suppression
+
+
+def test_letterbox_pads_to_square_and_keeps_aspect_ratio():
+    image = np.full((300, 600, 3), 255, dtype=np.uint8)
+    padded, ratio, (left, top) = letterbox(image, 640)
+    assert padded.shape == (640, 640, 3)
+    assert ratio == 640 / 600
+    assert left == 0 and top == 160
+    assert (padded[:top] == 114).all() and (padded[top + 320:] == 114).all()
+    assert (padded[top:top + 320] == 255).all()
+
+
+def test_letterbox_maps_boxes_back_to_original_coordinates():
+    image = np.zeros((480, 360, 3), dtype=np.uint8)
+    padded, ratio, (left, top) = letterbox(image, 320)
+    assert padded.shape[:2] == (320, 320)
+    x, y = 180, 240
+    padded_x, padded_y = x * ratio + left, y * ratio + top
+    assert abs((padded_x - left) / ratio - x) < 1e-6 and abs((padded_y - top) / ratio - y) < 1e-6
+
+
+def test_letterbox_leaves_exact_size_unchanged():
+    image = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    padded, ratio, pad = letterbox(image, 64)
+    assert ratio == 1.0 and pad == (0, 0)
+    assert (padded == image).all()
+
+
+def test_nms_suppresses_overlapping_boxes_of_the_same_class():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [200, 200, 260, 260]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.7], dtype=np.float32)
+    class_ids = np.array([0, 0, 0])
+    keep = non_max_suppression(boxes, scores, class_ids, iou_threshold=0.5, max_detections=10)
+    assert keep.tolist() == [1, 2]
+
+
+def test_nms_keeps_overlapping_boxes_of_different_classes():
+    boxes = np.array([[0, 0, 100, 100], [0, 0, 100, 100]], dtype=np.float32)
+    scores = np.array([0.6, 0.9], dtype=np.float32)
+    keep = non_max_suppression(boxes, scores, np.array([0, 1]), iou_threshold=0.5, max_detections=10)
+    assert keep.tolist() == [1, 0]
+
+
+def test_nms_respects_iou_threshold_and_max_detections():
+    boxes = np.array([[0, 0, 100, 100], [50, 0, 150, 100], [300, 300, 310, 310], [400, 400, 410, 410]],
+                     dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+    class_ids = np.zeros(4, dtype=int)
+    assert non_max_suppression(boxes, scores, class_ids, 0.5, 10).tolist() == [0, 1, 2, 3]
+    assert non_max_suppression(boxes, scores, class_ids, 0.3, 10).tolist() == [0, 2, 3]
+    assert non_max_suppression(boxes, scores, class_ids, 0.3, 2).tolist() == [0, 2]
+    assert non_max_suppression(boxes[:0], scores[:0], class_ids[:0], 0.5, 10).tolist() == []
@@ -0,0 +1,54 @@
+import random
+from difflib import SequenceMatcher
+from vde.fuzzy_matcher import IndexedPhraseMatcher
+
+TARGETS = ['ঢাকা মেট্রো', 'চট্ট মেট্রো', 'রাজ মেট্রো', 'ঢাকা', 'চট্টগ্রাম', 'রাজশাহী', 'খুলনা', 'সিলেট',
+           'ময়মনসিংহ', 'নরসিংদী', 'কক্সবাজার', 'চাঁপাইনবাবগঞ্জ']
+
+
+def _brute_force(phrases, targets, threshold):
+    best = (None, None, None)
+    best_score = float('-inf')
+    for phrase in phrases:
+        for target in targets:
+            sim = SequenceMatcher(None, phrase, target).ratio()
+            if sim > best_score and sim >= threshold:
+                best = (phrase, target, sim)
+                best_score = sim
+    return best
+
+
+def _phrases(words, max_n=3):
+    return [' '.join(words[i:i + n]) for n in range(1, max_n + 1) for i in range(len(words) - n + 1)]
+
+
+def _mutate(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        op = rng.random()
+        position = rng.randrange(len(chars) + 1)
+        if op < 0.4 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif op < 0.7:
+            chars.insert(position, rng.choice('০১২৩৪৫-কখগ'))
+        elif chars:
+            chars[min(position, len(chars) - 1)] = rng.choice('অআইকগমট')
+    return ''.join(chars) or 'ক'
+
+
+def test_indexed_matcher_matches_brute_force():
+    rng = random.Random(1234)
+    matcher = IndexedPhraseMatcher(TARGETS)
+    for _ in range(500):
+        words = []
+        for _ in range(rng.randint(1, 5)):
+            words.extend(_mutate(rng, rng.choice(TARGETS + ['১২-৩৪৫৬', 'গ', 'ঘ'])).split())
+        phrases = _phrases(words)
+        for threshold in (0.0, 0.6, 0.9):
+            assert matcher.best_match(phrases, threshold) == _brute_force(phrases, TARGETS, threshold)
+
+
+def test_indexed_matcher_returns_none_below_threshold():
+    matcher = IndexedPhraseMatcher(TARGETS)
+    assert matcher.best_match(['xyz'], 0.6) == (None, None, None)
+    assert matcher.best_match([], 0.6) == (None, None, None)
@@ -0,0 +1,27 @@
+from vde.manifest import RunManifest
+
+
+def test_run_manifest_resume(tmp_path):
+    path = str(tmp_path / "run_manifest.jsonl")
+    manifest = RunManifest(path)
+    manifest.mark_done("yolo", "a.jpg", [{"bbox": [1, 2, 3, 4]}])
+    manifest.mark_done("easy_ocr", "a.jpg", {"easy_ocr_results": []})
+    manifest.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"stage": "yolo", "image": "b.jpg"')
+
+    resumed = RunManifest(path, resume=True)
+    assert resumed.is_done("yolo", "a.jpg") and not resumed.is_done("yolo", "b.jpg")
+    assert resumed.result("yolo", "a.jpg") == [{"bbox": [1, 2, 3, 4]}]
+    assert resumed.result("easy_ocr", "a.jpg") == {"easy_ocr_results": []}
+    resumed.mark_done("yolo", "c.jpg", [])
+    resumed.close()
+
+    # The entry written after the truncated line must survive the next resume.
+    reloaded = RunManifest(path, resume=True)
+    assert reloaded.is_done("yolo", "c.jpg") and not reloaded.is_done("yolo", "b.jpg")
+    reloaded.close()
+
+    fresh = RunManifest(path, resume=False)
+    assert not fresh.is_done("yolo", "a.jpg")
+    fresh.close()
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from vde import http_client
+from vde.http_client import TokenBucketRateLimiter, AsyncTokenBucketRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+
+def _patch_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client, "time", SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    monkeypatch.setattr(http_client.asyncio, "sleep", clock.async_sleep)
+    return clock
+
+
+def test_rate_limiter_allows_burst_then_paces(monkeypatch):
+    clock = _patch_clock(monkeypatch)
+    limiter = TokenBucketRateLimiter(requests_per_second=2.0, burst=3)
+    start = clock.now
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.now == start
+
+    for _ in range(4):
+        limiter.acquire()
+    assert abs((clock.now - start) - 2.0) < 1e-9
+
+
+def test_rate_limiter_refills_while_idle(monkeypatch):
+    clock = _patch_clock(monkeypatch)
+    limiter = TokenBucketRateLimiter(requests_per_second=1.0, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 10
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert abs(sum(clock.sleeps) - 1.0) < 1e-9
+
+
+def test_rate_limiter_without_rate_never_waits(monkeypatch):
+    clock = _patch_clock(monkeypatch)
+    limiter = TokenBucketRateLimiter(requests_per_second=None)
+    for _ in range(100):
+        limiter.acquire()
+    assert clock.sleeps == []
+
+
+def test_async_rate_limiter_paces(monkeypatch):
+    clock = _patch_clock(monkeypatch)
+
+    async def run():
+        limiter = AsyncTokenBucketRateLimiter(requests_per_second=4.0, burst=1)
+        await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+
+    start = clock.now
+    asyncio.run(run())
+    assert abs((clock.now - start) - 1.0) < 1e-9
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from config.config import Config
+from vde.record import ImageRecord
+from vde.result_sink import ResultIndex
+from vde.streaming import StreamingPipeline
+
+
+class _FailingCorrector:
+    def correct_record(self, record, output_directory):
+        if record.name == "bad.jpg":
+            raise ValueError("warp failed")
+        return record
+
+
+def _processor(tmp_path, results_format):
+    config = Config(base_path=str(tmp_path))
+    config.results_format = results_format
+    config.run_yolo_detection = False
+    config.run_text_detection = False
+    config.run_box_refinement = False
+    config.run_post_processing = False
+    config.run_text_recognition = False
+    config.run_easy_ocr = False
+    config.run_perspective_correction = True
+    config.run_ngram_post_processing = True
+    config.save_intermediate_images = False
+    return SimpleNamespace(
+        config=config,
+        perspective_corrector=_FailingCorrector(),
+        ngram_postprocessor=SimpleNamespace(enrich_image_results=lambda results: [],
+                                            correction_cache_summary=lambda: "", save_correction_cache=lambda: None),
+        manifest=None,
+        natural_sort_key=lambda name: name,
+    )
+
+
+@pytest.mark.parametrize("results_format", ["json", "jsonl"])
+def test_streaming_results_include_failed_records(tmp_path, results_format):
+    processor = _processor(tmp_path, results_format)
+    records = [ImageRecord(name, np.zeros((8, 8, 3), dtype=np.uint8)) for name in ("good.jpg", "bad.jpg")]
+
+    results = StreamingPipeline(processor).run(records=iter(records))
+
+    assert isinstance(results, ResultIndex) == (results_format == "jsonl")
+    assert sorted(results.keys()) == ["bad.jpg", "good.jpg"]
+    assert results.get("bad.jpg") == {"error": "Perspective: warp failed"}
+    assert results.get("good.jpg") == {}
+    if isinstance(results, ResultIndex):
+        results.close()
+
+
+def test_streaming_reraises_producer_error_after_draining(tmp_path):
+    processor = _processor(tmp_path, "json")
+
+    def records():
+        yield ImageRecord("good.jpg", np.zeros((8, 8, 3), dtype=np.uint8))
+        raise OSError("disk went away")
+
+    with pytest.raises(OSError, match="disk went away"):
+        StreamingPipeline(processor).run(records=records())
+
+
+def test_streaming_survives_failing_error_logger(tmp_path):
+    processor = _processor(tmp_path, "json")
+    pipeline = StreamingPipeline(processor)
+
+    def broken_on_error(stage_name, record, e):
+        raise OSError("log file closed")
+
+    pipeline._on_error = broken_on_error
+    records = [ImageRecord(name, np.zeros((8, 8, 3), dtype=np.uint8)) for name in ("good.jpg", "bad.jpg")]
+
+    results = pipeline.run(records=iter(records))
+
+    assert results.get("bad.jpg") == {"error": "Perspective: warp failed"}
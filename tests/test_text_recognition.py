@@ -0,0 +1,41 @@
+from concurrent.futures import Future
+import numpy as np
+from config.config import Config
+from vde.cache import ResultCache
+from vde.cassette import CassetteMissError
+from vde.record import ImageRecord
+from vde.text_recognition import TextRecognizer
+
+
+class _FakeClient:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+
+    def imap(self, fn, items):
+        for item in items:
+            future = Future()
+            outcome = self.outcomes[item[0]]
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+            yield item, future
+
+
+def test_recognition_records_decode_and_cassette_errors_as_failed_rows(tmp_path):
+    config = Config(base_path=str(tmp_path))
+    client = _FakeClient({
+        "good.jpg": [{"text": "ABC"}],
+        "garbled.jpg": ValueError("Expecting value: line 1 column 1 (char 0)"),
+        "unrecorded.jpg": CassetteMissError("No recorded response"),
+    })
+    recognizer = TextRecognizer(config, http_client=client, result_cache=ResultCache(str(tmp_path), 0, enabled=False))
+    records = [ImageRecord(name, np.zeros((8, 8, 3), dtype=np.uint8)) for name in client.outcomes]
+    bbox_data = {name: [[0, 0, 4, 4]] for name in client.outcomes}
+
+    results = recognizer.process_text_recognition(None, None, str(tmp_path / "recognition.json"),
+                                                  str(tmp_path / "recognition.log"), records=records, bbox_data=bbox_data)
+
+    assert results["good.jpg"]["recognized_texts"] == [[{"text": "ABC"}]]
+    assert results["garbled.jpg"] == {"error": "Expecting value: line 1 column 1 (char 0)"}
+    assert results["unrecorded.jpg"] == {"error": "No recorded response"}
@@ -0,0 +1,67 @@
+import numpy as np
+from vde.record import ImageRecord
+from vde.tracking import PlateTracker, box_iou, consolidate_tracks
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+def _crop(frame_name, index, bbox, confidence=0.9, class_name="car", sharp=True):
+    rng = np.random.default_rng(index)
+    size = (bbox[3] - bbox[1], bbox[2] - bbox[0], 3)
+    image = rng.integers(0, 255, size, dtype=np.uint8) if sharp else np.full(size, 128, dtype=np.uint8)
+    return ImageRecord(f"{frame_name}_{index}.jpg", image, source_name=frame_name, metadata={
+        "yolo_detection": {"bbox": bbox, "class": class_name, "confidence": confidence}
+    })
+
+
+def test_box_iou():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+    assert abs(box_iou([0, 0, 10, 10], [5, 0, 15, 10]) - 1 / 3) < 1e-9
+
+
+def test_tracker_links_moving_box_and_keeps_best_crop():
+    tracker = PlateTracker(iou_threshold=0.3, max_centroid_distance=0.05, max_age=2, best_crops=1)
+    crops = []
+    for frame in range(4):
+        x = 100 + 10 * frame
+        crop = _crop(f"f{frame}", frame, [x, 100, x + 80, 160], sharp=frame != 2)
+        crops.append(crop)
+        assert tracker.update(f"f{frame}", FRAME_SHAPE, [crop]) == []
+
+    finished = tracker.flush()
+    assert len(finished) == 1
+    track = finished[0]
+    assert track.hits == 4 and track.first_frame == "f0" and track.last_frame == "f3"
+    assert all(crop.metadata["track_id"] == track.track_id for crop in crops)
+    assert tracker.select_crops(finished)[0] is not crops[2]
+    assert tracker.stats() == {"tracks": 1, "crops": 4, "selected_crops": 1}
+
+
+def test_tracker_separates_classes_and_expires_old_tracks():
+    tracker = PlateTracker(iou_threshold=0.3, max_centroid_distance=0.0, max_age=1, best_crops=2)
+    tracker.update("f0", FRAME_SHAPE, [_crop("f0", 0, [0, 0, 50, 50]), _crop("f0", 1, [0, 0, 50, 50], class_name="bus")])
+    assert len(tracker.active) == 2
+
+    tracker.update("f1", FRAME_SHAPE, [])
+    expired = tracker.update("f2", FRAME_SHAPE, [_crop("f2", 2, [300, 300, 350, 350])])
+    assert sorted(track.class_name for track in expired) == ["bus", "car"]
+    assert len(tracker.active) == 1
+
+
+def test_consolidate_tracks_votes_on_text():
+    tracker = PlateTracker(best_crops=3)
+    crops = [_crop(f"f{i}", i, [100, 100, 180, 160]) for i in range(3)]
+    for i, crop in enumerate(crops):
+        tracker.update(f"f{i}", FRAME_SHAPE, [crop])
+    tracks = tracker.flush()
+
+    def easy(text, confidence):
+        return {"easy_ocr_recognition": {"easy_ocr_results": [{"bbox": [0, 0, 1, 1], "text": text, "confidence": confidence}]}}
+
+    results = {crops[0].name: easy("ঢাকা মেট্রো", 0.6), crops[1].name: easy("ঢাকা মেট্রো", 0.5),
+               crops[2].name: easy("ঢাকা মেট্রা", 0.9)}
+    consolidated = consolidate_tracks(tracks, results)
+    vote = consolidated[str(tracks[0].track_id)]["easy_ocr_recognition"]
+    assert vote == {"text": "ঢাকা মেট্রো", "confidence": 0.55, "votes": 2}
+    assert consolidated[str(tracks[0].track_id)]["main_recognition"] is None
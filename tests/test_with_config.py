@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+import pytest
+from config.config import Config
+from vde.visualizer import VisualizationWriter
+from vde.text_detection import TextDetector
+from vde.text_recognition import TextRecognizer
+from vde.ngram_postprocessor import NgramPostprocessor
+
+
+def _configs(tmp_path):
+    app_config = Config(base_path=str(tmp_path / "app"))
+    app_config.ngram_cache_persist = False
+    app_config.result_cache_enabled = False
+    request_config = app_config.with_paths(str(tmp_path / "request"))
+    request_config.save_visualizations = False
+    request_config.ngram_replacement_threshold = 0.95
+    request_config.update_api_config(detection_url="http://request/detect", recognition_url="http://request/recognize")
+    return app_config, request_config
+
+
+def test_visualization_writer_copy_shares_thread(tmp_path):
+    app_config, request_config = _configs(tmp_path)
+    writer = VisualizationWriter(app_config)
+    request_writer = writer.with_config(request_config)
+    assert writer.wants("a.jpg") and not request_writer.wants("a.jpg")
+
+    written = []
+    writer.submit(written.append, 1)
+    writer.flush()
+    request_writer.submit(written.append, 2)
+    request_writer.flush()
+    assert written == [1, 2]
+    assert writer.state is request_writer.state and writer.written == 2
+    writer.close()
+
+
+def test_processor_with_config_reaches_stages(tmp_path):
+    pytest.importorskip("easyocr")
+    from vde.processor import DocumentProcessor
+
+    app_config, request_config = _configs(tmp_path)
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.config = app_config
+    processor.manifest = None
+    processor.visualizer = VisualizationWriter(app_config)
+    processor.yolo_detector = SimpleNamespace(config=app_config, visualizer=processor.visualizer)
+    processor.easy_ocr_recognizer = SimpleNamespace(config=app_config, visualizer=processor.visualizer)
+    processor.text_detector = TextDetector(app_config, visualizer=processor.visualizer)
+    processor.text_recognizer = TextRecognizer(app_config)
+    processor.ngram_postprocessor = NgramPostprocessor(app_config)
+
+    request_processor = processor.with_config(request_config)
+
+    for name in ("yolo_detector", "text_detector", "text_recognizer", "easy_ocr_recognizer", "ngram_postprocessor"):
+        assert getattr(request_processor, name).config is request_config
+        assert getattr(processor, name).config is app_config
+    assert request_processor.text_detector.detection_api_url == "http://request/detect"
+    assert request_processor.text_recognizer.recognition_api_url == "http://request/recognize"
+    assert request_processor.ngram_postprocessor.replacement_threshold == 0.95
+    assert request_processor.text_detector.visualizer is request_processor.visualizer
+    assert not request_processor.visualizer.wants("a.jpg") and processor.visualizer.wants("a.jpg")
+    assert request_processor.text_recognizer.http_client is processor.text_recognizer.http_client
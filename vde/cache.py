@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from config.config import Config
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_image(image):
+    digest = hashlib.sha256()
+    digest.update(str((image.shape, str(image.dtype))).encode())
+    digest.update(np.ascontiguousarray(image).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir, max_bytes, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        # Sized once up front and tracked incrementally, so set() never walks the tree while holding the lock.
+        self.total_bytes = self._scan_size() if enabled else 0
+        self.evicting = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Config):
+        return cls(config.result_cache_dir, config.result_cache_max_bytes, enabled=config.result_cache_enabled)
+
+    @classmethod
+    def for_ocr_api(cls, config: Config, result_cache=None):
+        # Cache hits never reach the HTTP client, so while recording a cassette the API stages skip the cache.
+        if config.ocr_cassette_mode == 'record':
+            return cls(config.result_cache_dir, config.result_cache_max_bytes, enabled=False)
+        return result_cache if result_cache is not None else cls.from_config(config)
+
+    @staticmethod
+    def make_key(stage, *parts):
+        digest = hashlib.sha256(stage.encode())
+        for part in parts:
+            if isinstance(part, bytes):
+                digest.update(part)
+            elif isinstance(part, str):
+                digest.update(part.encode())
+            else:
+                digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode())
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, key[:2], f"{key}.json")
+
+    def get(self, stage, key):
+        if not self.enabled:
+            return False, None
+        path = self._path(stage, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            with self.lock:
+                self.misses += 1
+            return False, None
+        with self.lock:
+            self.hits += 1
+        return True, entry["value"]
+
+    def set(self, stage, key, value):
+        if not self.enabled:
+            return
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"stage": stage, "value": value}, ensure_ascii=False).encode('utf-8')
+        tmp_file = tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), suffix='.tmp', delete=False)
+        try:
+            with tmp_file:
+                tmp_file.write(data)
+            try:
+                replaced_bytes = os.path.getsize(path)
+            except OSError:
+                replaced_bytes = 0
+            os.replace(tmp_file.name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_file.name)
+            except OSError:
+                pass
+            raise
+
+        with self.lock:
+            self.total_bytes += len(data) - replaced_bytes
+            if self.total_bytes <= self.max_bytes or self.evicting:
+                return
+            self.evicting = True
+        try:
+            self._evict()
+        finally:
+            with self.lock:
+                self.evicting = False
+
+    def get_or_compute(self, stage, key, compute):
+        hit, value = self.get(stage, key)
+        if hit:
+            return value
+        value = compute()
+        self.set(stage, key, value)
+        return value
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if filename.endswith('.json'):
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _scan_size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        # Runs outside the lock; other threads keep adding to total_bytes while the tree is walked.
+        target_bytes = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        scanned_bytes = sum(size for _, _, size in entries)
+        removed_bytes = 0
+        for path, _, size in entries:
+            if scanned_bytes - removed_bytes <= target_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed_bytes += size
+            except OSError:
+                pass
+        with self.lock:
+            self.total_bytes = max(0, self.total_bytes - removed_bytes)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            hit_rate = self.hits / lookups if lookups else 0.0
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate}
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import threading
+from urllib.parse import urlparse
+import requests
+from config.config import Config
+
+
+class CassetteMissError(requests.exceptions.RequestException):
+    pass
+
+
+class OCRCassette:
+    def __init__(self, path, mode):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown OCR cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.replayed = 0
+        self.recorded = 0
+        self._file = None
+
+        if os.path.exists(path):
+            self._load()
+        elif self.replaying:
+            raise FileNotFoundError(f"OCR cassette not found at {path}")
+
+        if mode == 'record':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def from_config(cls, config: Config):
+        if not config.ocr_cassette_mode:
+            return None
+        return cls(config.ocr_cassette_file, config.ocr_cassette_mode)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.responses[entry["key"]] = entry["response"]
+
+    @staticmethod
+    def key(url, payload):
+        digest = hashlib.sha256(urlparse(url).path.encode())
+        digest.update(b'\x00')
+        digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode())
+        return digest.hexdigest()
+
+    def replay(self, key, url):
+        with self.lock:
+            if key not in self.responses:
+                raise CassetteMissError(f"No recorded response for {urlparse(url).path} (payload {key[:12]})")
+            self.replayed += 1
+            return self.responses[key]
+
+    def record(self, key, url, response):
+        line = json.dumps({"key": key, "endpoint": urlparse(url).path, "response": response}, ensure_ascii=False)
+        with self.lock:
+            if key in self.responses:
+                return
+            self.responses[key] = response
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class CorrectionCache:
+    def __init__(self, max_entries, cache_file=None):
+        self.max_entries = max_entries
+        self.cache_file = cache_file
+        self.fingerprint = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = False
+        self.last_saved = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_fingerprint(targets, max_n, matching_threshold):
+        payload = json.dumps([list(targets), max_n, matching_threshold], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def reset(self, fingerprint):
+        with self.lock:
+            self.fingerprint = fingerprint
+            self.entries.clear()
+            self.dirty = False
+        self.load()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.dirty = False
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, text):
+        with self.lock:
+            if text in self.entries:
+                self.entries.move_to_end(text)
+                self.hits += 1
+                return True, self.entries[text]
+            self.misses += 1
+            return False, None
+
+    def set(self, text, value):
+        with self.lock:
+            self.entries[text] = value
+            self.entries.move_to_end(text)
+            self.dirty = True
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not read n-gram correction cache {self.cache_file}: {e}")
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            return
+        with self.lock:
+            for text, value in data.get("entries", [])[-self.max_entries:]:
+                self.entries[text] = value
+
+    def save(self, min_interval=None):
+        if not self.cache_file:
+            return False
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return False
+                if min_interval and self.last_saved is not None and time.monotonic() - self.last_saved < min_interval:
+                    return False
+                data = {"fingerprint": self.fingerprint, "entries": list(self.entries.items())}
+                self.dirty = False
+                self.last_saved = time.monotonic()
+
+            directory = os.path.dirname(self.cache_file) or '.'
+            os.makedirs(directory, exist_ok=True)
+            tmp_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False)
+            try:
+                with tmp_file:
+                    json.dump(data, tmp_file, ensure_ascii=False)
+                os.replace(tmp_file.name, self.cache_file)
+            except BaseException:
+                with self.lock:
+                    self.dirty = True
+                try:
+                    os.unlink(tmp_file.name)
+                except OSError:
+                    pass
+                raise
+        return True
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            hit_rate = self.hits / lookups if lookups else 0.0
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate, "entries": len(self.entries)}
@@ -0,0 +1,205 @@
+import os
+import ast
+import json
+import shutil
+import argparse
+import cv2
+import numpy as np
+from config.config import Config
+
+
+def export_onnx(weights_path, onnx_path, imgsz=640):
+    from ultralytics import YOLO
+    model = YOLO(weights_path)
+    exported_path = model.export(format="onnx", imgsz=imgsz, dynamic=True)
+    if os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+        os.makedirs(os.path.dirname(onnx_path) or '.', exist_ok=True)
+        shutil.move(exported_path, onnx_path)
+    with open(metadata_path(onnx_path), 'w', encoding='utf-8') as f:
+        json.dump({"names": {int(k): v for k, v in model.names.items()}, "imgsz": imgsz}, f, indent=2, ensure_ascii=False)
+    print(f"Exported {weights_path} to ONNX: {onnx_path}")
+    return onnx_path
+
+
+def metadata_path(onnx_path):
+    return os.path.splitext(onnx_path)[0] + '_metadata.json'
+
+
+def letterbox(image, size, color=(114, 114, 114)):
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def non_max_suppression(boxes, scores, class_ids, iou_threshold, max_detections):
+    # Offsetting boxes by class id keeps NMS per class in a single pass, as ultralytics does.
+    shifted = boxes + class_ids[:, None] * 7680.0
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size and len(keep) < max_detections:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(shifted[i, 0], shifted[rest, 0])
+        yy1 = np.maximum(shifted[i, 1], shifted[rest, 1])
+        xx2 = np.minimum(shifted[i, 2], shifted[rest, 2])
+        yy2 = np.minimum(shifted[i, 3], shifted[rest, 3])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[i] + areas[rest] - intersection + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+class UltralyticsBackend:
+    name = "ultralytics"
+
+    def __init__(self, config: Config):
+        from ultralytics import YOLO
+        self.config = config
+        self.model = YOLO(self.config.yolo_weights_path)
+        self.names = self.model.names
+        self.model_path = self.config.yolo_weights_path
+
+    def predict(self, images):
+        results = self.model(images, verbose=False, imgsz=self.config.yolo_imgsz, conf=self.config.yolo_conf_threshold,
+                             iou=self.config.yolo_iou_threshold, max_det=self.config.yolo_max_detections)
+        all_boxes = []
+        for result in results:
+            boxes = []
+            for box in result.boxes:
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                boxes.append([x1, y1, x2, y2, float(box.conf[0]), self.names[int(box.cls[0])]])
+            all_boxes.append(boxes)
+        return all_boxes
+
+
+class _ExportedBackend:
+    def __init__(self, config: Config):
+        self.config = config
+        self.model_path = self.config.yolo_onnx_path
+        if not os.path.exists(self.model_path):
+            export_onnx(self.config.yolo_weights_path, self.model_path, imgsz=self.config.yolo_imgsz)
+        if self.config.yolo_quantization:
+            self.model_path = self.config.yolo_quantized_onnx_path
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"Quantized YOLO model not found at {self.model_path}. Create it with: "
+                                        f"python -m vde.quantization calibrate --mode {self.config.yolo_quantization}")
+        self.imgsz = self.config.yolo_imgsz
+        self.names = self._load_names()
+
+    def _load_names(self):
+        if os.path.exists(metadata_path(self.config.yolo_onnx_path)):
+            with open(metadata_path(self.config.yolo_onnx_path), 'r', encoding='utf-8') as f:
+                return {int(k): v for k, v in json.load(f)["names"].items()}
+        return {}
+
+    def _preprocess(self, images):
+        batch = []
+        transforms = []
+        for image in images:
+            padded, ratio, pad = letterbox(image, self.imgsz)
+            batch.append(cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1))
+            transforms.append((ratio, pad, image.shape[:2]))
+        return np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255.0, transforms
+
+    def _postprocess(self, output, transform):
+        ratio, (pad_x, pad_y), (height, width) = transform
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = scores > self.config.yolo_conf_threshold
+        if not mask.any():
+            return []
+        predictions, class_ids, scores = predictions[mask], class_ids[mask], scores[mask]
+
+        cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = non_max_suppression(boxes, scores, class_ids, self.config.yolo_iou_threshold,
+                                   self.config.yolo_max_detections)
+
+        boxes = boxes[keep]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / ratio).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / ratio).clip(0, height)
+        return [[int(x1), int(y1), int(x2), int(y2), float(score), self.names.get(int(class_id), str(int(class_id)))]
+                for (x1, y1, x2, y2), score, class_id in zip(boxes, scores[keep], class_ids[keep])]
+
+    def predict(self, images):
+        batch, transforms = self._preprocess(images)
+        outputs = self._infer(batch)
+        return [self._postprocess(output, transform) for output, transform in zip(outputs, transforms)]
+
+
+class OnnxRuntimeBackend(_ExportedBackend):
+    name = "onnxruntime"
+
+    def __init__(self, config: Config):
+        import onnxruntime as ort
+        super().__init__(config)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.config.yolo_cpu_threads:
+            options.intra_op_num_threads = self.config.yolo_cpu_threads
+        self.session = ort.InferenceSession(self.model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        if not self.names:
+            metadata = self.session.get_modelmeta().custom_metadata_map
+            if "names" in metadata:
+                self.names = {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()}
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, config: Config):
+        import openvino as ov
+        super().__init__(config)
+        core = ov.Core()
+        properties = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if self.config.yolo_cpu_threads:
+            properties["INFERENCE_NUM_THREADS"] = self.config.yolo_cpu_threads
+        self.compiled_model = core.compile_model(core.read_model(self.model_path), "CPU", properties)
+        self.output = self.compiled_model.output(0)
+
+    def _infer(self, batch):
+        return self.compiled_model(batch)[self.output]
+
+
+DETECTOR_BACKENDS = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+}
+
+
+def load_detector_backend(config: Config):
+    if config.yolo_backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown YOLO backend: {config.yolo_backend} (expected one of {', '.join(DETECTOR_BACKENDS)})")
+    if config.yolo_quantization and config.yolo_backend == "ultralytics":
+        raise ValueError("yolo_quantization needs the 'onnxruntime' or 'openvino' backend")
+    return DETECTOR_BACKENDS[config.yolo_backend](config)
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Export the YOLOv8 weights to ONNX for the onnxruntime/openvino backends.")
+    parser.add_argument('--weights', default=config.yolo_weights_path)
+    parser.add_argument('--output', default=config.yolo_onnx_path)
+    parser.add_argument('--imgsz', type=int, default=config.yolo_imgsz)
+    args = parser.parse_args()
+    export_onnx(args.weights, args.output, imgsz=args.imgsz)
+
+
+if __name__ == "__main__":
+    main()
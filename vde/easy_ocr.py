@@ -1,5 +1,6 @@
 import os
-import json
+import bisect
+from collections import defaultdict
 import cv2
 import numpy as np
 import easyocr
@@ -7,12 +8,21 @@ from pathlib import Path
 from PIL import Image, ImageDraw
 from tqdm import tqdm
 from config.config import Config
+from vde.cache import ResultCache, hash_file, hash_image
+from vde.result_sink import ResultSink, ResultIndex
+from vde.metrics import PipelineMetrics
+from vde.visualizer import VisualizationWriter
 import re
 
 class EasyOCRRecognizer:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, result_cache=None, metrics=None, visualizer=None):
         self.config = config
-        self.reader = easyocr.Reader(self.config.easy_ocr_languages)
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.visualizer = visualizer if visualizer is not None else VisualizationWriter(self.config, metrics=self.metrics)
+        self.result_cache = result_cache if result_cache is not None else ResultCache.from_config(self.config)
+        self.reader = easyocr.Reader(self.config.easy_ocr_languages, quantize=self.config.easy_ocr_quantize)
+        self.model_signature = [easyocr.__version__, self.config.easy_ocr_languages, getattr(self.reader, 'model_lang', None),
+                                getattr(self.reader, 'recog_network', None), self.config.easy_ocr_quantize]
 
     def _convert_numpy_to_python_types(self, obj):
         if isinstance(obj, np.integer):
@@ -31,8 +41,18 @@ class EasyOCRRecognizer:
     def natural_sort_key(self, s):
         return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
 
-    def draw_ocr_boxes_and_save(self, image_path, ocr_results, save_path):
-        image = Image.open(image_path).convert("RGB")
+    def draw_ocr_boxes_and_save(self, image_path, ocr_results, save_path, image=None):
+        if not self.visualizer.wants(Path(save_path).name):
+            return None
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        self.visualizer.submit(self._render_ocr_boxes, image_path, ocr_results, save_path, image)
+        return save_path
+
+    def _render_ocr_boxes(self, image_path, ocr_results, save_path, image=None):
+        if image is None:
+            image = Image.open(image_path).convert("RGB")
+        else:
+            image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
         draw = ImageDraw.Draw(image)
         
         for (bbox, text, prob) in ocr_results:
@@ -44,22 +64,237 @@ class EasyOCRRecognizer:
 
             draw.rectangle([x_min, y_min, x_max, y_max], outline="blue", width=2)
             draw.text((x_min, y_min - 15), f"{text} ({prob:.2f})", fill="blue")
-        
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
         image.save(save_path)
 
-    def process_images_for_ocr(self, image_folder, output_json_path, vis_folder, log_file):
-        image_folder_path = Path(image_folder)
-        image_paths = []
-        extensions = ["jpg", "jpeg", "png", "bmp", "gif", "tiff"]
-        for ext in extensions:
-            image_paths.extend(image_folder_path.glob(f"*.{ext}"))
-            image_paths.extend(image_folder_path.glob(f"*.{ext.upper()}"))
-        image_paths.sort(key=lambda x: self.natural_sort_key(x.name))
+    def _format_ocr_results(self, ocr_results):
+        processed_results = []
+        for (bbox, text, prob) in ocr_results:
+            bbox_flat = [int(min(p[0] for p in bbox)), int(min(p[1] for p in bbox)),
+                         int(max(p[0] for p in bbox)), int(max(p[1] for p in bbox))]
+            
+            processed_results.append(
+                self._convert_numpy_to_python_types({
+                    "bbox": bbox_flat,
+                    "raw_bbox": bbox,
+                    "text": text,
+                    "confidence": float(prob)
+                })
+            )
+        return {"easy_ocr_results": processed_results}
+
+    def _read_text(self, image_path, image=None):
+        image_hash = hash_file(image_path) if image is None else hash_image(image)
+        cache_key = ResultCache.make_key("easy_ocr", image_hash, self.model_signature)
+        return self.result_cache.get_or_compute("easy_ocr", cache_key, lambda: self._readtext(image_path, image))
+
+    def _readtext(self, image_path, image=None):
+        with self.metrics.timer("easyocr_readtext"):
+            ocr_results = self.reader.readtext(str(image_path) if image is None else image)
+        return [[self._convert_numpy_to_python_types(bbox), text, float(prob)] for bbox, text, prob in ocr_results]
+
+    def ocr_image(self, image_path, vis_folder, image=None):
+        ocr_results = self._read_text(image_path, image=image)
+
+        vis_output_path = os.path.join(vis_folder, Path(image_path).name)
+        self.draw_ocr_boxes_and_save(image_path, ocr_results, vis_output_path, image=image)
+        return self._format_ocr_results(ocr_results)
+
+    def _recognize_boxes(self, jobs):
+        outputs = [[] for _ in jobs]
+        crops = []
+        for job_index, (gray, boxes) in enumerate(jobs):
+            height, width = gray.shape[:2]
+            for box in boxes:
+                x1, y1, x2, y2 = (int(round(v)) for v in box[:4])
+                x1, y1, x2, y2 = max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+                if x2 - x1 < 2 or y2 - y1 < 2:
+                    continue
+                crops.append((job_index, x1, y1, gray[y1:y2, x1:x2]))
+
+        # Crops from several images are stacked on one canvas so a single recognize() call covers all of them.
+        gap = 4
+        batch_size = max(1, self.config.easy_ocr_box_batch_size)
+        for start in range(0, len(crops), batch_size):
+            chunk = crops[start:start + batch_size]
+            canvas = np.zeros((sum(crop.shape[0] + gap for *_, crop in chunk), max(crop.shape[1] for *_, crop in chunk)),
+                              dtype=np.uint8)
+            offsets = []
+            horizontal_list = []
+            y = 0
+            for *_, crop in chunk:
+                crop_height, crop_width = crop.shape[:2]
+                canvas[y:y + crop_height, :crop_width] = crop
+                offsets.append(y)
+                horizontal_list.append([0, crop_width, y, y + crop_height])
+                y += crop_height + gap
+
+            with self.metrics.timer("easyocr_recognize", items=len(chunk)):
+                recognized = self.reader.recognize(canvas, horizontal_list=horizontal_list, free_list=[],
+                                                   batch_size=len(chunk), detail=1, paragraph=False)
+            for bbox, text, prob in recognized:
+                crop_index = bisect.bisect_right(offsets, min(int(p[1]) for p in bbox)) - 1
+                job_index, x1, y1, _ = chunk[crop_index]
+                dy = y1 - offsets[crop_index]
+                outputs[job_index].append([[[int(p[0]) + x1, int(p[1]) + dy] for p in bbox], text, float(prob)])
+        return outputs
+
+    def ocr_images_with_boxes(self, jobs, vis_folder):
+        outcomes = [None] * len(jobs)
+        loaded = [None] * len(jobs)
+        pending = []
+        for i, (image_path, image, boxes) in enumerate(jobs):
+            if image is None:
+                image = cv2.imread(str(image_path))
+                if image is None:
+                    outcomes[i] = IOError(f"Could not load image {image_path}")
+                    continue
+            cache_key = ResultCache.make_key("easy_ocr_boxes", hash_image(image), self.model_signature, boxes)
+            hit, ocr_results = self.result_cache.get("easy_ocr_boxes", cache_key)
+            loaded[i] = (image, ocr_results)
+            if not hit:
+                pending.append((i, cache_key))
+
+        if pending:
+            recognition_jobs = []
+            for i, _ in pending:
+                image = loaded[i][0]
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+                recognition_jobs.append((gray, jobs[i][2]))
+            for (i, cache_key), ocr_results in zip(pending, self._recognize_boxes(recognition_jobs)):
+                self.result_cache.set("easy_ocr_boxes", cache_key, ocr_results)
+                loaded[i] = (loaded[i][0], ocr_results)
+
+        for i, (image_path, _, _) in enumerate(jobs):
+            if outcomes[i] is not None:
+                continue
+            image, ocr_results = loaded[i]
+            vis_output_path = os.path.join(vis_folder, Path(image_path).name)
+            self.draw_ocr_boxes_and_save(image_path, ocr_results, vis_output_path, image=image)
+            outcomes[i] = self._format_ocr_results(ocr_results)
+        return outcomes
+
+    def ocr_image_with_boxes(self, image_path, vis_folder, boxes, image=None):
+        outcome = self.ocr_images_with_boxes([(image_path, image, boxes)], vis_folder)[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _size_bucket(self, width, height):
+        step = max(1, self.config.easy_ocr_size_bucket)
+        return max(step, int(round(width / step)) * step), max(step, int(round(height / step)) * step)
 
-        results = {}
+    def _image_size(self, image_path, image=None):
+        if image is not None:
+            height, width = image.shape[:2]
+            return width, height
+        with Image.open(image_path) as img:
+            return img.size
+
+    def _ocr_batch(self, chunk, width, height, vis_folder):
+        outcomes = [None] * len(chunk)
+        loaded = [None] * len(chunk)
+        pending = []
+        for i, (image_path, image) in enumerate(chunk):
+            if image is None:
+                image = cv2.imread(str(image_path))
+                if image is None:
+                    outcomes[i] = IOError(f"Could not load image {image_path}")
+                    continue
+            cache_key = ResultCache.make_key("easy_ocr_batched", hash_image(image), self.model_signature, width, height)
+            hit, ocr_results = self.result_cache.get("easy_ocr_batched", cache_key)
+            loaded[i] = (image, ocr_results)
+            if not hit:
+                pending.append((i, cache_key))
+
+        if pending:
+            resized = [cv2.resize(loaded[i][0], (width, height)) for i, _ in pending]
+            with self.metrics.timer("easyocr_readtext_batched", items=len(resized)):
+                batch_results = self.reader.readtext_batched(resized, batch_size=self.config.easy_ocr_batch_size,
+                                                             workers=self.config.easy_ocr_workers)
+            for (i, cache_key), ocr_results in zip(pending, batch_results):
+                image = loaded[i][0]
+                scale_x = image.shape[1] / width
+                scale_y = image.shape[0] / height
+                ocr_results = [[[[int(round(p[0] * scale_x)), int(round(p[1] * scale_y))] for p in bbox], text, float(prob)]
+                               for bbox, text, prob in ocr_results]
+                self.result_cache.set("easy_ocr_batched", cache_key, ocr_results)
+                loaded[i] = (image, ocr_results)
+
+        for i, (image_path, _) in enumerate(chunk):
+            if outcomes[i] is not None:
+                continue
+            image, ocr_results = loaded[i]
+            vis_output_path = os.path.join(vis_folder, Path(image_path).name)
+            self.draw_ocr_boxes_and_save(image_path, ocr_results, vis_output_path, image=image)
+            outcomes[i] = self._format_ocr_results(ocr_results)
+        return outcomes
+
+    def ocr_images_batched(self, items, vis_folder):
+        groups = defaultdict(list)
+        for image_path, image in items:
+            try:
+                groups[self._size_bucket(*self._image_size(image_path, image))].append((image_path, image))
+            except Exception as e:
+                yield image_path, e
+
+        batch_size = max(1, self.config.easy_ocr_batch_size)
+        for (width, height), group in groups.items():
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                try:
+                    outcomes = self._ocr_batch(chunk, width, height, vis_folder)
+                except Exception as e:
+                    outcomes = [e] * len(chunk)
+                yield from zip((image_path for image_path, _ in chunk), outcomes)
+
+    def _store_ocr_outcome(self, results, log, manifest, image_name, outcome):
+        if isinstance(outcome, Exception):
+            error_message = f"✗ EasyOCR failed for image: {image_name} - {outcome}"
+            print(error_message)
+            log.write(f"{error_message}\n")
+            results[image_name] = {"error": str(outcome)}
+            return False
+        results[image_name] = outcome
+        if manifest is not None:
+            manifest.mark_done("easy_ocr", image_name, outcome)
+        log.write(f"✓ EasyOCR processed: {image_name}\n")
+        return True
+
+    def _run_box_jobs(self, box_jobs, results, log, manifest, vis_folder):
+        try:
+            outcomes = self.ocr_images_with_boxes(box_jobs, vis_folder)
+        except Exception as e:
+            outcomes = [e] * len(box_jobs)
+        return [self._store_ocr_outcome(results, log, manifest, image_path.name, outcome)
+                for (image_path, _, _), outcome in zip(box_jobs, outcomes)]
+
+    def process_images_for_ocr(self, image_folder, output_json_path, vis_folder, log_file, records=None, manifest=None,
+                               text_boxes=None):
+        if records is None:
+            image_folder_path = Path(image_folder)
+            image_paths = []
+            extensions = ["jpg", "jpeg", "png", "bmp", "gif", "tiff"]
+            for ext in extensions:
+                image_paths.extend(image_folder_path.glob(f"*.{ext}"))
+                image_paths.extend(image_folder_path.glob(f"*.{ext.upper()}"))
+            image_paths.sort(key=lambda x: self.natural_sort_key(x.name))
+            items = [(image_path, None) for image_path in image_paths]
+        else:
+            items = [(Path(record.name), record.image) for record in records]
+
+        if not self.config.easy_ocr_use_detected_boxes:
+            text_boxes = None
+        elif text_boxes is None and records is None and os.path.exists(self.config.processed_detection_file):
+            text_boxes = ResultIndex(self.config.processed_detection_file)
+
+        results = ResultSink(output_json_path, keep=records is not None)
         successful_ocrs = 0
         failed_ocrs = 0
+        box_jobs = []
+        box_job_crops = 0
+        batched = self.config.easy_ocr_batch_size > 1
+        batched_items = []
 
         with open(log_file, 'a', encoding='utf-8') as log:
             log.write("\n\n" + "=" * 50 + "\n")
@@ -68,37 +303,48 @@ class EasyOCRRecognizer:
             log.write("PROCESSING IMAGES FOR EASYOCR:\n")
             log.write("-" * 50 + "\n")
 
-            for image_path in tqdm(image_paths, desc="Running EasyOCR"):
+            for image_path, image in tqdm(items, desc="Running EasyOCR"):
+                if manifest is not None and manifest.is_done("easy_ocr", image_path.name):
+                    results[image_path.name] = manifest.result("easy_ocr", image_path.name)
+                    successful_ocrs += 1
+                    log.write(f"↷ Already processed by EasyOCR: {image_path.name}\n")
+                    continue
+                boxes = text_boxes.get(image_path.name) if text_boxes is not None else None
+                # Images whose detection failed or found nothing fall back to full readtext below.
+                if boxes:
+                    box_jobs.append((image_path, image, boxes))
+                    box_job_crops += len(boxes)
+                    if box_job_crops >= self.config.easy_ocr_box_batch_size:
+                        outcomes = self._run_box_jobs(box_jobs, results, log, manifest, vis_folder)
+                        successful_ocrs += sum(outcomes)
+                        failed_ocrs += len(outcomes) - sum(outcomes)
+                        box_jobs = []
+                        box_job_crops = 0
+                    continue
+                if batched:
+                    batched_items.append((image_path, image))
+                    continue
                 try:
-                    ocr_results = self.reader.readtext(str(image_path))
-                    
-                    processed_results = []
-                    for (bbox, text, prob) in ocr_results:
-                        bbox_flat = [int(min(p[0] for p in bbox)), int(min(p[1] for p in bbox)),
-                                     int(max(p[0] for p in bbox)), int(max(p[1] for p in bbox))]
-                        
-                        processed_results.append(
-                            self._convert_numpy_to_python_types({
-                                "bbox": bbox_flat,
-                                "raw_bbox": bbox,
-                                "text": text,
-                                "confidence": float(prob)
-                            })
-                        )
-                    
-                    results[image_path.name] = {"easy_ocr_results": processed_results}
-
-                    vis_output_path = os.path.join(vis_folder, image_path.name)
-                    self.draw_ocr_boxes_and_save(image_path, ocr_results, vis_output_path)
+                    ocr_result = self.ocr_image(image_path, vis_folder, image=image)
+                except Exception as e:
+                    ocr_result = e
+                if self._store_ocr_outcome(results, log, manifest, image_path.name, ocr_result):
+                    successful_ocrs += 1
+                else:
+                    failed_ocrs += 1
 
+            if box_jobs:
+                outcomes = self._run_box_jobs(box_jobs, results, log, manifest, vis_folder)
+                successful_ocrs += sum(outcomes)
+                failed_ocrs += len(outcomes) - sum(outcomes)
+
+            batch_outcomes = self.ocr_images_batched(batched_items, vis_folder)
+            for image_path, ocr_result in tqdm(batch_outcomes, total=len(batched_items), desc="Running batched EasyOCR",
+                                               disable=not batched_items):
+                if self._store_ocr_outcome(results, log, manifest, image_path.name, ocr_result):
                     successful_ocrs += 1
-                    log.write(f"✓ EasyOCR processed: {image_path.name}\n")
-                except Exception as e:
+                else:
                     failed_ocrs += 1
-                    error_message = f"✗ EasyOCR failed for image: {image_path.name} - {e}"
-                    print(error_message)
-                    log.write(f"{error_message}\n")
-                    results[image_path.name] = {"error": str(e)}
 
             log.write(f"\nTotal Successful EasyOCR Runs: {successful_ocrs}\n")
             log.write(f"Total Failed EasyOCR Runs: {failed_ocrs}\n")
@@ -106,10 +352,11 @@ class EasyOCRRecognizer:
             log.write("\n" + "=" * 50 + "\n")
             log.write("EASYOCR RECOGNITION LOG END\n")
 
-        os.makedirs(Path(output_json_path).parent, exist_ok=True)
+        if isinstance(text_boxes, ResultIndex):
+            text_boxes.close()
         os.makedirs(vis_folder, exist_ok=True)
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        results.close(sort_key=self.natural_sort_key if batched_items else None)
 
         print(f"\n✅ EasyOCR results saved to: {output_json_path}")
-        print(f"🖼️ EasyOCR visualizations saved to: {vis_folder}")
\ No newline at end of file
+        print(f"🖼️ EasyOCR visualizations saved to: {vis_folder}")
+        return results
\ No newline at end of file
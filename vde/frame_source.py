@@ -0,0 +1,141 @@
+import os
+import time
+from urllib.parse import urlparse
+import cv2
+from config.config import Config
+from vde.record import ImageRecord
+from vde.metrics import PipelineMetrics
+
+
+class MotionGate:
+    def __init__(self, pixel_threshold=25, min_changed_fraction=0.005, downscale_width=160):
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.downscale_width = downscale_width
+        self.reference = None
+
+    def _signature(self, image):
+        height, width = image.shape[:2]
+        if width > self.downscale_width:
+            scale = self.downscale_width / width
+            image = cv2.resize(image, (self.downscale_width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, signature):
+        if self.reference is None or self.reference.shape != signature.shape:
+            return 1.0
+        diff = cv2.absdiff(signature, self.reference)
+        _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / changed.size
+
+    def accept(self, image, force=False):
+        signature = self._signature(image)
+        fraction = self.changed_fraction(signature)
+        if force or fraction >= self.min_changed_fraction:
+            self.reference = signature
+            return True, fraction
+        return False, fraction
+
+
+class VideoFrameSource:
+    def __init__(self, config: Config, source, metrics=None):
+        self.config = config
+        self.source = source
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.sample_fps = self.config.video_sample_fps
+        self.max_frames = self.config.video_max_frames
+        self.keyframe_interval = self.config.video_keyframe_interval_seconds
+        self.realtime = self.config.video_realtime
+        self.gate = None
+        if self.config.video_motion_gating:
+            self.gate = MotionGate(
+                pixel_threshold=self.config.video_motion_pixel_threshold,
+                min_changed_fraction=self.config.video_motion_min_fraction,
+                downscale_width=self.config.video_motion_downscale_width
+            )
+        self.capture = None
+        self.fps = None
+        self.stats = {"frames_read": 0, "frames_sampled": 0, "frames_static": 0, "frames_dropped": 0, "frames_emitted": 0}
+
+    @property
+    def source_stem(self):
+        if str(self.source).isdigit():
+            return f"camera{self.source}"
+        stem = os.path.splitext(os.path.basename(urlparse(str(self.source)).path.rstrip('/')))[0]
+        return stem or "stream"
+
+    def open(self):
+        source = int(self.source) if str(self.source).isdigit() else str(self.source)
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video source: {self.source}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 25.0
+        return self
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def __iter__(self):
+        if self.capture is None:
+            self.open()
+
+        sample_interval = 1.0 / self.sample_fps if self.sample_fps else 0.0
+        next_sample_at = 0.0
+        last_emitted_at = None
+        frame_index = -1
+        started = time.perf_counter()
+
+        try:
+            while self.max_frames is None or self.stats["frames_emitted"] < self.max_frames:
+                if self.realtime:
+                    delay = started + (frame_index + 1) / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if not self.capture.grab():
+                    break
+                frame_index += 1
+                self.stats["frames_read"] += 1
+
+                timestamp = frame_index / self.fps
+                if timestamp + 1e-9 < next_sample_at:
+                    continue
+                if self.realtime and time.perf_counter() - (started + timestamp) > 1.0 / self.fps:
+                    self.stats["frames_dropped"] += 1
+                    continue
+
+                with self.metrics.timer("video_decode"):
+                    ok, frame = self.capture.retrieve()
+                if not ok or frame is None:
+                    continue
+                next_sample_at = timestamp + sample_interval
+                self.stats["frames_sampled"] += 1
+
+                motion = None
+                if self.gate is not None:
+                    force = (self.keyframe_interval is not None and last_emitted_at is not None
+                             and timestamp - last_emitted_at >= self.keyframe_interval)
+                    with self.metrics.timer("motion_gate"):
+                        accepted, motion = self.gate.accept(frame, force=force)
+                    if not accepted:
+                        self.stats["frames_static"] += 1
+                        continue
+
+                last_emitted_at = timestamp
+                self.stats["frames_emitted"] += 1
+                name = f"{self.source_stem}_f{frame_index:07d}.jpg"
+                yield ImageRecord(name, frame, source_name=name, metadata={
+                    "video_source": str(self.source),
+                    "frame_index": frame_index,
+                    "timestamp_seconds": round(timestamp, 3),
+                    "motion": None if motion is None else round(motion, 4),
+                })
+        finally:
+            self.close()
+
+    def format_stats(self):
+        return (f"Video source {self.source}: {self.stats['frames_read']} frames read, "
+                f"{self.stats['frames_sampled']} sampled, {self.stats['frames_static']} skipped as static, "
+                f"{self.stats['frames_dropped']} dropped as late, {self.stats['frames_emitted']} sent to the pipeline")
@@ -0,0 +1,58 @@
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+
+class IndexedPhraseMatcher:
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.target_lengths = [len(target) for target in self.targets]
+        self.char_index = defaultdict(list)
+        for target_idx, target in enumerate(self.targets):
+            for char, count in Counter(target).items():
+                self.char_index[char].append((target_idx, count))
+
+    def _char_overlaps(self, phrase):
+        overlaps = {}
+        for char, count in Counter(phrase).items():
+            for target_idx, target_count in self.char_index.get(char, ()):
+                overlaps[target_idx] = overlaps.get(target_idx, 0) + min(count, target_count)
+        return overlaps
+
+    def _candidates(self, phrases, threshold):
+        candidates = []
+        for phrase_idx, phrase in enumerate(phrases):
+            overlaps = self._char_overlaps(phrase)
+            if threshold <= 0:
+                overlaps = {target_idx: overlaps.get(target_idx, 0) for target_idx in range(len(self.targets))}
+            for target_idx, overlap in overlaps.items():
+                total_length = len(phrase) + self.target_lengths[target_idx]
+                upper_bound = 2.0 * overlap / total_length if total_length else 1.0
+                if upper_bound >= threshold:
+                    candidates.append((-upper_bound, phrase_idx, target_idx))
+        candidates.sort()
+        return candidates
+
+    def best_match(self, phrases, threshold):
+        best_score = None
+        best_order = None
+        best_pair = None
+
+        for neg_upper_bound, phrase_idx, target_idx in self._candidates(phrases, threshold):
+            upper_bound = -neg_upper_bound
+            order = (phrase_idx, target_idx)
+            if best_score is not None and (upper_bound < best_score or
+                                           (upper_bound == best_score and order > best_order)):
+                break
+
+            phrase = phrases[phrase_idx]
+            target = self.targets[target_idx]
+            sim = SequenceMatcher(None, phrase, target).ratio()
+            if sim >= threshold and (best_score is None or sim > best_score or
+                                     (sim == best_score and order < best_order)):
+                best_score = sim
+                best_order = order
+                best_pair = (phrase, target)
+
+        if best_pair is None:
+            return None, None, None
+        return best_pair[0], best_pair[1], best_score
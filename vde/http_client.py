@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from config.config import Config
+from vde.metrics import PipelineMetrics
+from vde.cassette import OCRCassette
+
+
+class TokenBucketRateLimiter:
+    def __init__(self, requests_per_second, burst=1):
+        self.rate = requests_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class OCRHttpClient:
+    def __init__(self, config: Config, metrics=None, cassette=None):
+        self.config = config
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.cassette = cassette if cassette is not None else OCRCassette.from_config(self.config)
+        self.max_in_flight = max(1, self.config.api_max_in_flight)
+        self.timeout = self.config.api_timeout_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.rate_limiter = TokenBucketRateLimiter(self.config.effective_api_requests_per_second,
+                                                   burst=self.config.api_rate_burst)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ocr-http")
+
+    def get_json(self, url, headers, payload):
+        if self.cassette is not None:
+            cassette_key = OCRCassette.key(url, payload)
+            if self.cassette.replaying:
+                return self.cassette.replay(cassette_key, url)
+
+        with self.metrics.timer("http_rate_limit_wait", cpu=None):
+            self.rate_limiter.acquire()
+        with self.metrics.timer("http_round_trip"):
+            response = self.session.get(url, headers=headers, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            result = response.json()
+
+        if self.cassette is not None:
+            self.cassette.record(cassette_key, url, result)
+        return result
+
+    def imap(self, fn, items):
+        pending = deque()
+        for item in items:
+            pending.append((item, self._executor.submit(fn, item)))
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        if self.cassette is not None:
+            self.cassette.close()
+
+
+class AsyncTokenBucketRateLimiter:
+    def __init__(self, requests_per_second, burst=1):
+        self.rate = requests_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncOCRHttpClient:
+    def __init__(self, config: Config, metrics=None, cassette=None):
+        self.config = config
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.cassette = cassette if cassette is not None else OCRCassette.from_config(self.config)
+        self.max_in_flight = max(1, self.config.api_max_in_flight)
+        self.timeout = self.config.api_timeout_seconds
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+        )
+        self.rate_limiter = AsyncTokenBucketRateLimiter(self.config.effective_api_requests_per_second,
+                                                        burst=self.config.api_rate_burst)
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    async def get_json(self, url, headers, payload):
+        if self.cassette is not None:
+            cassette_key = OCRCassette.key(url, payload)
+            if self.cassette.replaying:
+                return self.cassette.replay(cassette_key, url)
+
+        with self.metrics.timer("http_rate_limit_wait", cpu=None):
+            await self.rate_limiter.acquire()
+        with self.metrics.timer("http_round_trip", cpu=None):
+            response = await self.client.request("GET", url, headers=headers, json=payload)
+            response.raise_for_status()
+            result = response.json()
+
+        if self.cassette is not None:
+            self.cassette.record(cassette_key, url, result)
+        return result
+
+    async def map(self, fn, items):
+        async def run(item):
+            async with self.semaphore:
+                return await fn(item)
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+    async def close(self):
+        await self.client.aclose()
+        if self.cassette is not None:
+            self.cassette.close()
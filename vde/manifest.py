@@ -0,0 +1,49 @@
+import os
+import json
+import threading
+
+
+class RunManifest:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell() > 0 and not self._ends_with_newline():
+            # A crash mid-write leaves a partial last line; start a fresh one so the next entry stays parseable.
+            self._file.write("\n")
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.completed.setdefault(entry["stage"], {})[entry["image"]] = entry.get("result")
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_done(self, stage, image_name):
+        return image_name in self.completed.get(stage, {})
+
+    def result(self, stage, image_name):
+        return self.completed.get(stage, {}).get(image_name)
+
+    def mark_done(self, stage, image_name, result=None):
+        line = json.dumps({"stage": stage, "image": image_name, "result": result}, ensure_ascii=False)
+        with self.lock:
+            self.completed.setdefault(stage, {})[image_name] = result
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self.lock:
+            self._file.close()
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+class _StepStats:
+    def __init__(self, reservoir_size):
+        self.reservoir_size = reservoir_size
+        self.calls = 0
+        self.items = 0
+        self.errors = 0
+        self.wall_total = 0.0
+        self.cpu_total = 0.0
+        self.wall_max = 0.0
+        self.samples = []
+
+    def add(self, wall, cpu, items, failed):
+        self.calls += 1
+        self.items += items
+        self.errors += 1 if failed else 0
+        self.wall_total += wall
+        self.cpu_total += cpu
+        self.wall_max = max(self.wall_max, wall)
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(wall)
+        else:
+            slot = random.randrange(self.calls)
+            if slot < self.reservoir_size:
+                self.samples[slot] = wall
+
+    def percentile(self, sorted_samples, pct):
+        if not sorted_samples:
+            return None
+        index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+        return sorted_samples[index]
+
+    def summary(self):
+        samples = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "errors": self.errors,
+            "wall_seconds": round(self.wall_total, 6),
+            "cpu_seconds": round(self.cpu_total, 6),
+            "items_per_second": round(self.items / self.wall_total, 3) if self.wall_total else None,
+            "p50_ms": self._ms(self.percentile(samples, 50)),
+            "p95_ms": self._ms(self.percentile(samples, 95)),
+            "p99_ms": self._ms(self.percentile(samples, 99)),
+            "max_ms": self._ms(self.wall_max),
+        }
+
+    def _ms(self, seconds):
+        return None if seconds is None else round(seconds * 1000, 3)
+
+
+class PipelineMetrics:
+    def __init__(self, enabled=True, reservoir_size=10000):
+        self.enabled = enabled
+        self.reservoir_size = reservoir_size
+        self.lock = threading.Lock()
+        self.steps = {}
+        self.started_at = time.time()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(enabled=config.collect_metrics, reservoir_size=config.metrics_reservoir_size)
+
+    def record(self, name, wall, cpu, items=1, failed=False):
+        if not self.enabled:
+            return
+        with self.lock:
+            step = self.steps.get(name)
+            if step is None:
+                step = self.steps[name] = _StepStats(self.reservoir_size)
+            step.add(wall, cpu, items, failed)
+
+    @contextmanager
+    def timer(self, name, items=1, cpu="thread"):
+        if not self.enabled:
+            yield
+            return
+        cpu_clock = {"thread": time.thread_time, "process": time.process_time}.get(cpu, lambda: 0.0)
+        wall_start = time.perf_counter()
+        cpu_start = cpu_clock()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - wall_start, cpu_clock() - cpu_start, items, failed)
+
+    def reset(self):
+        with self.lock:
+            self.steps = {}
+            self.started_at = time.time()
+
+    def summary(self):
+        with self.lock:
+            steps = {name: step.summary() for name, step in sorted(self.steps.items())}
+        return {"since": self.started_at, "steps": steps}
+
+    def format_summary(self):
+        lines = [f"{'STEP':<28}{'CALLS':>8}{'ITEMS':>8}{'WALL s':>10}{'CPU s':>10}{'P50 ms':>10}{'P95 ms':>10}{'P99 ms':>10}"]
+        for name, step in self.summary()["steps"].items():
+            lines.append(f"{name:<28}{step['calls']:>8}{step['items']:>8}{step['wall_seconds']:>10.3f}{step['cpu_seconds']:>10.3f}"
+                         f"{step['p50_ms'] or 0:>10.1f}{step['p95_ms'] or 0:>10.1f}{step['p99_ms'] or 0:>10.1f}")
+        return "\n".join(lines)
+
+    def write_summary(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -1,12 +1,15 @@
 import re
-import json
 import os
-from difflib import SequenceMatcher
 from tqdm import tqdm
+from vde.fuzzy_matcher import IndexedPhraseMatcher
+from vde.correction_cache import CorrectionCache
+from vde.result_sink import ResultSink, ResultIndex
+from vde.metrics import PipelineMetrics
 
 class NgramPostprocessor:
-    def __init__(self, config):
+    def __init__(self, config, metrics=None):
         self.config = config
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(config)
         self.targets = [
             'ঢাকা মেট্রো', 'চট্ট মেট্রো', 'রাজ মেট্রো', 'সিলেট মেট্রো', 'খুলনা মেট্রো', 'বরিশাল মেট্রো',
             'ঢাকা', 'চট্টগ্রাম', 'রাজশাহী', 'খুলনা', 'বরিশাল', 'সিলেট', 'রংপুর', 'ময়মনসিংহ',
@@ -19,9 +22,46 @@ class NgramPostprocessor:
         ]
         self.max_n = 3
         self.matching_threshold = 0.6
-        self.replacement_threshold = config.ngram_replacement_threshold
+        self.correction_cache = CorrectionCache(
+            config.ngram_cache_size,
+            cache_file=config.ngram_cache_file if config.ngram_cache_persist else None
+        )
+        self._build_index()
+
+    @property
+    def replacement_threshold(self):
+        return self.config.ngram_replacement_threshold
+
+    def _build_index(self):
+        # Built once here rather than checked per lookup; call again after changing targets, max_n or matching_threshold.
+        self.matcher = IndexedPhraseMatcher(self.targets)
+        self.correction_cache.reset(CorrectionCache.make_fingerprint(self.targets, self.max_n, self.matching_threshold))
+
+    def save_correction_cache(self, force=False):
+        # Unforced saves happen at most once per interval so API requests don't rewrite the whole file each time.
+        min_interval = None if force else self.config.ngram_cache_save_interval_seconds
+        try:
+            self.correction_cache.save(min_interval=min_interval)
+        except OSError as e:
+            print(f"Warning: Could not save n-gram correction cache {self.correction_cache.cache_file}: {e}")
+
+    def correction_cache_summary(self):
+        stats = self.correction_cache.stats()
+        return (f"N-gram correction cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate), {stats['entries']} entries")
 
     def get_best_ngram_match(self, ocr_text): 
+        cache_text = ocr_text.strip()
+        hit, cached_match_info = self.correction_cache.get(cache_text)
+        if hit:
+            return dict(cached_match_info)
+
+        with self.metrics.timer("ngram_match"):
+            best_match_info = self._compute_best_ngram_match(ocr_text)
+        self.correction_cache.set(cache_text, best_match_info)
+        return dict(best_match_info)
+
+    def _compute_best_ngram_match(self, ocr_text): 
         best_match_info = {
             'matched_phrase_in_text': None,
             'matched_target': None,
@@ -31,37 +71,75 @@ class NgramPostprocessor:
         
         words_in_ocr_text = re.split(r'[\s\-]+', ocr_text.strip())
         
-        current_best_score = float('-inf')
-
-        for n in range(1, self.max_n + 1):
-            for i in range(len(words_in_ocr_text) - n + 1):
-                phrase = ' '.join(words_in_ocr_text[i:i + n])
-                for target in self.targets:
-                    sim = SequenceMatcher(None, phrase, target).ratio()
-                    if sim > current_best_score and sim >= self.matching_threshold:
-                        best_match_info['matched_phrase_in_text'] = phrase
-                        best_match_info['matched_target'] = target
-                        best_match_info['similarity_score'] = sim
-                        current_best_score = sim
+        phrases = [' '.join(words_in_ocr_text[i:i + n])
+                   for n in range(1, self.max_n + 1)
+                   for i in range(len(words_in_ocr_text) - n + 1)]
+
+        phrase, target, sim = self.matcher.best_match(phrases, self.matching_threshold)
+        if phrase is not None:
+            best_match_info['matched_phrase_in_text'] = phrase
+            best_match_info['matched_target'] = target
+            best_match_info['similarity_score'] = sim
         
         return best_match_info
 
-    def process_and_enrich_results(self, main_recognition_file, easy_ocr_file, output_file, log_file):
-        combined_results = {}
-
-        if os.path.exists(main_recognition_file):
-            with open(main_recognition_file, 'r', encoding='utf-8') as f:
-                main_data = json.load(f)
-                for img_name, img_data in main_data.items():
-                    combined_results[img_name] = combined_results.get(img_name, {})
-                    combined_results[img_name]['main_recognition'] = img_data
-
-        if os.path.exists(easy_ocr_file):
-            with open(easy_ocr_file, 'r', encoding='utf-8') as f:
-                easy_data = json.load(f)
-                for img_name, img_data in easy_data.items():
-                    combined_results[img_name] = combined_results.get(img_name, {})
-                    combined_results[img_name]['easy_ocr_recognition'] = img_data
+    def correct_text(self, original_text):
+        ngram_match_info = self.get_best_ngram_match(original_text) 
+        
+        if ngram_match_info['similarity_score'] is not None and \
+           ngram_match_info['similarity_score'] >= self.replacement_threshold and \
+           ngram_match_info['matched_phrase_in_text'] is not None: 
+            
+            return original_text.replace(
+                ngram_match_info['matched_phrase_in_text'],
+                ngram_match_info['matched_target'],
+                1
+            )
+        return original_text
+
+    def enrich_image_results(self, image_results):
+        processed_sections = []
+
+        if 'main_recognition' in image_results:
+            main_data_for_img = image_results['main_recognition']
+            if 'recognized_texts' in main_data_for_img and main_data_for_img['recognized_texts']:
+                processed_main_texts = []
+                for sublist in main_data_for_img['recognized_texts']:
+                    processed_sublist = []
+                    for text_obj in sublist:
+                        if 'text' in text_obj and text_obj['text']:
+                            text_obj['text'] = self.correct_text(text_obj['text'])
+                        processed_sublist.append(text_obj)
+                    processed_main_texts.append(processed_sublist)
+                main_data_for_img['recognized_texts'] = processed_main_texts
+            processed_sections.append('main_recognition')
+
+        if 'easy_ocr_recognition' in image_results:
+            easy_ocr_data_for_img = image_results['easy_ocr_recognition']
+            if 'easy_ocr_results' in easy_ocr_data_for_img and easy_ocr_data_for_img['easy_ocr_results']:
+                processed_easy_ocr_texts = []
+                for text_obj in easy_ocr_data_for_img['easy_ocr_results']:
+                    if 'text' in text_obj and text_obj['text']:
+                        text_obj['text'] = self.correct_text(text_obj['text'])
+                    processed_easy_ocr_texts.append(text_obj)
+                easy_ocr_data_for_img['easy_ocr_results'] = processed_easy_ocr_texts
+            processed_sections.append('easy_ocr_recognition')
+
+        return processed_sections
+
+    def process_and_enrich_results(self, main_recognition_file, easy_ocr_file, output_file, log_file, main_data=None, easy_data=None):
+        combined_results = ResultSink(output_file, keep=main_data is not None or easy_data is not None)
+
+        if main_data is None and os.path.exists(main_recognition_file):
+            main_data = ResultIndex(main_recognition_file)
+        if easy_data is None and os.path.exists(easy_ocr_file):
+            easy_data = ResultIndex(easy_ocr_file)
+
+        image_names = []
+        for data in (main_data, easy_data):
+            if data is not None:
+                image_names.extend(data.keys())
+        image_names = list(dict.fromkeys(image_names))
         
         with open(log_file, 'a', encoding='utf-8') as log:
             log.write("\n\n" + "=" * 50 + "\n")
@@ -70,66 +148,32 @@ class NgramPostprocessor:
             log.write("ENRICHING RECOGNITION RESULTS WITH N-GRAM MATCHES:\n")
             log.write("-" * 50 + "\n")
 
-            for img_name in tqdm(combined_results.keys(), desc="Applying N-gram post-processing"):
-                
-                
-                if 'main_recognition' in combined_results[img_name]:
-                    main_data_for_img = combined_results[img_name]['main_recognition']
-                    if 'recognized_texts' in main_data_for_img and main_data_for_img['recognized_texts']:
-                        processed_main_texts = []
-                        for sublist in main_data_for_img['recognized_texts']:
-                            processed_sublist = []
-                            for text_obj in sublist:
-                                if 'text' in text_obj and text_obj['text']:
-                                    original_text = text_obj['text']
-                                    ngram_match_info = self.get_best_ngram_match(original_text) 
-                                    
-                                    if ngram_match_info['similarity_score'] is not None and \
-                                       ngram_match_info['similarity_score'] >= self.replacement_threshold and \
-                                       ngram_match_info['matched_phrase_in_text'] is not None: 
-                                        
-                                       
-                                        text_obj['text'] = original_text.replace(
-                                            ngram_match_info['matched_phrase_in_text'],
-                                            ngram_match_info['matched_target'],
-                                            1
-                                        )
-                                    
-                                processed_sublist.append(text_obj)
-                            processed_main_texts.append(processed_sublist)
-                        main_data_for_img['recognized_texts'] = processed_main_texts
-                    log.write(f"✓ N-gram processed main recognition for: {img_name}\n")
+            for img_name in tqdm(image_names, desc="Applying N-gram post-processing"):
+                image_results = {}
+                if main_data is not None and img_name in main_data:
+                    image_results['main_recognition'] = main_data.get(img_name)
+                if easy_data is not None and img_name in easy_data:
+                    image_results['easy_ocr_recognition'] = easy_data.get(img_name)
 
-                
-                if 'easy_ocr_recognition' in combined_results[img_name]:
-                    easy_ocr_data_for_img = combined_results[img_name]['easy_ocr_recognition']
-                    if 'easy_ocr_results' in easy_ocr_data_for_img and easy_ocr_data_for_img['easy_ocr_results']:
-                        processed_easy_ocr_texts = []
-                        for text_obj in easy_ocr_data_for_img['easy_ocr_results']:
-                            if 'text' in text_obj and text_obj['text']:
-                                original_text = text_obj['text']
-                                ngram_match_info = self.get_best_ngram_match(original_text) 
-                                
-                                if ngram_match_info['similarity_score'] is not None and \
-                                   ngram_match_info['similarity_score'] >= self.replacement_threshold and \
-                                   ngram_match_info['matched_phrase_in_text'] is not None: 
-                                    
-                                    
-                                    text_obj['text'] = original_text.replace(
-                                        ngram_match_info['matched_phrase_in_text'],
-                                        ngram_match_info['matched_target'],
-                                        1
-                                    )
-                                
-                            processed_easy_ocr_texts.append(text_obj)
-                        easy_ocr_data_for_img['easy_ocr_results'] = processed_easy_ocr_texts
+                processed_sections = self.enrich_image_results(image_results)
+                combined_results[img_name] = image_results
+                if 'main_recognition' in processed_sections:
+                    log.write(f"✓ N-gram processed main recognition for: {img_name}\n")
+                if 'easy_ocr_recognition' in processed_sections:
                     log.write(f"✓ N-gram processed EasyOCR recognition for: {img_name}\n")
             
+            cache_summary = self.correction_cache_summary()
+            log.write(f"\n{cache_summary}\n")
             log.write("\n" + "=" * 50 + "\n")
             log.write("N-GRAM SIMILARITY POST-PROCESSING LOG END\n")
 
+        print(cache_summary)
+        self.save_correction_cache()
+
+        for data in (main_data, easy_data):
+            if isinstance(data, ResultIndex):
+                data.close()
 
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ N-gram enriched results saved to: {output_file}")
\ No newline at end of file
+        combined_results.close()
+        print(f"✅ N-gram enriched results saved to: {output_file}")
+        return combined_results
\ No newline at end of file
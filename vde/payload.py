@@ -0,0 +1,134 @@
+import os
+import base64
+import threading
+from io import BytesIO
+from collections import OrderedDict
+import cv2
+from PIL import Image
+from config.config import Config
+from vde.metrics import PipelineMetrics
+
+
+class EncodedImage:
+    def __init__(self, data, scale=1.0):
+        self.data = data
+        self.scale = scale
+        self.base64 = base64.b64encode(data).decode('utf-8')
+
+    @property
+    def data_uri(self):
+        return f"data:image/jpeg;base64,{self.base64}"
+
+    def to_encoded(self, boxes):
+        if self.scale == 1.0:
+            return boxes
+        return [[int(round(value * self.scale)) for value in box] for box in boxes]
+
+    def to_original(self, obj):
+        if self.scale == 1.0:
+            return obj
+        if isinstance(obj, bool):
+            return obj
+        if isinstance(obj, int):
+            return int(round(obj / self.scale))
+        if isinstance(obj, float):
+            return obj / self.scale
+        if isinstance(obj, list):
+            return [self.to_original(elem) for elem in obj]
+        return obj
+
+
+class ImagePayloadBuilder:
+    def __init__(self, config: Config, max_entries=256, metrics=None):
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(config)
+        self.jpeg_quality = config.payload_jpeg_quality
+        self.max_side = config.payload_max_side
+        self.reuse_source_jpeg = config.payload_reuse_source_jpeg
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _lookup(self, key, owner):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != owner:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key, owner, encoded):
+        with self.lock:
+            self.entries[key] = (owner, encoded)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _reusable_jpeg(self, image_path):
+        if not self.reuse_source_jpeg:
+            return None
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(b'\xff\xd8'):
+            return None
+        try:
+            img = Image.open(BytesIO(data))
+            if img.format != 'JPEG' or img.mode != 'RGB':
+                return None
+            if img.getexif().get(0x0112, 1) != 1:
+                return None
+            if self.max_side and max(img.size) > self.max_side:
+                return None
+        except Exception:
+            return None
+        return data
+
+    def encode_array(self, image):
+        with self.metrics.timer("base64_encode"):
+            return self._encode_array(image)
+
+    def encode_record(self, record):
+        # Kept on the record itself so detection and recognition share one encode however many images are in flight.
+        if record.payload is None:
+            record.payload = self.encode_array(record.image)
+        return record.payload
+
+    def _encode_array(self, image):
+        scale = 1.0
+        height, width = image.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            image_to_encode = cv2.resize(image, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                                         interpolation=cv2.INTER_AREA)
+        else:
+            image_to_encode = image
+
+        ok, buffer = cv2.imencode(".jpg", image_to_encode, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Could not encode image as JPEG")
+        return EncodedImage(buffer.tobytes(), scale)
+
+    def encode_path(self, image_path):
+        image_path = str(image_path)
+        stat = os.stat(image_path)
+        owner = (stat.st_mtime_ns, stat.st_size)
+        key = ("path", os.path.abspath(image_path))
+        encoded = self._lookup(key, owner)
+        if encoded is not None:
+            return encoded
+
+        with self.metrics.timer("base64_encode"):
+            data = self._reusable_jpeg(image_path)
+            if data is not None:
+                encoded = EncodedImage(data)
+            else:
+                image = cv2.imread(image_path, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+                if image is None:
+                    raise FileNotFoundError(f"Could not load image {image_path}")
+                encoded = self._encode_array(image)
+        self._store(key, owner, encoded)
+        return encoded
+
+    def encode(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            return self.encode_path(source)
+        return self.encode_record(source)
@@ -4,8 +4,23 @@ import numpy as np
 from PIL import Image, ImageDraw
 from tqdm import tqdm
 import re
+from concurrent.futures import ThreadPoolExecutor
+from vde.cache import ResultCache, hash_image
+from vde.metrics import PipelineMetrics
 
 class PerspectiveCorrector:
+    def __init__(self, result_cache=None, workers=1, metrics=None):
+        self.result_cache = result_cache
+        self.workers = max(1, workers or 1)
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+
+    def _map_images(self, fn, items):
+        if self.workers == 1 or len(items) < 2:
+            yield from map(fn, items)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+            yield from executor.map(fn, items)
+
     def order_points(self, pts):
         rect = np.zeros((4, 2), dtype="float32")
         s = pts.sum(axis=1)
@@ -16,62 +31,68 @@ class PerspectiveCorrector:
         rect[3] = pts[np.argmax(diff)]
         return rect
 
+    def hull_corners(self, hull):
+        pts = hull.reshape(-1, 2).astype(np.int64)
+        diff = pts[:, None, :] - pts[None, :, :]
+        distances = np.sum(diff ** 2, axis=(1, 2))
+        return hull[np.argsort(distances)[-4:]]
+
+    def contour_quad(self, cnt):
+        peri = cv2.arcLength(cnt, True)
+        approx = cv2.approxPolyDP(cnt, 0.05 * peri, True)
+        if len(approx) < 4:
+            return False, None
+        if len(approx) == 4:
+            return True, approx
+        hull = cv2.convexHull(approx)
+        if len(hull) < 4:
+            return True, None
+        return True, self.hull_corners(hull)
+
     def getContours(self, img, orig):
         biggest = np.array([])
-        maxArea = 0
         imgContour = orig.copy()
         contours, _ = cv2.findContours(img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         index = None
-        
-        for i, cnt in enumerate(contours):
-            area = cv2.contourArea(cnt)
-            if area > 100:
-                peri = cv2.arcLength(cnt, True)
-                approx = cv2.approxPolyDP(cnt, 0.05 * peri, True)
-                if area > maxArea and len(approx) >= 4:
-                    if len(approx) > 4:
-                        hull = cv2.convexHull(approx)
-                        if len(hull) >= 4:
-                            distances = []
-                            for point in hull:
-                                dist = np.sum((hull - point)**2, axis=2)
-                                distances.append(np.sum(dist))
-                            sorted_indices = np.argsort(distances)[-4:]
-                            biggest = hull[sorted_indices]
-                        else:
-                            biggest = None
-                    else:
-                        biggest = approx
-                    if biggest is not None and len(biggest) == 4 and biggest.size > 0:
-                        maxArea = area
-                        index = i
-                    else:
-                        biggest = np.array([])
+
+        areas = np.array([cv2.contourArea(cnt) for cnt in contours], dtype=np.float64)
+        candidates = np.flatnonzero(areas > 100)
+        candidates = candidates[np.lexsort((candidates, -areas[candidates]))]
+
+        rejected_after = -1
+        for i in candidates:
+            is_polygon, quad = self.contour_quad(contours[i])
+            if not is_polygon:
+                continue
+            if quad is None:
+                rejected_after = max(rejected_after, int(i))
+                continue
+            if rejected_after < i:
+                biggest = quad
+                index = int(i)
+            break
 
         warped = None
         if index is not None and len(biggest) == 4 and biggest.size > 0:
             cv2.drawContours(imgContour, contours, index, (0, 255, 0), 2)
             cv2.drawContours(imgContour, [biggest], -1, (255, 0, 0), 3)
-            
-            src = np.squeeze(biggest).astype(np.float32)
-            src = self.order_points(src)
-            
-            width = max(np.linalg.norm(src[0] - src[1]), np.linalg.norm(src[2] - src[3]))
-            height = max(np.linalg.norm(src[1] - src[2]), np.linalg.norm(src[3] - src[0]))
-            
-            dst = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
-            
-            M = cv2.getPerspectiveTransform(src, dst)
-            warped = cv2.warpPerspective(orig, M, (int(width), int(height)), flags=cv2.INTER_LINEAR)
+            warped = self.warp_quad(orig, biggest)
         
         return biggest, imgContour, warped
 
-    def correct_perspective(self, image_path, output_path):
-        img = cv2.imread(image_path)
-        if img is None:
-            print(f"Error: Could not load image {image_path} for perspective correction.")
-            return False
+    def warp_quad(self, orig, quad):
+        src = np.squeeze(np.asarray(quad)).astype(np.float32)
+        src = self.order_points(src)
+        
+        width = max(np.linalg.norm(src[0] - src[1]), np.linalg.norm(src[2] - src[3]))
+        height = max(np.linalg.norm(src[1] - src[2]), np.linalg.norm(src[3] - src[0]))
+        
+        dst = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+        
+        M = cv2.getPerspectiveTransform(src, dst)
+        return cv2.warpPerspective(orig, M, (int(width), int(height)), flags=cv2.INTER_LINEAR)
 
+    def find_quad(self, img):
         imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         imgBlur = cv2.GaussianBlur(imgGray, (5, 5), 1)
         imgCanny = cv2.Canny(imgBlur, 50, 150)
@@ -79,7 +100,36 @@ class PerspectiveCorrector:
         imgDial = cv2.dilate(imgCanny, kernel, iterations=2)
         imgThres = cv2.erode(imgDial, kernel, iterations=1)
         
-        _, _, warped = self.getContours(imgThres, img)
+        biggest, _, warped = self.getContours(imgThres, img)
+        if warped is None:
+            return None, None
+        return np.squeeze(biggest).reshape(4, 2).tolist(), warped
+
+    def correct_perspective_image(self, img):
+        with self.metrics.timer("perspective_warp"):
+            return self._correct_perspective_image(img)
+
+    def _correct_perspective_image(self, img):
+        if self.result_cache is None:
+            return self.find_quad(img)[1]
+
+        cache_key = ResultCache.make_key("perspective", hash_image(img))
+        hit, quad = self.result_cache.get("perspective", cache_key)
+        if hit:
+            return None if quad is None else self.warp_quad(img, quad)
+
+        quad, warped = self.find_quad(img)
+        self.result_cache.set("perspective", cache_key, quad)
+        return warped
+
+    def correct_perspective(self, image_path, output_path):
+        with self.metrics.timer("image_decode"):
+            img = cv2.imread(image_path)
+        if img is None:
+            print(f"Error: Could not load image {image_path} for perspective correction.")
+            return False
+
+        warped = self.correct_perspective_image(img)
 
         if warped is not None:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -89,7 +139,31 @@ class PerspectiveCorrector:
             print(f"Warning: Could not correct perspective for {os.path.basename(image_path)}. No suitable contour found.")
             return False
 
-    def correct_all_images(self, source_directory, output_directory, log_file):
+    def correct_record(self, record, output_directory=None):
+        warped = self.correct_perspective_image(record.image)
+        if warped is None:
+            print(f"Warning: Could not correct perspective for {record.name}. No suitable contour found.")
+            return None
+
+        corrected_record = record.with_image(warped)
+        if output_directory is not None:
+            corrected_record.save(output_directory)
+        return corrected_record
+
+    def _correct_image_file(self, source_directory, output_directory, filename, manifest=None):
+        image_path = os.path.join(source_directory, filename)
+        output_path = os.path.join(output_directory, filename)
+
+        if manifest is not None and manifest.is_done("perspective", filename) and \
+           (not manifest.result("perspective", filename) or os.path.exists(output_path)):
+            return manifest.result("perspective", filename)
+
+        success = self.correct_perspective(image_path, output_path)
+        if manifest is not None:
+            manifest.mark_done("perspective", filename, success)
+        return success
+
+    def correct_all_images(self, source_directory, output_directory, log_file, manifest=None):
         os.makedirs(output_directory, exist_ok=True)
         
         image_files = [f for f in os.listdir(source_directory) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
@@ -105,11 +179,11 @@ class PerspectiveCorrector:
             log.write("PROCESSING IMAGES FOR PERSPECTIVE CORRECTION:\n")
             log.write("-" * 50 + "\n")
 
-            for filename in tqdm(image_files, desc="Correcting Perspective"):
-                image_path = os.path.join(source_directory, filename)
-                output_path = os.path.join(output_directory, filename)
-                
-                success = self.correct_perspective(image_path, output_path)
+            results = self._map_images(
+                lambda filename: self._correct_image_file(source_directory, output_directory, filename, manifest),
+                image_files
+            )
+            for filename, success in tqdm(zip(image_files, results), total=len(image_files), desc="Correcting Perspective"):
                 if success:
                     successful_corrections += 1
                     log.write(f"✓ Corrected perspective for: {filename}\n")
@@ -123,4 +197,36 @@ class PerspectiveCorrector:
             log.write("\n" + "=" * 50 + "\n")
             log.write("PERSPECTIVE CORRECTION LOG END\n")
 
-        print(f"✅ Perspective correction complete. Corrected images saved to: {output_directory}")
\ No newline at end of file
+        print(f"✅ Perspective correction complete. Corrected images saved to: {output_directory}")
+
+    def correct_all_records(self, records, log_file, output_directory=None):
+        corrected_records = []
+        successful_corrections = 0
+        failed_corrections = 0
+
+        with open(log_file, 'a', encoding='utf-8') as log:
+            log.write("\n\n" + "=" * 50 + "\n")
+            log.write("STARTING PERSPECTIVE CORRECTION LOG\n")
+            log.write("=" * 50 + "\n\n")
+            log.write("PROCESSING IMAGES FOR PERSPECTIVE CORRECTION:\n")
+            log.write("-" * 50 + "\n")
+
+            records = list(records)
+            results = self._map_images(lambda record: self.correct_record(record, output_directory), records)
+            for record, corrected_record in tqdm(zip(records, results), total=len(records), desc="Correcting Perspective"):
+                if corrected_record is not None:
+                    corrected_records.append(corrected_record)
+                    successful_corrections += 1
+                    log.write(f"✓ Corrected perspective for: {record.name}\n")
+                else:
+                    failed_corrections += 1
+                    log.write(f"✗ Failed to correct perspective for: {record.name}\n")
+
+            log.write(f"\nTotal Successful Corrections: {successful_corrections}\n")
+            log.write(f"Total Failed Corrections: {failed_corrections}\n")
+            log.write(f"Total Images Processed: {successful_corrections + failed_corrections}\n")
+            log.write("\n" + "=" * 50 + "\n")
+            log.write("PERSPECTIVE CORRECTION LOG END\n")
+
+        print(f"✅ Perspective correction complete. {successful_corrections} corrected images kept in memory.")
+        return corrected_records
\ No newline at end of file
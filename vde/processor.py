@@ -3,6 +3,11 @@ import json
 import shutil
 import time
 import re
+import asyncio
+import threading
+import copy
+from collections import defaultdict
+import numpy as np
 from tqdm import tqdm
 from vde.easy_ocr import EasyOCRRecognizer
 from config.config import Config
@@ -11,16 +16,72 @@ from vde.perspective import PerspectiveCorrector
 from vde.text_detection import TextDetector
 from vde.text_recognition import TextRecognizer
 from vde.ngram_postprocessor import NgramPostprocessor
+from vde.record import ImageRecord
+from vde.http_client import OCRHttpClient
+from vde.payload import ImagePayloadBuilder
+from vde.result_sink import ListResultSink
+from vde.streaming import StreamingPipeline
+from vde.frame_source import VideoFrameSource
+from vde.tracking import PlateTracker, consolidate_tracks
+from vde.cache import ResultCache
+from vde.manifest import RunManifest
+from vde.metrics import PipelineMetrics
+from vde.visualizer import VisualizationWriter
 
 class DocumentProcessor:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, metrics=None):
         self.config = config
-        self.yolo_detector = YOLODetector(self.config)
-        self.perspective_corrector = PerspectiveCorrector()
-        self.text_detector = TextDetector(self.config)
-        self.text_recognizer = TextRecognizer(self.config)
-        self.easy_ocr_recognizer = EasyOCRRecognizer(self.config)
-        self.ngram_postprocessor = NgramPostprocessor(self.config)
+        self.result_cache = ResultCache.from_config(self.config)
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.visualizer = VisualizationWriter(self.config, metrics=self.metrics)
+        self.yolo_detector = YOLODetector(self.config, result_cache=self.result_cache, metrics=self.metrics,
+                                          visualizer=self.visualizer)
+        self.perspective_corrector = PerspectiveCorrector(result_cache=self.result_cache, workers=self.config.perspective_workers,
+                                                          metrics=self.metrics)
+        self.http_client = OCRHttpClient(self.config, metrics=self.metrics)
+        self.payload_builder = ImagePayloadBuilder(self.config, metrics=self.metrics)
+        self.text_detector = TextDetector(self.config, http_client=self.http_client, result_cache=self.result_cache,
+                                          payload_builder=self.payload_builder, visualizer=self.visualizer)
+        self.text_recognizer = TextRecognizer(self.config, http_client=self.http_client, result_cache=self.result_cache,
+                                              payload_builder=self.payload_builder)
+        self.easy_ocr_recognizer = EasyOCRRecognizer(self.config, result_cache=self.result_cache, metrics=self.metrics,
+                                                     visualizer=self.visualizer)
+        self.ngram_postprocessor = NgramPostprocessor(self.config, metrics=self.metrics)
+        self.model_lock = threading.Lock()
+        self.manifest = None
+
+    def with_config(self, config):
+        processor = copy.copy(self)
+        processor.config = config
+        processor.manifest = None
+        processor.visualizer = self.visualizer.with_config(config)
+        processor.yolo_detector = self._component_with_config(self.yolo_detector, config, visualizer=processor.visualizer)
+        processor.text_detector = self._component_with_config(self.text_detector, config, visualizer=processor.visualizer)
+        processor.text_recognizer = self._component_with_config(self.text_recognizer, config)
+        processor.easy_ocr_recognizer = self._component_with_config(self.easy_ocr_recognizer, config,
+                                                                    visualizer=processor.visualizer)
+        processor.ngram_postprocessor = self._component_with_config(self.ngram_postprocessor, config)
+        return processor
+
+    @staticmethod
+    def _component_with_config(component, config, **attributes):
+        # Models, caches and HTTP clients stay shared; only the config (paths and flags) is per copy.
+        component = copy.copy(component)
+        component.config = config
+        for name, value in attributes.items():
+            setattr(component, name, value)
+        return component
+
+    def close(self):
+        self.visualizer.close()
+        self.ngram_postprocessor.save_correction_cache(force=True)
+
+    def warm_up(self):
+        dummy_image = np.zeros((640, 640, 3), dtype=np.uint8)
+        if self.yolo_detector.model is not None:
+            self.yolo_detector.model.predict([dummy_image])
+        if self.config.run_easy_ocr:
+            self.easy_ocr_recognizer.reader.readtext(dummy_image[:64, :256])
 
     def _clear_folder(self, folder_path):
         if os.path.exists(folder_path):
@@ -41,17 +102,27 @@ class DocumentProcessor:
     def natural_sort_key(self, s):
         return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
 
-    def run_full_pipeline(self):
-        print("=" * 60)
-        print("STARTING FULL DOCUMENT PROCESSING PIPELINE")
-        print("=" * 60)
+    def _list_input_images(self):
+        input_images = [os.path.join(self.config.input_folder, f)
+                        for f in os.listdir(self.config.input_folder)
+                        if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+        input_images.sort(key=self.natural_sort_key)
+        return input_images
+
+    def _prepare_run(self, resume=False):
+        if resume:
+            print(f"\nResuming previous run from manifest: {self.config.manifest_file}")
+            self.manifest = RunManifest(self.config.manifest_file, resume=True)
+            with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                log.write("\n\n" + "=" * 50 + "\n")
+                log.write("RESUMING RUN\n")
+                log.write("=" * 50 + "\n")
+            return
 
         if os.path.exists(self.config.log_file):
             with open(self.config.log_file, 'w') as f:
                 f.truncate(0)
 
-        yolo_detected_cropped_image_paths = []
-
         print("\nClearing previous output directories...")
         self._clear_folder(self.config.yolo_cropped_vehicles_folder)
         self._clear_folder(self.config.yolo_detection_vis_folder)
@@ -64,129 +135,531 @@ class DocumentProcessor:
         self._clear_folder(self.config.easy_ocr_results_folder)
         self._clear_folder(self.config.ngram_results_folder)
 
+        self.manifest = RunManifest(self.config.manifest_file, resume=False)
+
+    def run_full_pipeline(self, resume=False):
+        if self.config.streaming_pipeline:
+            return self.run_streaming_pipeline(resume=resume)
+        if self.config.in_memory_pipeline:
+            return self.run_in_memory_pipeline(resume=resume)
+
+        print("=" * 60)
+        print("STARTING FULL DOCUMENT PROCESSING PIPELINE")
+        print("=" * 60)
+
+        self._prepare_run(resume=resume)
+
+        yolo_detected_cropped_image_paths = []
+
         if self.config.run_yolo_detection:
-            print("\n0. Running YOLOv8 Vehicle Detection...")
-            if self.yolo_detector.model is None:
-                print("Skipping YOLOv8 detection as the model failed to load.")
-            else:
-                input_images = [os.path.join(self.config.input_folder, f)
-                                for f in os.listdir(self.config.input_folder)
-                                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
-                input_images.sort(key=self.natural_sort_key) 
-
-                if self.config.limit is not None:
-                    input_images = input_images[:self.config.limit]
-                    print(f"    (YOLO processing limited to the first {len(input_images)} images from {self.config.input_folder})")
-
-                all_yolo_detections_log = [] 
+            with self.metrics.timer("stage.yolo", cpu="process"):
+                print("\n0. Running YOLOv8 Vehicle Detection...")
+                if self.yolo_detector.model is None:
+                    print("Skipping YOLOv8 detection as the model failed to load.")
+                else:
+                    input_images = self._list_input_images()
+
+                    if self.config.limit is not None:
+                        input_images = input_images[:self.config.limit]
+                        print(f"    (YOLO processing limited to the first {len(input_images)} images from {self.config.input_folder})")
+
+                    all_yolo_detections_log = ListResultSink(self.config.yolo_detection_results_file, keep=False)
                 
-                os.makedirs(self.config.yolo_cropped_vehicles_folder, exist_ok=True)
-                os.makedirs(self.config.yolo_detection_vis_folder, exist_ok=True)
-
-                with open(self.config.log_file, 'a', encoding='utf-8') as log:
-                    log.write("\n\n" + "=" * 50 + "\n")
-                    log.write("STARTING YOLOv8 DETECTION LOG\n")
-                    log.write("=" * 50 + "\n\n")
-                    log.write("PROCESSING IMAGES FOR YOLO DETECTION:\n")
-                    log.write("-" * 50 + "\n")
-
-                    yolo_success_count = 0
-                    yolo_fail_count = 0
-
-                    for img_path in tqdm(input_images, desc="YOLO Detecting and Cropping"):
-                        original_filename = os.path.basename(img_path)
-                        detections = self.yolo_detector.detect_and_crop_vehicles(
-                            img_path,
-                            self.config.yolo_cropped_vehicles_folder,
-                            self.config.yolo_detection_vis_folder,
-                            all_yolo_detections_log 
-                        )
-                        if detections:
-                            yolo_success_count += 1
-                            log.write(f"✓ Detected {len(detections)} vehicles in: {original_filename}\n")
-                        else:
-                            yolo_fail_count += 1
-                            log.write(f"✗ No vehicles detected in: {original_filename}\n")
+                    os.makedirs(self.config.yolo_cropped_vehicles_folder, exist_ok=True)
+                    os.makedirs(self.config.yolo_detection_vis_folder, exist_ok=True)
+
+                    with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                        log.write("\n\n" + "=" * 50 + "\n")
+                        log.write("STARTING YOLOv8 DETECTION LOG\n")
+                        log.write("=" * 50 + "\n\n")
+                        log.write("PROCESSING IMAGES FOR YOLO DETECTION:\n")
+                        log.write("-" * 50 + "\n")
+
+                        yolo_success_count = 0
+                        yolo_fail_count = 0
+
+                        batch_size = self.config.yolo_batch_size
+                        with tqdm(total=len(input_images), desc="YOLO Detecting and Cropping") as pbar:
+                            for start in range(0, len(input_images), batch_size):
+                                batch_paths = input_images[start:start + batch_size]
+                                pending_paths = [p for p in batch_paths
+                                                 if not self.manifest.is_done("yolo", os.path.basename(p))]
+                                pending_detections = self.yolo_detector.detect_and_crop_vehicles_batch(
+                                    pending_paths,
+                                    self.config.yolo_cropped_vehicles_folder,
+                                    self.config.yolo_detection_vis_folder,
+                                    all_yolo_detections_log,
+                                    batch_size=batch_size
+                                ) if pending_paths else []
+                                detections_by_path = dict(zip(pending_paths, pending_detections))
 
-                        for det in detections:
-                            yolo_detected_cropped_image_paths.append(det['cropped_image_path'])
+                                for img_path in batch_paths:
+                                    original_filename = os.path.basename(img_path)
+                                    if img_path in detections_by_path:
+                                        detections = detections_by_path[img_path]
+                                        self.manifest.mark_done("yolo", original_filename, detections)
+                                    else:
+                                        detections = self.manifest.result("yolo", original_filename)
+                                        all_yolo_detections_log.extend(detections)
+                                        log.write(f"↷ Already processed by YOLO: {original_filename}\n")
+                                    if detections:
+                                        yolo_success_count += 1
+                                        log.write(f"✓ Detected {len(detections)} vehicles in: {original_filename}\n")
+                                    else:
+                                        yolo_fail_count += 1
+                                        log.write(f"✗ No vehicles detected in: {original_filename}\n")
+
+                                    for det in detections:
+                                        yolo_detected_cropped_image_paths.append(det['cropped_image_path'])
+                                pbar.update(len(batch_paths))
                 
-                    log.write(f"\nTotal Successful YOLO Detections (at least one vehicle): {yolo_success_count}\n")
-                    log.write(f"Total Failed YOLO Detections (no vehicles): {yolo_fail_count}\n")
-                    log.write(f"Total Images Processed by YOLO: {yolo_success_count + yolo_fail_count}\n")
-                    log.write("\n" + "=" * 50 + "\n")
-                    log.write("YOLOv8 DETECTION LOG END\n")
+                        log.write(f"\nTotal Successful YOLO Detections (at least one vehicle): {yolo_success_count}\n")
+                        log.write(f"Total Failed YOLO Detections (no vehicles): {yolo_fail_count}\n")
+                        log.write(f"Total Images Processed by YOLO: {yolo_success_count + yolo_fail_count}\n")
+                        log.write("\n" + "=" * 50 + "\n")
+                        log.write("YOLOv8 DETECTION LOG END\n")
 
-                with open(self.config.yolo_detection_results_file, 'w', encoding='utf-8') as f:
-                    json.dump(all_yolo_detections_log, f, indent=2, ensure_ascii=False)
-                print(f"✅ Saved detailed YOLO detection results to: {self.config.yolo_detection_results_file}")
-                print(f"🖼️ Saved YOLO visualized images to: {self.config.yolo_detection_vis_folder}")
-                print(f"✂️ Saved cropped vehicle images to: {self.config.yolo_cropped_vehicles_folder}")
+                    all_yolo_detections_log.close()
+                    print(f"✅ Saved detailed YOLO detection results to: {self.config.yolo_detection_results_file}")
+                    print(f"🖼️ Saved YOLO visualized images to: {self.config.yolo_detection_vis_folder}")
+                    print(f"✂️ Saved cropped vehicle images to: {self.config.yolo_cropped_vehicles_folder}")
 
 
         if self.config.run_perspective_correction:
-            print("\n1. Running Perspective Correction...")
+            with self.metrics.timer("stage.perspective", cpu="process"):
+                print("\n1. Running Perspective Correction...")
             
-            if self.config.run_yolo_detection and yolo_detected_cropped_image_paths:
-                perspective_correction_input_paths = yolo_detected_cropped_image_paths
-                print(f"    (Processing {len(perspective_correction_input_paths)} images from YOLO cropped vehicles)")
-            else:
-                perspective_correction_input_paths = [os.path.join(self.config.input_folder, f)
-                                              for f in os.listdir(self.config.input_folder)
-                                              if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
-                perspective_correction_input_paths.sort(key=self.natural_sort_key)
-                print(f"    (Processing {len(perspective_correction_input_paths)} images from original input folder)")
-
-            os.makedirs(self.config.corrected_output_folder, exist_ok=True)
+                if self.config.run_yolo_detection and yolo_detected_cropped_image_paths:
+                    perspective_correction_input_paths = yolo_detected_cropped_image_paths
+                    print(f"    (Processing {len(perspective_correction_input_paths)} images from YOLO cropped vehicles)")
+                else:
+                    perspective_correction_input_paths = self._list_input_images()
+                    print(f"    (Processing {len(perspective_correction_input_paths)} images from original input folder)")
+
+                os.makedirs(self.config.corrected_output_folder, exist_ok=True)
             
-            self.perspective_corrector.correct_all_images(
-                source_directory=self.config.yolo_cropped_vehicles_folder if self.config.run_yolo_detection else self.config.input_folder,
-                output_directory=self.config.corrected_output_folder,
-                log_file=self.config.log_file
-            )
+                self.perspective_corrector.correct_all_images(
+                    source_directory=self.config.yolo_cropped_vehicles_folder if self.config.run_yolo_detection else self.config.input_folder,
+                    output_directory=self.config.corrected_output_folder,
+                    log_file=self.config.log_file,
+                    manifest=self.manifest
+                )
 
         if self.config.run_text_detection:
-            print("\n2. Running Text Detection...")
-            self.text_detector.get_text_detections(
-                image_folder=self.config.corrected_output_folder,
-                output_json_path=self.config.detection_results_file,
-                vis_folder=self.config.detection_vis_folder,
-                log_file=self.config.log_file
-            )
+            with self.metrics.timer("stage.text_detection", cpu="process"):
+                print("\n2. Running Text Detection...")
+                self.text_detector.get_text_detections(
+                    image_folder=self.config.corrected_output_folder,
+                    output_json_path=self.config.detection_results_file,
+                    vis_folder=self.config.detection_vis_folder,
+                    log_file=self.config.log_file,
+                    manifest=self.manifest
+                )
+
+        if self.config.run_box_refinement:
+            with self.metrics.timer("stage.box_refinement", cpu="process"):
+                print("\n2b. Refining Detected Text Boxes...")
+                self.text_detector.refine_detections(
+                    image_folder=self.config.corrected_output_folder,
+                    detection_json_path=self.config.detection_results_file,
+                    output_json_path=self.config.refined_detection_file,
+                    log_file=self.config.log_file
+                )
 
         if self.config.run_post_processing:
-            print("\n3. Post-processing Detection Results...")
-            self.text_detector.post_process_detections(
-                detection_json_path=self.config.detection_results_file,
-                output_json_path=self.config.processed_detection_file
-            )
+            with self.metrics.timer("stage.post_processing", cpu="process"):
+                print("\n3. Post-processing Detection Results...")
+                self.text_detector.post_process_detections(
+                    detection_json_path=self.config.refined_detection_file if self.config.run_box_refinement else self.config.detection_results_file,
+                    output_json_path=self.config.processed_detection_file
+                )
 
         if self.config.run_text_recognition:
-            print("\n4. Running Text Recognition...")
-            self.text_recognizer.process_text_recognition(
-                image_folder=self.config.corrected_output_folder,
-                bbox_json_file=self.config.processed_detection_file,
-                recognition_output_file=self.config.recognition_results_file,
-                log_file=self.config.log_file
-            )
+            with self.metrics.timer("stage.text_recognition", cpu="process"):
+                print("\n4. Running Text Recognition...")
+                self.text_recognizer.process_text_recognition(
+                    image_folder=self.config.corrected_output_folder,
+                    bbox_json_file=self.config.processed_detection_file,
+                    recognition_output_file=self.config.recognition_results_file,
+                    log_file=self.config.log_file,
+                    manifest=self.manifest
+                )
         if self.config.run_easy_ocr: 
-            print("\n5. Running Text Recognition (EasyOCR)...")
-            self.easy_ocr_recognizer.process_images_for_ocr(
-                image_folder=self.config.corrected_output_folder,
-                output_json_path=self.config.easy_ocr_results_file, 
-                vis_folder=self.config.easy_ocr_vis_folder,
-                log_file=self.config.log_file
-            )
+            with self.metrics.timer("stage.easy_ocr", cpu="process"):
+                print("\n5. Running Text Recognition (EasyOCR)...")
+                self.easy_ocr_recognizer.process_images_for_ocr(
+                    image_folder=self.config.corrected_output_folder,
+                    output_json_path=self.config.easy_ocr_results_file, 
+                    vis_folder=self.config.easy_ocr_vis_folder,
+                    log_file=self.config.log_file,
+                    manifest=self.manifest
+                )
         
         if self.config.run_ngram_post_processing:
-            print("\n6. Running N-gram Similarity Post-processing...")
-            self.ngram_postprocessor.process_and_enrich_results(
-                main_recognition_file=self.config.recognition_results_file,
-                easy_ocr_file=self.config.easy_ocr_results_file,
-                output_file=self.config.ngram_results_file,
-                log_file=self.config.log_file
-            )
+            with self.metrics.timer("stage.ngram", cpu="process"):
+                print("\n6. Running N-gram Similarity Post-processing...")
+                self.ngram_postprocessor.process_and_enrich_results(
+                    main_recognition_file=self.config.recognition_results_file,
+                    easy_ocr_file=self.config.easy_ocr_results_file,
+                    output_file=self.config.ngram_results_file,
+                    log_file=self.config.log_file
+                )
+
+        self._finish_run()
+
+    def _load_input_records(self):
+        input_images = self._list_input_images()
+        if self.config.limit is not None:
+            input_images = input_images[:self.config.limit]
+
+        records = []
+        for img_path in input_images:
+            with self.metrics.timer("image_decode"):
+                record = ImageRecord.from_path(img_path)
+            if record is None:
+                print(f"Error: Could not load image {img_path}")
+                continue
+            records.append(record)
+        return records
+
+    def _yolo_records_stage(self, records):
+        print("\n0. Running YOLOv8 Vehicle Detection...")
+        if self.yolo_detector.model is None:
+            print("Skipping YOLOv8 detection as the model failed to load.")
+            return records
+
+        all_yolo_detections_log = ListResultSink(self.config.yolo_detection_results_file, keep=False)
+        cropped_records = []
+
+        with open(self.config.log_file, 'a', encoding='utf-8') as log:
+            log.write("\n\n" + "=" * 50 + "\n")
+            log.write("STARTING YOLOv8 DETECTION LOG\n")
+            log.write("=" * 50 + "\n\n")
+            log.write("PROCESSING IMAGES FOR YOLO DETECTION:\n")
+            log.write("-" * 50 + "\n")
+
+            yolo_success_count = 0
+            yolo_fail_count = 0
+
+            batch_size = self.config.yolo_batch_size
+            with tqdm(total=len(records), desc="YOLO Detecting and Cropping") as pbar:
+                for start in range(0, len(records), batch_size):
+                    batch_records = records[start:start + batch_size]
+                    batch_crops = self.yolo_detector.detect_and_crop_records(
+                        batch_records,
+                        self.config.yolo_cropped_vehicles_folder,
+                        self.config.yolo_detection_vis_folder,
+                        all_yolo_detections_log,
+                        save_crops=self.config.save_intermediate_images,
+                        batch_size=batch_size
+                    )
+                    for record, crops in zip(batch_records, batch_crops):
+                        if crops:
+                            yolo_success_count += 1
+                            log.write(f"✓ Detected {len(crops)} vehicles in: {record.name}\n")
+                        else:
+                            yolo_fail_count += 1
+                            log.write(f"✗ No vehicles detected in: {record.name}\n")
+                        cropped_records.extend(crops)
+                    pbar.update(len(batch_records))
+
+            log.write(f"\nTotal Successful YOLO Detections (at least one vehicle): {yolo_success_count}\n")
+            log.write(f"Total Failed YOLO Detections (no vehicles): {yolo_fail_count}\n")
+            log.write(f"Total Images Processed by YOLO: {yolo_success_count + yolo_fail_count}\n")
+            log.write("\n" + "=" * 50 + "\n")
+            log.write("YOLOv8 DETECTION LOG END\n")
+
+        all_yolo_detections_log.close()
+        print(f"✅ Saved detailed YOLO detection results to: {self.config.yolo_detection_results_file}")
+        return cropped_records
+
+    def _tracking_records_stage(self, frames, crops):
+        print("\n0b. Tracking Vehicles Across Frames...")
+        tracker = PlateTracker.from_config(self.config)
+        crops_by_frame = defaultdict(list)
+        for crop in crops:
+            crops_by_frame[crop.source_name].append(crop)
+
+        for frame in frames:
+            tracker.update(frame.name, frame.image.shape, crops_by_frame.get(frame.source_name, []))
+        tracker.flush()
+        selected_crops = tracker.select_crops(tracker.finished)
+
+        stats = tracker.stats()
+        message = f"Tracking: {stats['crops']} vehicle crops grouped into {stats['tracks']} tracks, {stats['selected_crops']} crops selected for OCR"
+        print(f"    ({message})")
+        with open(self.config.log_file, 'a', encoding='utf-8') as log:
+            log.write(f"\n{message}\n")
+        return tracker, selected_crops
+
+    def _save_track_results(self, tracks, results_by_crop):
+        track_results = consolidate_tracks(tracks, results_by_crop)
+        os.makedirs(os.path.dirname(self.config.track_results_file), exist_ok=True)
+        with open(self.config.track_results_file, 'w', encoding='utf-8') as f:
+            json.dump(track_results, f, indent=2, ensure_ascii=False)
+        print(f"✅ Saved per-track results to: {self.config.track_results_file}")
+        return track_results
+
+    def _crop_results(self, final_results, recognition_results, easy_ocr_results):
+        if final_results is not None:
+            return final_results
+        results_by_crop = defaultdict(dict)
+        for section, data in (("main_recognition", recognition_results), ("easy_ocr_recognition", easy_ocr_results)):
+            for name, result in (data or {}).items():
+                results_by_crop[name][section] = result
+        return results_by_crop
+
+    def _perspective_records_stage(self, records):
+        print("\n1. Running Perspective Correction...")
+        print(f"    (Processing {len(records)} in-memory images)")
+        return self.perspective_corrector.correct_all_records(
+            records,
+            log_file=self.config.log_file,
+            output_directory=self.config.corrected_output_folder if self.config.save_intermediate_images else None
+        )
+
+    def _box_refinement_records_stage(self, records, detection_results):
+        print("\n2b. Refining Detected Text Boxes...")
+        return self.text_detector.refine_detections(
+            image_folder=None,
+            detection_json_path=self.config.detection_results_file,
+            output_json_path=self.config.refined_detection_file,
+            log_file=self.config.log_file,
+            records=records,
+            detection_data=detection_results
+        )
+
+    def _post_processing_records_stage(self, detection_results):
+        print("\n3. Post-processing Detection Results...")
+        return self.text_detector.post_process_detections(
+            detection_json_path=self.config.detection_results_file,
+            output_json_path=self.config.processed_detection_file,
+            detection_data=detection_results
+        )
+
+    def _easy_ocr_records_stage(self, records, text_boxes=None):
+        print("\n5. Running Text Recognition (EasyOCR)...")
+        return self.easy_ocr_recognizer.process_images_for_ocr(
+            image_folder=None,
+            output_json_path=self.config.easy_ocr_results_file,
+            vis_folder=self.config.easy_ocr_vis_folder,
+            log_file=self.config.log_file,
+            records=records,
+            manifest=self.manifest,
+            text_boxes=text_boxes
+        )
+
+    def _ngram_records_stage(self, recognition_results, easy_ocr_results):
+        print("\n6. Running N-gram Similarity Post-processing...")
+        return self.ngram_postprocessor.process_and_enrich_results(
+            main_recognition_file=self.config.recognition_results_file,
+            easy_ocr_file=self.config.easy_ocr_results_file,
+            output_file=self.config.ngram_results_file,
+            log_file=self.config.log_file,
+            main_data=recognition_results,
+            easy_data=easy_ocr_results
+        )
+
+    def _start_in_memory_run(self, records, resume=False):
+        print("=" * 60)
+        print("STARTING FULL DOCUMENT PROCESSING PIPELINE (IN-MEMORY)")
+        print("=" * 60)
+
+        self._prepare_run(resume=resume)
+
+        if records is None:
+            records = self._load_input_records()
+        print(f"    (Loaded {len(records)} images into memory from {self.config.input_folder})")
+        return records
+
+    def _finish_run(self):
+        self.visualizer.flush()
+        if self.visualizer.failed:
+            message = f"Output image writer: {self.visualizer.written} written, {self.visualizer.failed} failed"
+            print(message)
+            with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                log.write(f"\n{message}\n")
+
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+        if self.result_cache.enabled:
+            stats = self.result_cache.stats()
+            message = f"Result cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+            print(message)
+            with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                log.write(f"\n{message}\n")
+
+        if self.metrics.enabled and self.config.write_metrics_summary:
+            self.metrics.write_summary(self.config.metrics_file)
+            with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                log.write("\nSTAGE TIMINGS:\n")
+                log.write(self.metrics.format_summary() + "\n")
+            print(f"⏱️ Saved stage timing summary to: {self.config.metrics_file}")
 
         print("\n" + "=" * 60)
         print("PIPELINE COMPLETED SUCCESSFULLY!")
-        print("=" * 60)
\ No newline at end of file
+        print("=" * 60)
+
+    def run_in_memory_pipeline(self, records=None, resume=False):
+        records = self._start_in_memory_run(records, resume=resume)
+
+        tracker = None
+        if self.config.run_yolo_detection:
+            frames = records
+            with self.metrics.timer("stage.yolo", cpu="process"):
+                records = self._yolo_records_stage(records)
+            if self.config.tracking_enabled and self.yolo_detector.model is not None:
+                with self.metrics.timer("stage.tracking", cpu="process"):
+                    tracker, records = self._tracking_records_stage(frames, records)
+
+        if self.config.run_perspective_correction:
+            with self.metrics.timer("stage.perspective", cpu="process"):
+                records = self._perspective_records_stage(records)
+
+        detection_results = None
+        processed_detections = None
+        recognition_results = None
+        easy_ocr_results = None
+
+        if self.config.run_text_detection:
+            with self.metrics.timer("stage.text_detection", cpu="process"):
+                print("\n2. Running Text Detection...")
+                detection_results = self.text_detector.get_text_detections(
+                    image_folder=None,
+                    output_json_path=self.config.detection_results_file,
+                    vis_folder=self.config.detection_vis_folder,
+                    log_file=self.config.log_file,
+                    records=records,
+                    manifest=self.manifest
+                )
+
+        if self.config.run_box_refinement and detection_results is not None:
+            with self.metrics.timer("stage.box_refinement", cpu="process"):
+                detection_results = self._box_refinement_records_stage(records, detection_results)
+
+        if self.config.run_post_processing:
+            with self.metrics.timer("stage.post_processing", cpu="process"):
+                processed_detections = self._post_processing_records_stage(detection_results)
+
+        if self.config.run_text_recognition:
+            with self.metrics.timer("stage.text_recognition", cpu="process"):
+                print("\n4. Running Text Recognition...")
+                recognition_results = self.text_recognizer.process_text_recognition(
+                    image_folder=None,
+                    bbox_json_file=self.config.processed_detection_file,
+                    recognition_output_file=self.config.recognition_results_file,
+                    log_file=self.config.log_file,
+                    records=records,
+                    bbox_data=processed_detections,
+                    manifest=self.manifest
+                )
+
+        if self.config.run_easy_ocr:
+            with self.metrics.timer("stage.easy_ocr", cpu="process"):
+                easy_ocr_results = self._easy_ocr_records_stage(records, processed_detections)
+
+        final_results = None
+        if self.config.run_ngram_post_processing:
+            with self.metrics.timer("stage.ngram", cpu="process"):
+                final_results = self._ngram_records_stage(recognition_results, easy_ocr_results)
+
+        if tracker is not None:
+            self._save_track_results(tracker.finished, self._crop_results(final_results, recognition_results, easy_ocr_results))
+
+        self._finish_run()
+        return final_results
+
+    async def run_in_memory_pipeline_async(self, async_client, records=None):
+        records = await asyncio.to_thread(self._start_in_memory_run, records)
+
+        if self.config.run_yolo_detection:
+            with self.metrics.timer("stage.yolo", cpu=None):
+                records = await asyncio.to_thread(self._run_with_model_lock, self._yolo_records_stage, records)
+
+        if self.config.run_perspective_correction:
+            with self.metrics.timer("stage.perspective", cpu=None):
+                records = await asyncio.to_thread(self._perspective_records_stage, records)
+
+        detection_results = None
+        processed_detections = None
+        recognition_results = None
+        easy_ocr_results = None
+
+        if self.config.run_text_detection:
+            with self.metrics.timer("stage.text_detection", cpu=None):
+                print("\n2. Running Text Detection (async)...")
+                detection_results = await self.text_detector.get_text_detections_async(
+                    image_folder=None,
+                    output_json_path=self.config.detection_results_file,
+                    vis_folder=self.config.detection_vis_folder,
+                    log_file=self.config.log_file,
+                    async_client=async_client,
+                    records=records
+                )
+
+        if self.config.run_box_refinement and detection_results is not None:
+            with self.metrics.timer("stage.box_refinement", cpu=None):
+                detection_results = await asyncio.to_thread(self._box_refinement_records_stage, records, detection_results)
+
+        if self.config.run_post_processing:
+            with self.metrics.timer("stage.post_processing", cpu=None):
+                processed_detections = await asyncio.to_thread(self._post_processing_records_stage, detection_results)
+
+        if self.config.run_text_recognition:
+            with self.metrics.timer("stage.text_recognition", cpu=None):
+                print("\n4. Running Text Recognition (async)...")
+                recognition_results = await self.text_recognizer.process_text_recognition_async(
+                    image_folder=None,
+                    bbox_json_file=self.config.processed_detection_file,
+                    recognition_output_file=self.config.recognition_results_file,
+                    log_file=self.config.log_file,
+                    async_client=async_client,
+                    records=records,
+                    bbox_data=processed_detections
+                )
+
+        if self.config.run_easy_ocr:
+            with self.metrics.timer("stage.easy_ocr", cpu=None):
+                easy_ocr_results = await asyncio.to_thread(self._run_with_model_lock, self._easy_ocr_records_stage, records,
+                                                          processed_detections)
+
+        final_results = None
+        if self.config.run_ngram_post_processing:
+            with self.metrics.timer("stage.ngram", cpu=None):
+                final_results = await asyncio.to_thread(self._ngram_records_stage, recognition_results, easy_ocr_results)
+
+        await asyncio.to_thread(self._finish_run)
+        return final_results
+
+    def _run_with_model_lock(self, stage_fn, *args):
+        with self.model_lock:
+            return stage_fn(*args)
+
+    def run_streaming_pipeline(self, records=None, on_result=None, resume=False):
+        # Returns the final per-image results: a dict, or a ResultIndex over the file when results are written as JSONL.
+        print("=" * 60)
+        print("STARTING FULL DOCUMENT PROCESSING PIPELINE (STREAMING)")
+        print("=" * 60)
+
+        self._prepare_run(resume=resume)
+        final_results = StreamingPipeline(self).run(records=records, on_result=on_result)
+
+        self._finish_run()
+        return final_results
+
+    def run_video_pipeline(self, source, on_result=None, resume=False):
+        frame_source = VideoFrameSource(self.config, source, metrics=self.metrics).open()
+        print(f"Reading frames from {source} ({frame_source.fps:.1f} fps source, sampling at {self.config.video_sample_fps or 'every frame'})")
+
+        if self.config.streaming_pipeline:
+            final_results = self.run_streaming_pipeline(records=iter(frame_source), on_result=on_result, resume=resume)
+        else:
+            final_results = self.run_in_memory_pipeline(records=list(frame_source), resume=resume)
+
+        message = frame_source.format_stats()
+        print(message)
+        with open(self.config.log_file, 'a', encoding='utf-8') as log:
+            log.write(f"\n{message}\n")
+        return final_results
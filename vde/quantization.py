@@ -0,0 +1,237 @@
+import os
+import io
+import copy
+import json
+import time
+import difflib
+import argparse
+import statistics
+from pathlib import Path
+import cv2
+import numpy as np
+from config.config import Config
+from vde.detector_backends import export_onnx, letterbox, load_detector_backend
+from vde.tracking import box_iou
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+
+def list_images(folder, limit=None):
+    image_paths = sorted(str(p) for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return image_paths[:limit] if limit is not None else image_paths
+
+
+def _model_input_name(onnx_path):
+    import onnxruntime as ort
+    return ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+
+def _calibration_reader(image_paths, imgsz, input_name):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class YoloCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(image_paths)
+
+        def get_next(self):
+            for image_path in self.paths:
+                image = cv2.imread(image_path)
+                if image is None:
+                    continue
+                padded, _, _ = letterbox(image, imgsz)
+                tensor = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+                return {input_name: tensor}
+            return None
+
+    return YoloCalibrationReader()
+
+
+def quantize_yolo(config: Config, mode='static', calibration_folder=None):
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantFormat, QuantType
+
+    float_path = config.yolo_onnx_path
+    if not os.path.exists(float_path):
+        export_onnx(config.yolo_weights_path, float_path, imgsz=config.yolo_imgsz)
+
+    quantized_config = copy.copy(config)
+    quantized_config.yolo_quantization = mode
+    output_path = quantized_config.yolo_quantized_onnx_path
+
+    if mode == 'dynamic':
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QUInt8)
+    elif mode == 'static':
+        calibration_folder = calibration_folder or config.input_folder
+        image_paths = list_images(calibration_folder, limit=config.quantization_calibration_images)
+        if not image_paths:
+            raise FileNotFoundError(f"No calibration images found in {calibration_folder}")
+        print(f"Calibrating on {len(image_paths)} images from {calibration_folder}...")
+        reader = _calibration_reader(image_paths, config.yolo_imgsz, _model_input_name(float_path))
+        quantize_static(float_path, output_path, reader, quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode} (expected 'dynamic' or 'static')")
+
+    print(f"✅ Saved INT8 YOLO model ({mode}) to: {output_path}")
+    return output_path
+
+
+def _latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "median_ms": round(statistics.median(ordered) * 1000, 2) if ordered else None,
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 2) if ordered else None,
+    }
+
+
+def _match_detections(reference, candidate, iou_threshold=0.5):
+    matched = []
+    used = set()
+    for ref in sorted(reference, key=lambda b: -b[4]):
+        best_iou, best_index = 0.0, None
+        for i, cand in enumerate(candidate):
+            if i in used or cand[5] != ref[5]:
+                continue
+            iou = box_iou(ref[:4], cand[:4])
+            if iou > best_iou:
+                best_iou, best_index = iou, i
+        if best_index is not None and best_iou >= iou_threshold:
+            used.add(best_index)
+            matched.append((best_iou, abs(ref[4] - candidate[best_index][4])))
+    return matched
+
+
+def _timed_predict(backend, images):
+    backend.predict(images[:1])
+    outputs = []
+    latencies = []
+    for image in images:
+        started = time.perf_counter()
+        outputs.append(backend.predict([image])[0])
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def compare_yolo(config: Config, images, mode):
+    float_config = copy.copy(config)
+    float_config.yolo_quantization = None
+    if float_config.yolo_backend == 'ultralytics':
+        float_config.yolo_backend = 'onnxruntime'
+    quantized_config = copy.copy(float_config)
+    quantized_config.yolo_quantization = mode
+    if not os.path.exists(quantized_config.yolo_quantized_onnx_path):
+        quantize_yolo(config, mode=mode)
+
+    float_backend = load_detector_backend(float_config)
+    quantized_backend = load_detector_backend(quantized_config)
+    float_outputs, float_latencies = _timed_predict(float_backend, images)
+    quantized_outputs, quantized_latencies = _timed_predict(quantized_backend, images)
+
+    matches = []
+    reference_count = sum(len(boxes) for boxes in float_outputs)
+    candidate_count = sum(len(boxes) for boxes in quantized_outputs)
+    for reference, candidate in zip(float_outputs, quantized_outputs):
+        matches.extend(_match_detections(reference, candidate))
+
+    return {
+        "backend": float_config.yolo_backend,
+        "mode": mode,
+        "float": {"model_mb": round(os.path.getsize(float_backend.model_path) / 1e6, 2), **_latency_summary(float_latencies)},
+        "int8": {"model_mb": round(os.path.getsize(quantized_backend.model_path) / 1e6, 2), **_latency_summary(quantized_latencies)},
+        "float_detections": reference_count,
+        "int8_detections": candidate_count,
+        "recall_vs_float": round(len(matches) / reference_count, 4) if reference_count else None,
+        "precision_vs_float": round(len(matches) / candidate_count, 4) if candidate_count else None,
+        "mean_iou": round(statistics.mean(m[0] for m in matches), 4) if matches else None,
+        "mean_confidence_delta": round(statistics.mean(m[1] for m in matches), 4) if matches else None,
+    }
+
+
+def _recognizer_mb(reader):
+    import torch
+    buffer = io.BytesIO()
+    torch.save(reader.recognizer.state_dict(), buffer)
+    return round(buffer.tell() / 1e6, 2)
+
+
+def _timed_readtext(reader, images):
+    reader.readtext(images[0])
+    texts = []
+    latencies = []
+    for image in images:
+        started = time.perf_counter()
+        results = reader.readtext(image)
+        latencies.append(time.perf_counter() - started)
+        texts.append(" ".join(text for _, text, _ in sorted(results, key=lambda r: (r[0][0][1], r[0][0][0]))))
+    return texts, latencies
+
+
+def compare_easy_ocr(config: Config, images):
+    import easyocr
+    float_reader = easyocr.Reader(config.easy_ocr_languages, gpu=False, quantize=False, verbose=False)
+    quantized_reader = easyocr.Reader(config.easy_ocr_languages, gpu=False, quantize=True, verbose=False)
+    float_texts, float_latencies = _timed_readtext(float_reader, images)
+    quantized_texts, quantized_latencies = _timed_readtext(quantized_reader, images)
+
+    similarities = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(float_texts, quantized_texts)]
+    return {
+        "float": {"recognizer_mb": _recognizer_mb(float_reader), **_latency_summary(float_latencies)},
+        "int8": {"recognizer_mb": _recognizer_mb(quantized_reader), **_latency_summary(quantized_latencies)},
+        "exact_text_match": round(sum(a == b for a, b in zip(float_texts, quantized_texts)) / len(images), 4),
+        "mean_text_similarity": round(statistics.mean(similarities), 4),
+    }
+
+
+def run_report(config: Config, args):
+    image_paths = list_images(args.images, limit=args.limit)
+    images = [img for img in (cv2.imread(p) for p in image_paths) if img is not None]
+    if not images:
+        raise SystemExit(f"No readable images in {args.images}")
+    print(f"Comparing float and INT8 models on {len(images)} images from {args.images}")
+
+    report = {"images": len(images)}
+    if not args.skip_yolo:
+        report["yolo"] = compare_yolo(config, images, args.mode)
+    if not args.skip_easy_ocr:
+        report["easy_ocr"] = compare_easy_ocr(config, images)
+
+    for name in ("yolo", "easy_ocr"):
+        if name in report:
+            section = report[name]
+            print(f"\n{name.upper()}: float median {section['float']['median_ms']} ms, "
+                  f"INT8 median {section['int8']['median_ms']} ms")
+            print(json.dumps({k: v for k, v in section.items() if k not in ("float", "int8")}, ensure_ascii=False))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Quantization report saved to: {args.report}")
+    return report
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Build INT8 models and compare them with the float models.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    calibrate = subparsers.add_parser('calibrate', help="Quantize the YOLO ONNX model to INT8.")
+    calibrate.add_argument('--mode', choices=['static', 'dynamic'], default='static')
+    calibrate.add_argument('--images', default=None, help="Calibration images (defaults to config.input_folder).")
+
+    report = subparsers.add_parser('report', help="Accuracy-vs-speed report for the float and INT8 models.")
+    report.add_argument('--mode', choices=['static', 'dynamic'], default='static')
+    report.add_argument('--images', default=str(PROJECT_ROOT / 'test_images'))
+    report.add_argument('--limit', type=int, default=None)
+    report.add_argument('--skip-yolo', action='store_true')
+    report.add_argument('--skip-easy-ocr', action='store_true')
+    report.add_argument('--report', default=str(PROJECT_ROOT / 'benchmarks' / 'results' / 'quantization_report.json'))
+
+    args = parser.parse_args()
+    if args.command == 'calibrate':
+        quantize_yolo(config, mode=args.mode, calibration_folder=args.images)
+    else:
+        run_report(config, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import cv2
+import numpy as np
+
+
+class ImageRecord:
+    def __init__(self, name, image, source_name=None, source_path=None, metadata=None):
+        self.name = name
+        self.image = image
+        self.source_name = source_name if source_name is not None else name
+        self.source_path = source_path
+        self.metadata = metadata if metadata is not None else {}
+        self.payload = None
+
+    @classmethod
+    def from_path(cls, image_path):
+        image = cv2.imread(str(image_path))
+        if image is None:
+            return None
+        name = os.path.basename(str(image_path))
+        return cls(name, image, source_name=name, source_path=str(image_path))
+
+    @classmethod
+    def from_bytes(cls, name, data):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return cls(name, image, source_name=name)
+
+    def with_image(self, image, name=None):
+        return ImageRecord(
+            name if name is not None else self.name,
+            image,
+            source_name=self.source_name,
+            source_path=self.source_path,
+            metadata=dict(self.metadata),
+        )
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        output_path = os.path.join(folder, self.name)
+        cv2.imwrite(output_path, self.image)
+        return output_path
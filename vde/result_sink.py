@@ -0,0 +1,142 @@
+import os
+import json
+import threading
+
+
+def is_jsonl(path):
+    return str(path).endswith('.jsonl')
+
+
+class _Sink:
+    def _open(self, path, keep):
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.keep = keep or not is_jsonl(self.path)
+        self._file = None
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if is_jsonl(self.path):
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write_line(self, entry):
+        if self._file is not None:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self, sort_key=None):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            elif not is_jsonl(self.path):
+                data = self._snapshot()
+                if sort_key is not None and isinstance(data, dict):
+                    data = {k: data[k] for k in sorted(data, key=sort_key)}
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+class ResultSink(_Sink, dict):
+    def __init__(self, path, keep=True):
+        dict.__init__(self)
+        self._open(path, keep)
+
+    def __setitem__(self, image_name, result):
+        with self.lock:
+            self._write_line({"image": image_name, "result": result})
+            if self.keep:
+                dict.__setitem__(self, image_name, result)
+
+    def _snapshot(self):
+        return dict(self)
+
+
+class ListResultSink(_Sink, list):
+    def __init__(self, path, keep=True):
+        list.__init__(self)
+        self._open(path, keep)
+
+    def append(self, result):
+        with self.lock:
+            self._write_line(result)
+            if self.keep:
+                list.append(self, result)
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def _snapshot(self):
+        return list(self)
+
+
+def _iter_jsonl(f):
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield entry["image"], entry["result"]
+
+
+def read_results(path):
+    if is_jsonl(path):
+        return _iter_jsonl(open(path, 'r', encoding='utf-8'))
+    with open(path, 'r', encoding='utf-8') as f:
+        return iter(json.load(f).items())
+
+
+def load_results(path):
+    return dict(read_results(path))
+
+
+class ResultIndex:
+    def __init__(self, path):
+        self.path = str(path)
+        self.offsets = {}
+        self.data = None
+        if is_jsonl(self.path):
+            with open(self.path, 'rb') as f:
+                offset = f.tell()
+                for line in iter(f.readline, b''):
+                    try:
+                        image_name = json.loads(line)["image"]
+                    except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                        image_name = None
+                    if image_name is not None:
+                        self.offsets[image_name] = offset
+                    offset = f.tell()
+            self._file = open(self.path, 'rb')
+        else:
+            self.data = load_results(self.path)
+            self._file = None
+
+    def __contains__(self, image_name):
+        if self.data is not None:
+            return image_name in self.data
+        return image_name in self.offsets
+
+    def __len__(self):
+        return len(self.data) if self.data is not None else len(self.offsets)
+
+    def keys(self):
+        return list(self.data.keys()) if self.data is not None else list(self.offsets.keys())
+
+    def items(self):
+        for image_name in self.keys():
+            yield image_name, self.get(image_name)
+
+    def get(self, image_name, default=None):
+        if self.data is not None:
+            return self.data.get(image_name, default)
+        if image_name not in self.offsets:
+            return default
+        self._file.seek(self.offsets[image_name])
+        return json.loads(self._file.readline())["result"]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
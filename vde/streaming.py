@@ -0,0 +1,355 @@
+import copy
+import queue
+import threading
+from pathlib import Path
+from tqdm import tqdm
+from vde.record import ImageRecord
+from vde.text_detection import RefinementImage
+from vde.result_sink import ResultSink, ListResultSink, ResultIndex
+from vde.tracking import PlateTracker
+
+_STOP = object()
+
+
+class _StageWorkers:
+    def __init__(self, name, fn, workers, input_queue, output_queue, on_error, flush=None):
+        self.name = name
+        self.fn = fn
+        self.flush = flush
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.on_error = on_error
+        self.remaining = max(1, workers)
+        self.lock = threading.Lock()
+        self.error = None
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+                        for i in range(self.remaining)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            record = self.input_queue.get()
+            if record is _STOP:
+                self._stop()
+                return
+
+            if "error" in record.metadata:
+                self.output_queue.put(record)
+                continue
+            try:
+                outputs = self.fn(record)
+            except Exception as e:
+                self._report_error(record, e)
+                # The failed record still flows to the end so it gets an error row in the results.
+                record.metadata["error"] = f"{self.name}: {e}"
+                outputs = [record]
+            for output in outputs:
+                self.output_queue.put(output)
+
+    def _stop(self):
+        with self.lock:
+            self.remaining -= 1
+            last_worker = self.remaining == 0
+        if not last_worker:
+            self.input_queue.put(_STOP)
+            return
+        try:
+            if self.flush is not None:
+                for output in self.flush():
+                    self.output_queue.put(output)
+        except Exception as e:
+            self.error = e
+            print(f"✗ [{self.name}] failed while flushing: {e}")
+        finally:
+            self.output_queue.put(_STOP)
+
+    def _report_error(self, record, e):
+        try:
+            self.on_error(self.name, record, e)
+        except Exception as log_error:
+            print(f"✗ [{self.name}] failed for image: {record.name} - {e} (could not log it: {log_error})")
+
+
+class StreamingPipeline:
+    def __init__(self, processor):
+        self.processor = processor
+        self.config = processor.config
+        self.log_lock = threading.Lock()
+
+        self.yolo_detections = None
+        self.detection_results = None
+        self.refined_detections = None
+        self.processed_detections = None
+        self.recognition_results = None
+        self.easy_ocr_results = None
+        self.final_results = None
+
+        self.tracker = None
+        self.tracker_lock = threading.Lock()
+        self.track_crop_results = {}
+
+    def _log(self, message):
+        with self.log_lock:
+            with open(self.config.log_file, 'a', encoding='utf-8') as log:
+                log.write(f"{message}\n")
+
+    def _on_error(self, stage_name, record, e):
+        error_message = f"✗ [{stage_name}] failed for image: {record.name} - {e}"
+        print(error_message)
+        self._log(error_message)
+
+    def _iter_input_records(self):
+        input_images = self.processor._list_input_images()
+        if self.config.limit is not None:
+            input_images = input_images[:self.config.limit]
+
+        for img_path in input_images:
+            with self.processor.metrics.timer("image_decode"):
+                record = ImageRecord.from_path(img_path)
+            if record is None:
+                print(f"Error: Could not load image {img_path}")
+                continue
+            yield record
+
+    def _yolo_stage(self, record):
+        crops = self.processor.yolo_detector.detect_and_crop_record(
+            record,
+            self.config.yolo_cropped_vehicles_folder,
+            self.config.yolo_detection_vis_folder,
+            self.yolo_detections,
+            save_crops=self.config.save_intermediate_images
+        )
+        if crops:
+            self._log(f"✓ [YOLO] Detected {len(crops)} vehicles in: {record.name}")
+        else:
+            self._log(f"✗ [YOLO] No vehicles detected in: {record.name}")
+        if self.tracker is not None:
+            with self.tracker_lock:
+                finished_tracks = self.tracker.update(record.name, record.image.shape, crops)
+            return self._track_crops(finished_tracks)
+        return crops
+
+    def _track_crops(self, tracks):
+        for track in tracks:
+            self._log(f"✓ [Tracking] Track {track.track_id} ended after {track.hits} crops "
+                      f"({track.first_frame} to {track.last_frame})")
+        return self.tracker.select_crops(tracks)
+
+    def _flush_tracks(self):
+        with self.tracker_lock:
+            finished_tracks = self.tracker.flush()
+        return self._track_crops(finished_tracks)
+
+    def _perspective_stage(self, record):
+        output_directory = self.config.corrected_output_folder if self.config.save_intermediate_images else None
+        corrected_record = self.processor.perspective_corrector.correct_record(record, output_directory)
+        if corrected_record is None:
+            self._log(f"✗ [Perspective] Failed to correct perspective for: {record.name}")
+            return []
+        self._log(f"✓ [Perspective] Corrected perspective for: {record.name}")
+        return [corrected_record]
+
+    def _text_detection_stage(self, record):
+        manifest = self.processor.manifest
+        if manifest is not None and manifest.is_done("text_detection", record.name):
+            bboxes = manifest.result("text_detection", record.name)
+        else:
+            try:
+                bboxes = self.processor.text_detector.detect_record(record, self.config.detection_vis_folder)
+            except Exception as e:
+                self.detection_results[record.name] = {"error": str(e)}
+                self._on_error("Text Detection", record, e)
+                return [record]
+            if manifest is not None:
+                manifest.mark_done("text_detection", record.name, bboxes)
+
+        self.detection_results[record.name] = bboxes
+        if self.config.run_box_refinement:
+            bboxes = self.processor.text_detector.refine_detection_entries(RefinementImage(image=record.image), bboxes)
+            self.refined_detections[record.name] = bboxes
+        if self.config.run_post_processing:
+            text_boxes = self.processor.text_detector.post_process_detection_data({record.name: bboxes})[record.name]
+            self.processed_detections[record.name] = text_boxes
+            record.metadata["text_boxes"] = text_boxes
+        self._log(f"✓ [Text Detection] Detected text for: {record.name}")
+        return [record]
+
+    def _text_recognition_stage(self, record):
+        if "text_boxes" not in record.metadata:
+            return [record]
+        manifest = self.processor.manifest
+        if manifest is not None and manifest.is_done("text_recognition", record.name):
+            recognition = manifest.result("text_recognition", record.name)
+        else:
+            try:
+                recognition = self.processor.text_recognizer.recognize_record(record, record.metadata["text_boxes"])
+            except Exception as e:
+                self.recognition_results[record.name] = {"error": str(e)}
+                self._on_error("Text Recognition", record, e)
+                return [record]
+            if manifest is not None:
+                manifest.mark_done("text_recognition", record.name, recognition)
+
+        self.recognition_results[record.name] = recognition
+        record.metadata["main_recognition"] = recognition
+        self._log(f"✓ [Text Recognition] Recognized text for: {record.name}")
+        return [record]
+
+    def _easy_ocr_stage(self, record):
+        manifest = self.processor.manifest
+        if manifest is not None and manifest.is_done("easy_ocr", record.name):
+            easy_ocr_result = manifest.result("easy_ocr", record.name)
+        else:
+            try:
+                if self.config.easy_ocr_use_detected_boxes and record.metadata.get("text_boxes"):
+                    easy_ocr_result = self.processor.easy_ocr_recognizer.ocr_image_with_boxes(
+                        Path(record.name), self.config.easy_ocr_vis_folder, record.metadata["text_boxes"], image=record.image
+                    )
+                else:
+                    easy_ocr_result = self.processor.easy_ocr_recognizer.ocr_image(
+                        Path(record.name), self.config.easy_ocr_vis_folder, image=record.image
+                    )
+            except Exception as e:
+                easy_ocr_result = {"error": str(e)}
+                self._on_error("EasyOCR", record, e)
+            else:
+                self._log(f"✓ [EasyOCR] EasyOCR processed: {record.name}")
+                if manifest is not None:
+                    manifest.mark_done("easy_ocr", record.name, easy_ocr_result)
+
+        self.easy_ocr_results[record.name] = easy_ocr_result
+        record.metadata["easy_ocr_recognition"] = easy_ocr_result
+        return [record]
+
+    def _finalize_record(self, record):
+        if "error" in record.metadata:
+            image_results = {"error": record.metadata["error"]}
+            self.final_results[record.name] = image_results
+            return image_results
+
+        image_results = {}
+        for section in ("main_recognition", "easy_ocr_recognition"):
+            if section in record.metadata:
+                image_results[section] = copy.deepcopy(record.metadata[section])
+
+        if self.config.run_ngram_post_processing and image_results:
+            self.processor.ngram_postprocessor.enrich_image_results(image_results)
+            self._log(f"✓ [N-gram] N-gram processed: {record.name}")
+
+        self.final_results[record.name] = image_results
+        if "track_id" in record.metadata:
+            self.track_crop_results[record.name] = image_results
+        return image_results
+
+    def _build_stages(self):
+        stages = []
+        if self.config.run_yolo_detection and self.processor.yolo_detector.model is not None:
+            if self.config.tracking_enabled:
+                self.tracker = PlateTracker.from_config(self.config)
+                stages.append(("YOLO", self._yolo_stage, 1))
+            else:
+                stages.append(("YOLO", self._yolo_stage, self.config.streaming_yolo_workers))
+        if self.config.run_perspective_correction:
+            stages.append(("Perspective", self._perspective_stage, self.config.streaming_perspective_workers))
+        if self.config.run_text_detection:
+            stages.append(("Text Detection", self._text_detection_stage, self.config.streaming_detection_workers))
+        if self.config.run_text_recognition:
+            stages.append(("Text Recognition", self._text_recognition_stage, self.config.streaming_recognition_workers))
+        if self.config.run_easy_ocr:
+            stages.append(("EasyOCR", self._easy_ocr_stage, self.config.streaming_easy_ocr_workers))
+        return stages
+
+    def _open_sinks(self):
+        def sink(enabled, path, sink_type=ResultSink):
+            if enabled:
+                return sink_type(path, keep=False)
+            return [] if sink_type is ListResultSink else {}
+
+        self.yolo_detections = sink(self.config.run_yolo_detection, self.config.yolo_detection_results_file, ListResultSink)
+        self.detection_results = sink(self.config.run_text_detection, self.config.detection_results_file)
+        self.refined_detections = sink(self.config.run_box_refinement, self.config.refined_detection_file)
+        self.processed_detections = sink(self.config.run_post_processing, self.config.processed_detection_file)
+        self.recognition_results = sink(self.config.run_text_recognition, self.config.recognition_results_file)
+        self.easy_ocr_results = sink(self.config.run_easy_ocr, self.config.easy_ocr_results_file)
+        self.final_results = sink(self.config.run_ngram_post_processing, self.config.ngram_results_file)
+
+    def _save_results(self):
+        for results in (self.yolo_detections, self.detection_results, self.refined_detections, self.processed_detections,
+                        self.recognition_results, self.easy_ocr_results, self.final_results):
+            if isinstance(results, ListResultSink):
+                results.close()
+            elif isinstance(results, ResultSink):
+                results.close(sort_key=self.processor.natural_sort_key)
+
+    def run(self, records=None, on_result=None):
+        if records is None:
+            records = self._iter_input_records()
+
+        self._open_sinks()
+        stages = self._build_stages()
+        queues = [queue.Queue(maxsize=self.config.streaming_queue_size) for _ in range(len(stages) + 1)]
+        workers = [_StageWorkers(name, fn, count, queues[i], queues[i + 1], self._on_error,
+                                 flush=self._flush_tracks if fn == self._yolo_stage and self.tracker is not None else None)
+                   for i, (name, fn, count) in enumerate(stages)]
+
+        self._log("\n\n" + "=" * 50)
+        self._log("STARTING STREAMING PIPELINE LOG")
+        self._log("=" * 50 + "\n")
+
+        for stage in workers:
+            stage.start()
+
+        producer_errors = []
+
+        def produce():
+            try:
+                for record in records:
+                    queues[0].put(record)
+            except Exception as e:
+                producer_errors.append(e)
+            finally:
+                queues[0].put(_STOP)
+
+        producer = threading.Thread(target=produce, name="streaming-producer", daemon=True)
+        producer.start()
+
+        completed_images = 0
+        with tqdm(desc="Streaming pipeline", unit="image") as pbar:
+            while True:
+                record = queues[-1].get()
+                if record is _STOP:
+                    break
+                image_results = self._finalize_record(record)
+                completed_images += 1
+                if on_result is not None:
+                    on_result(record.name, image_results)
+                pbar.update(1)
+
+        producer.join()
+        errors = producer_errors + [stage.error for stage in workers if stage.error is not None]
+        if errors:
+            self._log(f"\n✗ Streaming pipeline aborted after {completed_images} images: {errors[0]}")
+            self._save_results()
+            raise errors[0]
+        self._log(f"\nTotal Images Completed by Streaming Pipeline: {completed_images}")
+        if self.config.run_ngram_post_processing:
+            ngram_postprocessor = self.processor.ngram_postprocessor
+            self._log(ngram_postprocessor.correction_cache_summary())
+            ngram_postprocessor.save_correction_cache()
+        if self.tracker is not None:
+            stats = self.tracker.stats()
+            self._log(f"Tracking: {stats['crops']} vehicle crops grouped into {stats['tracks']} tracks, "
+                      f"{stats['selected_crops']} crops selected for OCR")
+        self._log("\n" + "=" * 50)
+        self._log("STREAMING PIPELINE LOG END")
+
+        self._save_results()
+        if self.tracker is not None:
+            self.processor._save_track_results(self.tracker.finished, self.track_crop_results)
+        print(f"✅ Streaming pipeline results saved to: {self.config.base_path}")
+        if isinstance(self.final_results, ResultSink) and not self.final_results.keep:
+            return ResultIndex(self.final_results.path)
+        return self.final_results
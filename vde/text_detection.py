@@ -1,31 +1,57 @@
 import os
+import asyncio
 import json
 import numpy as np
-import requests
-import time
 from pathlib import Path
 from PIL import Image, ImageDraw
-from io import BytesIO
 from tqdm import tqdm
 from config.config import Config
+from vde.http_client import OCRHttpClient
+from vde.cache import ResultCache
+from vde.payload import ImagePayloadBuilder
+from vde.result_sink import ResultSink, read_results
+from vde.visualizer import VisualizationWriter
 import cv2
-import base64
+class RefinementImage:
+    def __init__(self, pil_image=None, image=None):
+        self.pil_image = pil_image
+        self.image = image
+        if image is not None:
+            self.height, self.width = image.shape[:2]
+        else:
+            self.width, self.height = pil_image.size
+        self._gray = None
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            if self.image is not None:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+            else:
+                pil_image = self.pil_image if self.pil_image.mode == "RGB" else self.pil_image.convert("RGB")
+                self._gray = cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+
 class TextDetector:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, http_client=None, result_cache=None, payload_builder=None, visualizer=None):
         self.config = config
-        self.detection_api_url = self.config.detection_api_url
-        self.detection_headers = self.config.detection_headers
-        self.request_delay_seconds = self.config.request_delay_seconds
+        self.visualizer = visualizer if visualizer is not None else VisualizationWriter(self.config)
+        self.payload_builder = payload_builder if payload_builder is not None else ImagePayloadBuilder(self.config)
+        self.refinement_kernel = np.ones((3, 3), np.uint8)
+        self.http_client = http_client if http_client is not None else OCRHttpClient(self.config)
+        self.result_cache = ResultCache.for_ocr_api(self.config, result_cache)
 
-    def _apply_api_delay(self):
-        if self.request_delay_seconds > 0:
-            time.sleep(self.request_delay_seconds)
+    @property
+    def detection_api_url(self):
+        return self.config.detection_api_url
+
+    @property
+    def detection_headers(self):
+        return self.config.detection_headers
 
     def encode_image_to_base64(self, image_path):
-        img = Image.open(image_path).convert('RGB')
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG")
-        return base64.b64encode(buffer.getvalue()).decode()
+        return self.payload_builder.encode_path(image_path).base64
 
     def _convert_numpy_to_python_types(self, obj):
         if isinstance(obj, np.integer):
@@ -42,29 +68,26 @@ class TextDetector:
             return obj
 
     def shrink_bbox(self, pil_image, bbox):
-        image = pil_image.copy()
-        image = np.array(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        
+        return self._shrink_bbox(RefinementImage(pil_image=pil_image), bbox)
+
+    def _shrink_bbox(self, image, bbox):
         x_min_crop = max(0, int(bbox[0]))
-        x_max_crop = min(image.shape[1], int(bbox[1]))
+        x_max_crop = min(image.width, int(bbox[1]))
         y_min_crop = max(0, int(bbox[2]))
-        y_max_crop = min(image.shape[0], int(bbox[3]))
+        y_max_crop = min(image.height, int(bbox[3]))
 
         if x_max_crop <= x_min_crop or y_max_crop <= y_min_crop:
             return bbox 
 
-        cropped_image = image[y_min_crop:y_max_crop, x_min_crop:x_max_crop]
+        gray = image.gray[y_min_crop:y_max_crop, x_min_crop:x_max_crop]
         
-        if cropped_image.size == 0: 
+        if gray.size == 0: 
             return bbox
 
-        gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
         binary = cv2.threshold(gray, 110, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
         blur = cv2.GaussianBlur(binary, (5, 5), 20)
-        kernel = np.ones((3, 3), np.uint8)
-        dilated = cv2.dilate(blur, kernel, iterations=3)
-        eroded = cv2.erode(dilated, kernel, iterations=1)
+        dilated = cv2.dilate(blur, self.refinement_kernel, iterations=3)
+        eroded = cv2.erode(dilated, self.refinement_kernel, iterations=1)
         thr = cv2.threshold(eroded, 110, 255, cv2.THRESH_BINARY)[1]
         contours, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -86,13 +109,27 @@ class TextDetector:
 
             x_min = int(max(0, x_min - horizontal_pad))
             y_min = int(max(0, y_min - vertical_pad))
-            x_max = int(min(pil_image.width - 1, x_max + horizontal_pad))
-            y_max = int(min(pil_image.height - 1, y_max + vertical_pad))
+            x_max = int(min(image.width - 1, x_max + horizontal_pad))
+            y_max = int(min(image.height - 1, y_max + vertical_pad))
 
             return [x_min, x_max, y_min, y_max]
         else:
             return self._convert_numpy_to_python_types(bbox)
-        
+
+    def refine_boxes(self, image, boxes):
+        if not isinstance(image, RefinementImage):
+            image = RefinementImage(pil_image=image)
+        shrinked_boxes = [self._shrink_bbox(image, box) for box in boxes]
+        if any((box[0] >= box[1] or box[2] >= box[3]) for box in shrinked_boxes):
+            return boxes
+        return shrinked_boxes
+
+    def refine_detection_entries(self, image, bboxes):
+        processed_bboxes = self._convert_numpy_to_python_types(bboxes)
+        if isinstance(processed_bboxes, list) and len(processed_bboxes) > 0 and "horizontal_list" in processed_bboxes[0]:
+            processed_bboxes[0]["horizontal_list"] = self.refine_boxes(image, processed_bboxes[0]["horizontal_list"])
+        return processed_bboxes
+
     def soft_padding(self, box, image_size):
         x1, x2, y1, y2 = int(box[0]), int(box[1]), int(box[2]), int(box[3])
         img_width, img_height = image_size
@@ -113,31 +150,36 @@ class TextDetector:
 
         return x1, x2, y1, y2
 
-    def draw_boxes_and_save(self, image_path, bboxes, save_folder):
-        image = Image.open(image_path).convert("RGB")
-        draw = ImageDraw.Draw(image)
-        img_width, img_height = image.size
-
-        processed_bboxes = self._convert_numpy_to_python_types(bboxes)
+    def draw_boxes_and_save(self, image_path, bboxes, save_folder, image=None):
+        if not self.visualizer.wants(Path(image_path).name):
+            return None
+        os.makedirs(save_folder, exist_ok=True)
+        save_path = os.path.join(save_folder, Path(image_path).name)
+        self.visualizer.submit(self._render_boxes, image_path, bboxes, save_path, image)
+        return save_path
+
+    def _render_boxes(self, image_path, bboxes, save_path, image=None):
+        if image is None:
+            pil_image = Image.open(image_path).convert("RGB")
+            refinement_image = RefinementImage(pil_image=pil_image)
+        else:
+            pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            refinement_image = RefinementImage(image=image)
+        processed_bboxes = self.refine_detection_entries(refinement_image, bboxes)
+        draw = ImageDraw.Draw(pil_image)
+        img_width, img_height = pil_image.size
 
         if isinstance(processed_bboxes, list) and len(processed_bboxes) > 0 and "horizontal_list" in processed_bboxes[0]:
-            original_boxes = processed_bboxes[0]["horizontal_list"]
-
-            shrinked_boxes = [self.shrink_bbox(image, box) for box in original_boxes]
-            
-            if any((box[0] >= box[1] or box[2] >= box[3]) for box in shrinked_boxes):
-                 shrinked_boxes = original_boxes
-
-            for box in shrinked_boxes:
+            for box in processed_bboxes[0]["horizontal_list"]:
                 x1, x2, y1, y2 = self.soft_padding(box, (img_width, img_height))
                 draw.rectangle([x1, y1, x2, y2], outline="red", width=2)
 
-            processed_bboxes[0]["horizontal_list"] = shrinked_boxes
+        pil_image.save(save_path)
+
+    def _list_detection_items(self, image_folder, records):
+        if records is not None:
+            return [(Path(record.name), record) for record in records]
 
-        os.makedirs(save_folder, exist_ok=True)
-        image.save(os.path.join(save_folder, image_path.name))
-        
-    def get_text_detections(self, image_folder, output_json_path, vis_folder, log_file): 
         image_folder_path = Path(image_folder)
         image_paths = []
         extensions = ["jpg", "jpeg", "png", "bmp", "gif", "tiff"]
@@ -145,75 +187,221 @@ class TextDetector:
             image_paths.extend(image_folder_path.glob(f"*.{ext}"))
             image_paths.extend(image_folder_path.glob(f"*.{ext.upper()}"))
         image_paths.sort(key=lambda x: str(x.name)) # Use str for simple sorting as natural_sort_key is in processor
+        return [(image_path, None) for image_path in image_paths]
+
+    def _build_detection_payload(self, item):
+        image_path, record = item
+        if record is None:
+            vis_image = None
+            encoded = self.payload_builder.encode_path(image_path)
+        else:
+            vis_image = record.image
+            encoded = self.payload_builder.encode_record(record)
+        return {"img": encoded.data_uri}, vis_image, encoded
+
+    def _rescale_detections(self, bboxes, encoded):
+        bboxes = self._convert_numpy_to_python_types(bboxes)
+        if encoded.scale == 1.0 or not isinstance(bboxes, list):
+            return bboxes
+        for entry in bboxes:
+            if isinstance(entry, dict):
+                for box_key in ("horizontal_list", "free_list"):
+                    if box_key in entry:
+                        entry[box_key] = encoded.to_original(entry[box_key])
+        return bboxes
+
+    def _detect_item(self, item):
+        payload, vis_image, encoded = self._build_detection_payload(item)
+        cache_key = ResultCache.make_key("text_detection", self.detection_api_url, payload)
+        bboxes = self.result_cache.get_or_compute(
+            "text_detection", cache_key,
+            lambda: self.http_client.get_json(self.detection_api_url, self.detection_headers, payload)
+        )
+        return self._rescale_detections(bboxes, encoded), vis_image
+
+    def detect_record(self, record, vis_folder):
+        image_path = Path(record.name)
+        converted_bboxes, vis_image = self._detect_item((image_path, record))
+        self.draw_boxes_and_save(image_path, converted_bboxes, vis_folder, image=vis_image)
+        return converted_bboxes
+
+    def _write_detection_log_header(self, log):
+        log.write("\n\n" + "=" * 50 + "\n")
+        log.write("STARTING TEXT DETECTION LOG\n")
+        log.write("=" * 50 + "\n\n")
+        log.write("PROCESSING IMAGES FOR TEXT DETECTION:\n")
+        log.write("-" * 50 + "\n")
+
+    def _write_detection_log_footer(self, log, successful_detections, failed_detections):
+        log.write(f"\nTotal Successful Detections: {successful_detections}\n") 
+        log.write(f"Total Failed Detections: {failed_detections}\n") 
+        log.write(f"Total Images Processed for Detection: {successful_detections + failed_detections}\n") 
+        log.write("\n" + "=" * 50 + "\n")
+        log.write("TEXT DETECTION LOG END\n")
+
+    def _log_detection_failure(self, log, results, image_path, e):
+        error_message = f"✗ Detection failed for image: {image_path.name} - {e}"
+        print(error_message)
+        log.write(f"{error_message}\n") 
+        results[image_path.name] = {"error": str(e)}
+
+    def _save_detection_results(self, results, output_json_path, vis_folder):
+        os.makedirs(vis_folder, exist_ok=True)
+        results.close()
+
+        print(f"\n✅ Saved detection results to: {output_json_path}")
+        print(f"🖼️ Saved visualized images to: {vis_folder}")
+
+    def get_text_detections(self, image_folder, output_json_path, vis_folder, log_file, records=None, manifest=None): 
+        items = self._list_detection_items(image_folder, records)
 
-        results = {}
+        results = ResultSink(output_json_path, keep=records is not None)
         successful_detections = 0
         failed_detections = 0
 
         with open(log_file, 'a', encoding='utf-8') as log: 
-            log.write("\n\n" + "=" * 50 + "\n")
-            log.write("STARTING TEXT DETECTION LOG\n")
-            log.write("=" * 50 + "\n\n")
-            log.write("PROCESSING IMAGES FOR TEXT DETECTION:\n")
-            log.write("-" * 50 + "\n")
-
-            for image_path in tqdm(image_paths, desc="Detecting text"):
+            self._write_detection_log_header(log)
+
+            if manifest is not None:
+                pending_items = []
+                for image_path, record in items:
+                    if manifest.is_done("text_detection", image_path.name):
+                        results[image_path.name] = manifest.result("text_detection", image_path.name)
+                        successful_detections += 1
+                        log.write(f"↷ Already detected text for: {image_path.name}\n") 
+                    else:
+                        pending_items.append((image_path, record))
+                items = pending_items
+
+            detections = self.http_client.imap(self._detect_item, items)
+            for (image_path, record), future in tqdm(detections, total=len(items), desc="Detecting text"):
                 try:
-                    base64_img = self.encode_image_to_base64(image_path)
-                    self._apply_api_delay() 
-                    response = requests.get(
-                        self.detection_api_url, 
-                        headers=self.detection_headers, 
-                        json={"img": f"data:image/jpeg;base64,{base64_img}"}
-                    )
-                    response.raise_for_status()
-                    bboxes = response.json()
-                    
-                    converted_bboxes = self._convert_numpy_to_python_types(bboxes)
+                    converted_bboxes, vis_image = future.result()
                     results[image_path.name] = converted_bboxes
                     
-                    self.draw_boxes_and_save(image_path, converted_bboxes, vis_folder)
+                    self.draw_boxes_and_save(image_path, converted_bboxes, vis_folder, image=vis_image)
+                    if manifest is not None:
+                        manifest.mark_done("text_detection", image_path.name, converted_bboxes)
                     successful_detections += 1
                     log.write(f"✓ Detected text for: {image_path.name}\n") 
                     
                 except Exception as e:
                     failed_detections += 1
-                    error_message = f"✗ Detection failed for image: {image_path.name} - {e}"
+                    self._log_detection_failure(log, results, image_path, e)
+
+            self._write_detection_log_footer(log, successful_detections, failed_detections)
+
+        self._save_detection_results(results, output_json_path, vis_folder)
+        return results
+
+    async def get_text_detections_async(self, image_folder, output_json_path, vis_folder, log_file, async_client, records=None):
+        items = await asyncio.to_thread(self._list_detection_items, image_folder, records)
+
+        async def detect(item):
+            image_path, _ = item
+            payload, vis_image, encoded = await asyncio.to_thread(self._build_detection_payload, item)
+            cache_key = ResultCache.make_key("text_detection", self.detection_api_url, payload)
+            hit, bboxes = await asyncio.to_thread(self.result_cache.get, "text_detection", cache_key)
+            if not hit:
+                bboxes = await async_client.get_json(self.detection_api_url, self.detection_headers, payload)
+                await asyncio.to_thread(self.result_cache.set, "text_detection", cache_key, bboxes)
+            converted_bboxes = self._rescale_detections(bboxes, encoded)
+            await asyncio.to_thread(self.draw_boxes_and_save, image_path, converted_bboxes, vis_folder, vis_image)
+            return converted_bboxes
+
+        outcomes = await async_client.map(detect, items)
+
+        results = ResultSink(output_json_path, keep=records is not None)
+        successful_detections = 0
+        failed_detections = 0
+
+        with open(log_file, 'a', encoding='utf-8') as log: 
+            self._write_detection_log_header(log)
+
+            for (image_path, _), outcome in zip(items, outcomes):
+                if isinstance(outcome, Exception):
+                    failed_detections += 1
+                    self._log_detection_failure(log, results, image_path, outcome)
+                else:
+                    results[image_path.name] = outcome
+                    successful_detections += 1
+                    log.write(f"✓ Detected text for: {image_path.name}\n") 
+
+            self._write_detection_log_footer(log, successful_detections, failed_detections)
+
+        await asyncio.to_thread(self._save_detection_results, results, output_json_path, vis_folder)
+        return results
+   
+    def _write_refinement_log_header(self, log):
+        log.write("\n\n" + "=" * 50 + "\n")
+        log.write("STARTING TEXT BOX REFINEMENT LOG\n")
+        log.write("=" * 50 + "\n\n")
+        log.write("REFINING DETECTED TEXT BOXES:\n")
+        log.write("-" * 50 + "\n")
+
+    def _load_refinement_image(self, image_folder, image_name, records_by_name):
+        record = records_by_name.get(image_name)
+        if record is not None:
+            return RefinementImage(image=record.image)
+        image = cv2.imread(str(Path(image_folder) / image_name))
+        if image is None:
+            raise FileNotFoundError(f"Could not load image {image_name}")
+        return RefinementImage(image=image)
+
+    def refine_detections(self, image_folder, detection_json_path, output_json_path, log_file, records=None, detection_data=None):
+        if detection_data is not None:
+            detection_items = detection_data.items()
+        else:
+            try:
+                detection_items = read_results(detection_json_path)
+            except FileNotFoundError:
+                print(f"Error: Detection results JSON file not found at {detection_json_path}")
+                return
+            except json.JSONDecodeError:
+                print(f"Error: Invalid JSON format in {detection_json_path}")
+                return
+
+        records_by_name = {record.name: record for record in records} if records is not None else {}
+        refined_data = ResultSink(output_json_path, keep=detection_data is not None)
+        refined_images = 0
+        failed_images = 0
+
+        with open(log_file, 'a', encoding='utf-8') as log:
+            self._write_refinement_log_header(log)
+
+            for image_name, entries in tqdm(detection_items, desc="Refining text boxes"):
+                if not (isinstance(entries, list) and len(entries) > 0 and "horizontal_list" in entries[0]):
+                    refined_data[image_name] = entries
+                    continue
+                try:
+                    image = self._load_refinement_image(image_folder, image_name, records_by_name)
+                    refined_data[image_name] = self.refine_detection_entries(image, entries)
+                    refined_images += 1
+                    log.write(f"✓ Refined text boxes for: {image_name}\n")
+                except Exception as e:
+                    refined_data[image_name] = entries
+                    failed_images += 1
+                    error_message = f"✗ Box refinement failed for image: {image_name} - {e}"
                     print(error_message)
-                    log.write(f"{error_message}\n") 
-                    results[image_path.name] = {"error": str(e)}
+                    log.write(f"{error_message}\n")
 
-            log.write(f"\nTotal Successful Detections: {successful_detections}\n") 
-            log.write(f"Total Failed Detections: {failed_detections}\n") 
-            log.write(f"Total Images Processed for Detection: {successful_detections + failed_detections}\n") 
+            log.write(f"\nTotal Images Refined: {refined_images}\n")
+            log.write(f"Total Failed Refinements: {failed_images}\n")
             log.write("\n" + "=" * 50 + "\n")
-            log.write("TEXT DETECTION LOG END\n")
+            log.write("TEXT BOX REFINEMENT LOG END\n")
 
-        os.makedirs(Path(output_json_path).parent, exist_ok=True)
-        os.makedirs(vis_folder, exist_ok=True)
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        refined_data.close()
+
+        print(f"✅ Refined detection results saved to: {output_json_path}")
+        return refined_data
 
-        print(f"\n✅ Saved detection results to: {output_json_path}")
-        print(f"🖼️ Saved visualized images to: {vis_folder}")
-   
     def get_bboxes(self, boxes):
         new_boxes = []
         for box in boxes:
             new_boxes.append([box[0], box[2], box[1], box[3]]) 
         return new_boxes
 
-    def post_process_detections(self, detection_json_path, output_json_path):
-        try:
-            with open(detection_json_path, "r") as f:
-                detection_data = json.load(f)
-        except FileNotFoundError:
-            print(f"Error: Detection results JSON file not found at {detection_json_path}")
-            return
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON format in {detection_json_path}")
-            return
-
+    def post_process_detection_data(self, detection_data):
         processed_data = {}
         for image_name, entries in detection_data.items():
             if isinstance(entries, list) and len(entries) > 0 and "horizontal_list" in entries[0]:
@@ -221,9 +409,25 @@ class TextDetector:
                 processed_data[image_name] = self.get_bboxes(boxes)
             else:
                 processed_data[image_name] = [] 
+        return processed_data
 
-        os.makedirs(Path(output_json_path).parent, exist_ok=True)
-        with open(output_json_path, "w") as f:
-            json.dump(processed_data, f, indent=2)
-
-        print(f"✅ Post-processed detection results saved to: {output_json_path}")
\ No newline at end of file
+    def post_process_detections(self, detection_json_path, output_json_path, detection_data=None):
+        if detection_data is not None:
+            detection_items = detection_data.items()
+        else:
+            try:
+                detection_items = read_results(detection_json_path)
+            except FileNotFoundError:
+                print(f"Error: Detection results JSON file not found at {detection_json_path}")
+                return
+            except json.JSONDecodeError:
+                print(f"Error: Invalid JSON format in {detection_json_path}")
+                return
+
+        processed_data = ResultSink(output_json_path, keep=detection_data is not None)
+        for image_name, entries in detection_items:
+            processed_data[image_name] = self.post_process_detection_data({image_name: entries})[image_name]
+        processed_data.close()
+
+        print(f"✅ Post-processed detection results saved to: {output_json_path}")
+        return processed_data
\ No newline at end of file
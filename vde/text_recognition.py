@@ -1,119 +1,232 @@
 import os
+import asyncio
 import json
-import base64
+import httpx
 import requests
-import time
 import re
-from pathlib import Path
-from PIL import Image
-from io import BytesIO
 from tqdm import tqdm
 from config.config import Config
+from vde.http_client import OCRHttpClient
+from vde.cache import ResultCache
+from vde.payload import ImagePayloadBuilder
+from vde.result_sink import ResultSink, read_results
+
+# Failures that only affect one image: HTTP errors (including cassette misses) and undecodable responses.
+RECOGNITION_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError, ValueError)
 
 class TextRecognizer:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, http_client=None, result_cache=None, payload_builder=None):
         self.config = config
-        self.recognition_api_url = self.config.recognition_api_url
-        self.recognition_headers = self.config.recognition_headers
-        self.request_delay_seconds = self.config.request_delay_seconds
+        self.payload_builder = payload_builder if payload_builder is not None else ImagePayloadBuilder(self.config)
+        self.http_client = http_client if http_client is not None else OCRHttpClient(self.config)
+        self.result_cache = ResultCache.for_ocr_api(self.config, result_cache)
+
+    @property
+    def recognition_api_url(self):
+        return self.config.recognition_api_url
 
-    def _apply_api_delay(self):
-        if self.request_delay_seconds > 0:
-            time.sleep(self.request_delay_seconds)
+    @property
+    def recognition_headers(self):
+        return self.config.recognition_headers
 
     def image_to_base64(self, image_path):
-        img = Image.open(image_path).convert('RGB')
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG")
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return self.payload_builder.encode_path(image_path).base64
 
     def natural_sort_key(self, filename):
         parts = re.split(r'(\d+)', filename)
         return [int(part) if part.isdigit() else part.lower() for part in parts]
 
-    def process_text_recognition(self, image_folder, bbox_json_file, recognition_output_file, log_file): 
+    def _build_recognition_payload(self, source, bboxes_to_send):
+        encoded = self.payload_builder.encode(source)
+        return {"img": encoded.data_uri, "bboxes": encoded.to_encoded(bboxes_to_send)}
+
+    def _recognize_item(self, item):
+        image_name, bboxes_to_send, source = item
+        payload = self._build_recognition_payload(source, bboxes_to_send)
+        cache_key = ResultCache.make_key("text_recognition", self.recognition_api_url, payload)
+        return self.result_cache.get_or_compute(
+            "text_recognition", cache_key,
+            lambda: self.http_client.get_json(self.recognition_api_url, self.recognition_headers, payload)
+        )
+
+    def recognize_record(self, record, bboxes):
+        bboxes_to_send = [list(b) for b in set(tuple(b) for b in bboxes)]
+        recognition_results = self._recognize_item((record.name, bboxes_to_send, record))
+        return {"bboxes": bboxes_to_send, "recognized_texts": self._deduplicate_recognition_results(recognition_results)}
+
+    def _deduplicate_recognition_results(self, recognition_results):
+        deduplicated_results_as_tuples = set()
+        for item in recognition_results:
+            if isinstance(item, list):
+                hashable_item = tuple(tuple(sorted(d.items())) for d in item)
+                deduplicated_results_as_tuples.add(hashable_item)
+            else:
+                hashable_item = tuple(sorted(item.items()))
+                deduplicated_results_as_tuples.add((hashable_item,))
+
+        return [
+            [dict(sorted_item_tuple) for sorted_item_tuple in inner_tuple]
+            for inner_tuple in sorted(list(deduplicated_results_as_tuples))
+        ]
+
+    def _load_bbox_data(self, bbox_json_file):
         try:
-            with open(bbox_json_file, 'r', encoding='utf-8') as f:
-                bbox_data = json.load(f)
+            return read_results(bbox_json_file)
         except FileNotFoundError:
             print(f"Error: Bounding box JSON file not found at {bbox_json_file}")
-            return
         except json.JSONDecodeError:
             print(f"Error: Invalid JSON format in {bbox_json_file}")
-            return
+        return None
+
+    def _collect_recognition_items(self, image_folder, bbox_data, records, log):
+        counts = {"not_found": 0}
+        items = list(self._iter_recognition_items(image_folder, bbox_data, records, log, counts))
+        return items, counts["not_found"]
+
+    def _iter_recognition_items(self, image_folder, bbox_data, records, log, counts):
+        records_by_name = {record.name: record for record in records} if records is not None else None
+        if isinstance(bbox_data, dict):
+            bbox_items = ((image_name, bbox_data[image_name]) for image_name in sorted(bbox_data.keys(), key=self.natural_sort_key))
+        else:
+            bbox_items = bbox_data
+
+        for image_name, bboxes_raw in bbox_items:
+            
+            unique_bboxes_tuples = set(tuple(b) for b in bboxes_raw)
+            bboxes_to_send = [list(b) for b in unique_bboxes_tuples]
+            
+            if records_by_name is not None:
+                source = records_by_name.get(image_name)
+            else:
+                source = os.path.join(image_folder, image_name)
+                if not os.path.exists(source):
+                    source = None
+
+            if source is None:
+                counts["not_found"] += 1
+                log.write(f"? Image not found for recognition: {image_name}\n") 
+                continue 
+            yield image_name, bboxes_to_send, source
+
+    def _write_recognition_log_header(self, log):
+        log.write("\n\n" + "=" * 50 + "\n")
+        log.write("STARTING TEXT RECOGNITION LOG\n")
+        log.write("=" * 50 + "\n\n")
+        log.write("PROCESSING IMAGES FOR TEXT RECOGNITION:\n")
+        log.write("-" * 50 + "\n")
+
+    def _write_recognition_log_footer(self, log, successful_recognitions, failed_recognitions, not_found_images):
+        log.write(f"\nTotal Successful Recognitions: {successful_recognitions}\n") 
+        log.write(f"Total Failed Recognitions: {failed_recognitions}\n") 
+        log.write(f"Total Images Not Found for Recognition: {not_found_images}\n") 
+        log.write(f"Total Images Attempted for Recognition: {successful_recognitions + failed_recognitions + not_found_images}\n") 
+        log.write("\n" + "=" * 50 + "\n")
+        log.write("TEXT RECOGNITION LOG END\n")
+
+    def _store_recognition(self, log, results, image_name, bboxes_to_send, recognition_results):
+        cleaned_results = self._deduplicate_recognition_results(recognition_results)
+        
+        recognition = {"bboxes": bboxes_to_send, "recognized_texts": cleaned_results}
+        results[image_name] = recognition
+        log.write(f"✓ Recognized text for: {image_name}\n") 
+        return recognition
+
+    def _log_recognition_failure(self, log, results, image_name, e):
+        error_message = f"✗ Recognition failed for image: {image_name} - {e}"
+        print(error_message)
+        log.write(f"{error_message}\n") 
+        results[image_name] = {"error": str(e)}
+
+    def _save_recognition_results(self, results, recognition_output_file, total_results=None):
+        results.close()
+
+        print(f"✅ Processing complete! Recognition results saved to: {recognition_output_file}")
+        print(f"Total images processed for recognition: {len(results) if total_results is None else total_results}")
 
-        results = {}
+    def process_text_recognition(self, image_folder, bbox_json_file, recognition_output_file, log_file, records=None, bbox_data=None, manifest=None): 
+        if bbox_data is None:
+            bbox_data = self._load_bbox_data(bbox_json_file)
+            if bbox_data is None:
+                return
+
+        results = ResultSink(recognition_output_file, keep=records is not None)
         successful_recognitions = 0
         failed_recognitions = 0
-        not_found_images = 0
 
         with open(log_file, 'a', encoding='utf-8') as log: 
-            log.write("\n\n" + "=" * 50 + "\n")
-            log.write("STARTING TEXT RECOGNITION LOG\n")
-            log.write("=" * 50 + "\n\n")
-            log.write("PROCESSING IMAGES FOR TEXT RECOGNITION:\n")
-            log.write("-" * 50 + "\n")
-
-            sorted_image_names = sorted(bbox_data.keys(), key=self.natural_sort_key)
-
-            for image_name in tqdm(sorted_image_names, desc="Processing images for recognition", unit="image"):
-                bboxes_raw = bbox_data[image_name] 
-                
-                unique_bboxes_tuples = set(tuple(b) for b in bboxes_raw)
-                bboxes_to_send = [list(b) for b in unique_bboxes_tuples]
-                
-                image_path = os.path.join(image_folder, image_name)
-                if not os.path.exists(image_path):
-                    not_found_images += 1
-                    log.write(f"? Image not found for recognition: {image_name}\n") 
-                    continue 
-
-                img_str = self.image_to_base64(image_path)
-                payload = {"img": f"data:image/jpeg;base64,{img_str}", "bboxes": bboxes_to_send}
+            self._write_recognition_log_header(log)
+
+            counts = {"not_found": 0, "resumed": 0}
+            items = self._iter_recognition_items(image_folder, bbox_data, records, log, counts)
+            if manifest is not None:
+                items = self._skip_recognized_items(items, manifest, results, log, counts)
 
+            recognitions = self.http_client.imap(self._recognize_item, items)
+            total = len(bbox_data) if isinstance(bbox_data, dict) else None
+            for (image_name, bboxes_to_send, _), future in tqdm(recognitions, total=total, desc="Processing images for recognition", unit="image"):
                 try:
-                    self._apply_api_delay() 
-                    response = requests.get(self.recognition_api_url, headers=self.recognition_headers, json=payload)
-                    response.raise_for_status()
-                    recognition_results = response.json()
-                    
-                    print(f"DEBUG: Raw API recognition_results for {image_name}: {json.dumps(recognition_results, indent=2, ensure_ascii=False)}")
-                    
-                    deduplicated_results_as_tuples = set()
-                    for item in recognition_results:
-                        if isinstance(item, list):
-                            hashable_item = tuple(tuple(sorted(d.items())) for d in item)
-                            deduplicated_results_as_tuples.add(hashable_item)
-                        else:
-                            hashable_item = tuple(sorted(item.items()))
-                            deduplicated_results_as_tuples.add((hashable_item,))
-
-                    cleaned_results = [
-                        [dict(sorted_item_tuple) for sorted_item_tuple in inner_tuple]
-                        for inner_tuple in sorted(list(deduplicated_results_as_tuples))
-                    ]
-                    
-                    results[image_name] = {"bboxes": bboxes_to_send, "recognized_texts": cleaned_results}
+                    recognition = self._store_recognition(log, results, image_name, bboxes_to_send, future.result())
+                    if manifest is not None:
+                        manifest.mark_done("text_recognition", image_name, recognition)
                     successful_recognitions += 1
-                    log.write(f"✓ Recognized text for: {image_name}\n") 
-                except requests.exceptions.RequestException as e:
+                except RECOGNITION_ERRORS as e:
                     failed_recognitions += 1
-                    error_message = f"✗ Recognition failed for image: {image_name} - {e}"
-                    print(error_message)
-                    log.write(f"{error_message}\n") 
-                    results[image_name] = {"error": str(e)}
-
-            log.write(f"\nTotal Successful Recognitions: {successful_recognitions}\n") 
-            log.write(f"Total Failed Recognitions: {failed_recognitions}\n") 
-            log.write(f"Total Images Not Found for Recognition: {not_found_images}\n") 
-            log.write(f"Total Images Attempted for Recognition: {successful_recognitions + failed_recognitions + not_found_images}\n") 
-            log.write("\n" + "=" * 50 + "\n")
-            log.write("TEXT RECOGNITION LOG END\n")
-
-        os.makedirs(Path(recognition_output_file).parent, exist_ok=True)
-        
-        with open(recognition_output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+                    self._log_recognition_failure(log, results, image_name, e)
 
-        print(f"✅ Processing complete! Recognition results saved to: {recognition_output_file}")
-        print(f"Total images processed for recognition: {len(results)}")
+            successful_recognitions += counts["resumed"]
+            self._write_recognition_log_footer(log, successful_recognitions, failed_recognitions, counts["not_found"])
+
+        self._save_recognition_results(results, recognition_output_file, successful_recognitions + failed_recognitions)
+        return results
+
+    def _skip_recognized_items(self, items, manifest, results, log, counts):
+        for item in items:
+            image_name = item[0]
+            if manifest.is_done("text_recognition", image_name):
+                results[image_name] = manifest.result("text_recognition", image_name)
+                counts["resumed"] += 1
+                log.write(f"↷ Already recognized text for: {image_name}\n") 
+            else:
+                yield item
+
+    async def process_text_recognition_async(self, image_folder, bbox_json_file, recognition_output_file, log_file, async_client, records=None, bbox_data=None):
+        if bbox_data is None:
+            bbox_data = await asyncio.to_thread(self._load_bbox_data, bbox_json_file)
+            if bbox_data is None:
+                return
+
+        async def recognize(item):
+            image_name, bboxes_to_send, source = item
+            payload = await asyncio.to_thread(self._build_recognition_payload, source, bboxes_to_send)
+            cache_key = ResultCache.make_key("text_recognition", self.recognition_api_url, payload)
+            hit, recognition_results = await asyncio.to_thread(self.result_cache.get, "text_recognition", cache_key)
+            if not hit:
+                recognition_results = await async_client.get_json(self.recognition_api_url, self.recognition_headers, payload)
+                await asyncio.to_thread(self.result_cache.set, "text_recognition", cache_key, recognition_results)
+            return recognition_results
+
+        results = ResultSink(recognition_output_file, keep=records is not None)
+        successful_recognitions = 0
+        failed_recognitions = 0
+
+        with open(log_file, 'a', encoding='utf-8') as log: 
+            self._write_recognition_log_header(log)
+
+            items, not_found_images = await asyncio.to_thread(self._collect_recognition_items, image_folder, bbox_data, records, log)
+            outcomes = await async_client.map(recognize, items)
+
+            for (image_name, bboxes_to_send, _), outcome in zip(items, outcomes):
+                if isinstance(outcome, RECOGNITION_ERRORS):
+                    failed_recognitions += 1
+                    self._log_recognition_failure(log, results, image_name, outcome)
+                elif isinstance(outcome, Exception):
+                    raise outcome
+                else:
+                    self._store_recognition(log, results, image_name, bboxes_to_send, outcome)
+                    successful_recognitions += 1
+
+            self._write_recognition_log_footer(log, successful_recognitions, failed_recognitions, not_found_images)
+
+        await asyncio.to_thread(self._save_recognition_results, results, recognition_output_file,
+                                successful_recognitions + failed_recognitions)
+        return results
@@ -0,0 +1,193 @@
+import heapq
+import itertools
+from collections import defaultdict
+import cv2
+from config.config import Config
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def box_centroid(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+
+def crop_quality(image, confidence, sharpness_scale=100.0):
+    height, width = image.shape[:2]
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return confidence * (width * height) ** 0.5 * sharpness / (sharpness + sharpness_scale)
+
+
+class Track:
+    def __init__(self, track_id, class_name, bbox, frame_index, frame_name):
+        self.track_id = track_id
+        self.class_name = class_name
+        self.bbox = bbox
+        self.first_frame = frame_name
+        self.last_frame = frame_name
+        self.last_frame_index = frame_index
+        self.hits = 0
+        self.best = []
+
+    def add(self, crop_record, bbox, frame_index, frame_name, quality, keep):
+        self.bbox = bbox
+        self.last_frame = frame_name
+        self.last_frame_index = frame_index
+        self.hits += 1
+        entry = (quality, -frame_index, id(crop_record), crop_record)
+        if len(self.best) < keep:
+            heapq.heappush(self.best, entry)
+        elif quality > self.best[0][0]:
+            heapq.heapreplace(self.best, entry)
+
+    def best_crops(self):
+        return [entry[3] for entry in sorted(self.best, reverse=True)]
+
+    def summary(self):
+        return {
+            "track_id": self.track_id,
+            "class": self.class_name,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "frames": self.hits,
+            "selected_crops": [
+                {"name": crop.name, "frame": crop.source_name, "quality": round(quality, 3)}
+                for quality, _, _, crop in sorted(self.best, reverse=True)
+            ],
+        }
+
+
+class PlateTracker:
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.1, max_age=5, best_crops=1):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_age = max_age
+        self.best_crops = max(1, best_crops)
+        self.active = []
+        self.finished = []
+        self.frame_index = -1
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_config(cls, config: Config):
+        return cls(
+            iou_threshold=config.tracking_iou_threshold,
+            max_centroid_distance=config.tracking_max_centroid_distance,
+            max_age=config.tracking_max_age,
+            best_crops=config.tracking_best_crops
+        )
+
+    def _match(self, detections, frame_shape):
+        max_distance = self.max_centroid_distance * (frame_shape[0] ** 2 + frame_shape[1] ** 2) ** 0.5
+        candidates = []
+        for t, track in enumerate(self.active):
+            track_center = box_centroid(track.bbox)
+            for d, (bbox, class_name, _) in enumerate(detections):
+                if class_name != track.class_name:
+                    continue
+                iou = box_iou(track.bbox, bbox)
+                center = box_centroid(bbox)
+                distance = ((center[0] - track_center[0]) ** 2 + (center[1] - track_center[1]) ** 2) ** 0.5
+                if iou >= self.iou_threshold or distance <= max_distance:
+                    candidates.append((-iou, distance, t, d))
+
+        matches = {}
+        used_tracks = set()
+        for _, _, t, d in sorted(candidates):
+            if t in used_tracks or d in matches:
+                continue
+            used_tracks.add(t)
+            matches[d] = self.active[t]
+        return matches
+
+    def update(self, frame_name, frame_shape, crops):
+        self.frame_index += 1
+        detections = []
+        for crop in crops:
+            detection = crop.metadata["yolo_detection"]
+            detections.append((detection["bbox"], detection["class"], crop))
+
+        matches = self._match(detections, frame_shape)
+        for d, (bbox, class_name, crop) in enumerate(detections):
+            track = matches.get(d)
+            if track is None:
+                track = Track(next(self._ids), class_name, bbox, self.frame_index, frame_name)
+                self.active.append(track)
+            quality = crop_quality(crop.image, crop.metadata["yolo_detection"]["confidence"])
+            crop.metadata["track_id"] = track.track_id
+            track.add(crop, bbox, self.frame_index, frame_name, quality, self.best_crops)
+
+        expired = [track for track in self.active if self.frame_index - track.last_frame_index > self.max_age]
+        self.active = [track for track in self.active if self.frame_index - track.last_frame_index <= self.max_age]
+        self.finished.extend(expired)
+        return expired
+
+    def flush(self):
+        expired = self.active
+        self.active = []
+        self.finished.extend(expired)
+        return expired
+
+    def select_crops(self, tracks):
+        return [crop for track in tracks for crop in track.best_crops()]
+
+    def stats(self):
+        tracks = self.finished + self.active
+        total_crops = sum(track.hits for track in tracks)
+        selected = sum(len(track.best) for track in tracks)
+        return {"tracks": len(tracks), "crops": total_crops, "selected_crops": selected}
+
+
+def _vote(candidates):
+    scores = defaultdict(float)
+    counts = defaultdict(int)
+    for text, confidence in candidates:
+        scores[text] += confidence
+        counts[text] += 1
+    if not scores:
+        return None
+    text = max(scores, key=lambda t: (scores[t], counts[t]))
+    return {"text": text, "confidence": round(scores[text] / counts[text], 4), "votes": counts[text]}
+
+
+def _main_text(image_results):
+    texts = []
+    confidences = []
+    for sublist in image_results.get("main_recognition", {}).get("recognized_texts") or []:
+        for text_obj in sublist:
+            if text_obj.get("text"):
+                texts.append(text_obj["text"])
+                confidences.append(float(text_obj.get("confidence", 0.0)))
+    if not texts:
+        return None
+    return " ".join(texts), sum(confidences) / len(confidences)
+
+
+def _easy_ocr_text(image_results):
+    entries = [e for e in image_results.get("easy_ocr_recognition", {}).get("easy_ocr_results") or [] if e.get("text")]
+    if not entries:
+        return None
+    entries.sort(key=lambda e: (e["bbox"][1], e["bbox"][0]))
+    return " ".join(e["text"] for e in entries), sum(e["confidence"] for e in entries) / len(entries)
+
+
+def consolidate_tracks(tracks, results_by_crop):
+    consolidated = {}
+    for track in sorted(tracks, key=lambda t: t.track_id):
+        track_result = track.summary()
+        crop_results = {crop.name: results_by_crop[crop.name] for crop in track.best_crops() if crop.name in results_by_crop}
+        main_candidates = [c for c in (_main_text(r) for r in crop_results.values()) if c is not None]
+        easy_candidates = [c for c in (_easy_ocr_text(r) for r in crop_results.values()) if c is not None]
+        track_result["main_recognition"] = _vote(main_candidates)
+        track_result["easy_ocr_recognition"] = _vote(easy_candidates)
+        track_result["results"] = crop_results
+        consolidated[str(track.track_id)] = track_result
+    return consolidated
@@ -0,0 +1,103 @@
+import copy
+import zlib
+import queue
+import threading
+from config.config import Config
+from vde.metrics import PipelineMetrics
+
+_STOP = object()
+
+
+class VisualizationWriter:
+    def __init__(self, config: Config, metrics=None):
+        self.config = config
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.queue = queue.Queue(maxsize=max(1, self.config.visualization_queue_size))
+        self.lock = threading.Lock()
+        # Shared with copies made by with_config, so every per-request writer feeds the same thread.
+        self.state = {"thread": None, "written": 0, "failed": 0}
+
+    def with_config(self, config: Config):
+        writer = copy.copy(self)
+        writer.config = config
+        return writer
+
+    @property
+    def enabled(self):
+        return self.config.save_visualizations
+
+    @property
+    def sample_rate(self):
+        return self.config.visualization_sample_rate
+
+    @property
+    def background(self):
+        return self.config.visualization_background
+
+    @property
+    def written(self):
+        return self.state["written"]
+
+    @property
+    def failed(self):
+        return self.state["failed"]
+
+    def wants(self, name):
+        if not self.enabled:
+            return False
+        if self.sample_rate >= 1.0:
+            return True
+        return zlib.crc32(str(name).encode('utf-8')) / 0xFFFFFFFF < self.sample_rate
+
+    def submit_visualization(self, name, render, *args):
+        if not self.wants(name):
+            return False
+        self.submit(render, *args)
+        return True
+
+    def submit(self, render, *args):
+        if not self.background:
+            self._render(render, args)
+            return
+        self._ensure_thread()
+        self.queue.put((render, args))
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self.state["thread"] is None:
+                self.state["thread"] = threading.Thread(target=self._run, name="visualization-writer", daemon=True)
+                self.state["thread"].start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._render(*item)
+            finally:
+                self.queue.task_done()
+
+    def _render(self, render, args):
+        try:
+            with self.metrics.timer("visualization_write"):
+                render(*args)
+        except Exception as e:
+            with self.lock:
+                self.state["failed"] += 1
+            print(f"Warning: Could not write output image: {e}")
+        else:
+            with self.lock:
+                self.state["written"] += 1
+
+    def flush(self):
+        if self.state["thread"] is not None:
+            self.queue.join()
+
+    def close(self):
+        with self.lock:
+            thread = self.state["thread"]
+            self.state["thread"] = None
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join()
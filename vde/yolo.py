@@ -1,21 +1,111 @@
-from ultralytics import YOLO
 import cv2
 import os
 from PIL import Image, ImageDraw
 import numpy as np
 import json
 from config.config import Config
+from vde.cache import ResultCache, hash_file, hash_image
+from vde.metrics import PipelineMetrics
+from vde.visualizer import VisualizationWriter
+from vde.detector_backends import load_detector_backend
 
 class YOLODetector:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, result_cache=None, metrics=None, visualizer=None):
         self.config = config
+        self.metrics = metrics if metrics is not None else PipelineMetrics.from_config(self.config)
+        self.visualizer = visualizer if visualizer is not None else VisualizationWriter(self.config, metrics=self.metrics)
         self.model_path = self.config.yolo_weights_path
+        self.result_cache = result_cache if result_cache is not None else ResultCache.from_config(self.config)
         try:
-            self.model = YOLO(self.model_path)
-            print(f"YOLOv8 model loaded successfully from: {self.model_path}")
+            self.model = load_detector_backend(self.config)
+            self.model_path = self.model.model_path
+            self.weights_hash = ResultCache.make_key("yolo_model", hash_file(self.model_path), self.model.name,
+                                                    self.config.yolo_imgsz, self.config.yolo_conf_threshold,
+                                                    self.config.yolo_iou_threshold, self.config.yolo_max_detections)
+            print(f"YOLOv8 model loaded successfully from: {self.model_path} ({self.model.name} backend)")
         except Exception as e:
             print(f"Error loading YOLOv8 model from {self.model_path}: {e}")
             self.model = None
+            self.weights_hash = None
+
+    def _parse_result(self, img, image_name, boxes):
+        detections = []
+
+        img_name_without_ext = os.path.splitext(image_name)[0]
+
+        for j, (x1, y1, x2, y2, conf, class_name) in enumerate(boxes):
+            y1_safe = max(0, y1)
+            y2_safe = min(img.shape[0], y2)
+            x1_safe = max(0, x1)
+            x2_safe = min(img.shape[1], x2)
+
+            cropped_img_cv2 = img[y1_safe:y2_safe, x1_safe:x2_safe]
+
+            if cropped_img_cv2.size == 0:
+                print(f"Warning: Empty crop for {image_name} (box {j}). Skipping this crop.")
+                continue
+
+            detection_info = {
+                "original_image": image_name,
+                "bbox": [x1, y1, x2, y2],
+                "confidence": float(conf),
+                "class": class_name
+            }
+            cropped_filename = f"{img_name_without_ext}_vehicle_crop_{j}_{class_name}.jpg"
+            detections.append((detection_info, cropped_filename, cropped_img_cv2))
+
+        return detections, boxes
+
+    def detect_vehicles_batch(self, images, image_names, batch_size=None):
+        if self.model is None:
+            print("YOLO model not loaded. Skipping batch detection.")
+            return [([], None) for _ in images]
+
+        batch_size = batch_size or self.config.yolo_batch_size
+        cache_keys = [ResultCache.make_key("yolo", hash_image(img), self.weights_hash) for img in images]
+
+        all_boxes = [None] * len(images)
+        pending = []
+        for i, cache_key in enumerate(cache_keys):
+            hit, boxes = self.result_cache.get("yolo", cache_key)
+            if hit:
+                all_boxes[i] = boxes
+            else:
+                pending.append(i)
+
+        for start in range(0, len(pending), batch_size):
+            batch_indices = pending[start:start + batch_size]
+            with self.metrics.timer("yolo_forward", items=len(batch_indices)):
+                batch_boxes = self.model.predict([images[i] for i in batch_indices])
+            for i, boxes in zip(batch_indices, batch_boxes):
+                all_boxes[i] = boxes
+                self.result_cache.set("yolo", cache_keys[i], all_boxes[i])
+
+        return [self._parse_result(img, image_name, boxes)
+                for img, image_name, boxes in zip(images, image_names, all_boxes)]
+
+    def detect_vehicles(self, img, image_name):
+        if self.model is None:
+            print(f"YOLO model not loaded. Skipping detection for {image_name}")
+            return [], None
+        return self.detect_vehicles_batch([img], [image_name], batch_size=1)[0]
+
+    def _save_detections(self, detections, img, boxes, image_name, output_folder_cropped, output_folder_visualized, log_data):
+        detections_data_for_image = []
+
+        for detection_info, cropped_filename, cropped_img_cv2 in detections:
+            cropped_filepath = os.path.join(output_folder_cropped, cropped_filename)
+            with self.metrics.timer("crop_write"):
+                cv2.imwrite(cropped_filepath, cropped_img_cv2)
+
+            detection_info["cropped_image_path"] = cropped_filepath
+            detections_data_for_image.append(detection_info)
+            log_data.append(detection_info)
+
+        if detections_data_for_image:
+            self.save_visualization(img, boxes, image_name, output_folder_visualized)
+
+        return detections_data_for_image
 
     def detect_and_crop_vehicles(self, image_path, output_folder_cropped, output_folder_visualized, log_data):
         if self.model is None:
@@ -30,52 +120,104 @@ class YOLODetector:
             print(f"Error: Could not load image {image_path}")
             return []
 
-        results = self.model(img, verbose=False)
-        detections_data_for_image = []
-
-        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(pil_img)
-
-        img_name_without_ext = os.path.splitext(os.path.basename(image_path))[0]
         original_img_filename = os.path.basename(image_path)
+        detections, boxes = self.detect_vehicles(img, original_img_filename)
+        return self._save_detections(detections, img, boxes, original_img_filename,
+                                     output_folder_cropped, output_folder_visualized, log_data)
 
-        for i, r in enumerate(results):
-            for j, box in enumerate(r.boxes):
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = box.conf[0]
-                cls = int(box.cls[0])
-                class_name = self.model.names[cls]
-
-                draw.rectangle([x1, y1, x2, y2], outline="green", width=2)
-                draw.text((x1 + 5, y1 - 15), f"{class_name}: {conf:.2f}", fill="green")
-
-                y1_safe = max(0, y1)
-                y2_safe = min(img.shape[0], y2)
-                x1_safe = max(0, x1)
-                x2_safe = min(img.shape[1], x2)
+    def detect_and_crop_vehicles_batch(self, images, output_folder_cropped, output_folder_visualized, log_data,
+                                       image_names=None, batch_size=None):
+        if self.model is None:
+            print("YOLO model not loaded. Skipping batch detection.")
+            return [[] for _ in images]
 
-                cropped_img_cv2 = img[y1_safe:y2_safe, x1_safe:x2_safe]
+        os.makedirs(output_folder_cropped, exist_ok=True)
+        os.makedirs(output_folder_visualized, exist_ok=True)
 
-                if cropped_img_cv2.size == 0:
-                    print(f"Warning: Empty crop for {original_img_filename} (box {j}). Skipping this crop.")
+        if image_names is None:
+            image_names = [os.path.basename(img) if isinstance(img, str) else f"image_{i}.jpg"
+                           for i, img in enumerate(images)]
+
+        loaded_images = []
+        loaded_names = []
+        loaded_indices = []
+        for i, (img, image_name) in enumerate(zip(images, image_names)):
+            if isinstance(img, str):
+                image_path = img
+                with self.metrics.timer("image_decode"):
+                    img = cv2.imread(image_path)
+                if img is None:
+                    print(f"Error: Could not load image {image_path}")
                     continue
+            loaded_images.append(img)
+            loaded_names.append(image_name)
+            loaded_indices.append(i)
+
+        all_detections = [[] for _ in images]
+        batch_outputs = self.detect_vehicles_batch(loaded_images, loaded_names, batch_size=batch_size)
+        for i, img, image_name, (detections, boxes) in zip(loaded_indices, loaded_images, loaded_names, batch_outputs):
+            all_detections[i] = self._save_detections(detections, img, boxes, image_name,
+                                                      output_folder_cropped, output_folder_visualized, log_data)
+        return all_detections
+
+    def _render_visualization(self, img, boxes, visualized_filepath):
+        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        draw = ImageDraw.Draw(pil_img)
+        for x1, y1, x2, y2, conf, class_name in boxes:
+            draw.rectangle([x1, y1, x2, y2], outline="green", width=2)
+            draw.text((x1 + 5, y1 - 15), f"{class_name}: {conf:.2f}", fill="green")
+        pil_img.save(visualized_filepath)
+
+    def save_visualization(self, img, boxes, image_name, output_folder_visualized):
+        if not self.visualizer.wants(image_name):
+            return None
+        os.makedirs(output_folder_visualized, exist_ok=True)
+        img_name_without_ext = os.path.splitext(image_name)[0]
+        visualized_filepath = os.path.join(output_folder_visualized, f"{img_name_without_ext}_detected.jpg")
+        self.visualizer.submit(self._render_visualization, img, boxes, visualized_filepath)
+        return visualized_filepath
+
+    def _write_crop(self, crop_image, cropped_filepath):
+        with self.metrics.timer("crop_write"):
+            cv2.imwrite(cropped_filepath, crop_image)
+
+    def _crop_records(self, record, detections, boxes, output_folder_cropped, output_folder_visualized, log_data, save_crops):
+        cropped_records = []
+
+        if save_crops and detections:
+            os.makedirs(output_folder_cropped, exist_ok=True)
+        for detection_info, cropped_filename, cropped_img_cv2 in detections:
+            crop_record = record.with_image(cropped_img_cv2, name=cropped_filename)
+            if save_crops:
+                detection_info["cropped_image_path"] = os.path.join(output_folder_cropped, cropped_filename)
+                self.visualizer.submit(self._write_crop, cropped_img_cv2, detection_info["cropped_image_path"])
+            crop_record.metadata["yolo_detection"] = detection_info
+            cropped_records.append(crop_record)
+            log_data.append(detection_info)
+
+        if cropped_records:
+            self.save_visualization(record.image, boxes, record.name, output_folder_visualized)
+
+        return cropped_records
+
+    def detect_and_crop_record(self, record, output_folder_cropped, output_folder_visualized, log_data, save_crops=True):
+        if self.model is None:
+            print(f"YOLO model not loaded. Skipping detection for {record.name}")
+            return []
 
-                cropped_filename = f"{img_name_without_ext}_vehicle_crop_{j}_{class_name}.jpg"
-                cropped_filepath = os.path.join(output_folder_cropped, cropped_filename)
-                cv2.imwrite(cropped_filepath, cropped_img_cv2)
-
-                detection_info = {
-                    "original_image": original_img_filename,
-                    "cropped_image_path": cropped_filepath,
-                    "bbox": [x1, y1, x2, y2],
-                    "confidence": float(conf),
-                    "class": class_name
-                }
-                detections_data_for_image.append(detection_info)
-                log_data.append(detection_info)
-
-        if detections_data_for_image:
-            visualized_filepath = os.path.join(output_folder_visualized, f"{img_name_without_ext}_detected.jpg")
-            pil_img.save(visualized_filepath)
+        detections, boxes = self.detect_vehicles(record.image, record.name)
+        return self._crop_records(record, detections, boxes, output_folder_cropped,
+                                  output_folder_visualized, log_data, save_crops)
 
-        return detections_data_for_image
\ No newline at end of file
+    def detect_and_crop_records(self, records, output_folder_cropped, output_folder_visualized, log_data,
+                                save_crops=True, batch_size=None):
+        if self.model is None:
+            print("YOLO model not loaded. Skipping batch detection.")
+            return [[] for _ in records]
+
+        batch_outputs = self.detect_vehicles_batch([record.image for record in records],
+                                                   [record.name for record in records],
+                                                   batch_size=batch_size)
+        return [self._crop_records(record, detections, boxes, output_folder_cropped,
+                                   output_folder_visualized, log_data, save_crops)
+                for record, (detections, boxes) in zip(records, batch_outputs)]